@@ -53,6 +53,9 @@ class MainActivity: FlutterActivity() {
                     MyAccessibilityService.instance?.performTextInput(text)
                     result.success(true)
                 }
+                "getScreenSnapshot" -> {
+                    result.success(MyAccessibilityService.instance?.collectScreenSnapshot())
+                }
                 "checkAccessibilityServiceStatus" -> {
                     val isEnabled = isAccessibilityServiceEnabled()
                     result.success(isEnabled)
@@ -32,6 +32,12 @@ class MyAccessibilityService : AccessibilityService() {
     
     companion object {
         private const val TAG = "MyAccessibilityService"
+        // 서버 /screen-context 스냅샷 요소 플래그 (backend/screen_index.py와 같은 값)
+        private const val FLAG_CLICKABLE = 1
+        private const val FLAG_EDITABLE = 2
+        private const val FLAG_SCROLLABLE = 4
+        private const val FLAG_CHECKABLE = 8
+        private const val MAX_SNAPSHOT_NODES = 3000
         var instance: MyAccessibilityService? = null
     }
 
@@ -259,6 +265,59 @@ class MyAccessibilityService : AccessibilityService() {
         dispatchGesture(gesture, null, null)
     }
 
+    // 현재 화면의 접근성 트리 스냅샷 (서버가 명령의 터치 대상을 실제 좌표로 찾는 데 사용)
+    // 형식: {"package", "width", "height", "nodes": [{"t", "d", "id", "c", "b": [l, t, r, b], "f", "p"}]}
+    fun collectScreenSnapshot(): String? {
+        val rootNode = rootInActiveWindow ?: return null
+        val nodes = JSONArray()
+        collectSnapshotNodes(rootNode, null, nodes)
+
+        val metrics = resources.displayMetrics
+        return JSONObject().apply {
+            put("package", rootNode.packageName?.toString() ?: "")
+            put("width", metrics.widthPixels)
+            put("height", metrics.heightPixels)
+            put("nodes", nodes)
+        }.toString()
+    }
+
+    private fun collectSnapshotNodes(node: AccessibilityNodeInfo, parentIndex: Int?, nodes: JSONArray) {
+        if (nodes.length() >= MAX_SNAPSHOT_NODES || !node.isVisibleToUser) {
+            return
+        }
+        val text = node.text?.toString() ?: ""
+        val contentDesc = node.contentDescription?.toString() ?: ""
+        val viewId = node.viewIdResourceName?.substringAfter(":id/") ?: ""
+        var flags = 0
+        if (node.isClickable && node.isEnabled) flags = flags or FLAG_CLICKABLE
+        if (node.isEditable) flags = flags or FLAG_EDITABLE
+        if (node.isScrollable) flags = flags or FLAG_SCROLLABLE
+        if (node.isCheckable) flags = flags or FLAG_CHECKABLE
+
+        // 이름도 동작도 없는 레이아웃 노드는 건너뛰고 자식을 가장 가까운 남은 조상에 붙임
+        var index = parentIndex
+        if (text.isNotEmpty() || contentDesc.isNotEmpty() || viewId.isNotEmpty() || flags != 0 || parentIndex == null) {
+            val rect = Rect()
+            node.getBoundsInScreen(rect)
+            val item = JSONObject()
+            if (text.isNotEmpty()) item.put("t", text)
+            if (contentDesc.isNotEmpty()) item.put("d", contentDesc)
+            if (viewId.isNotEmpty()) item.put("id", viewId)
+            item.put("c", node.className?.toString() ?: "")
+            item.put("b", JSONArray(listOf(rect.left, rect.top, rect.right, rect.bottom)))
+            if (flags != 0) item.put("f", flags)
+            if (parentIndex != null) item.put("p", parentIndex)
+            index = nodes.length()
+            nodes.put(item)
+        }
+
+        for (i in 0 until node.childCount) {
+            val child = node.getChild(i) ?: continue
+            collectSnapshotNodes(child, index, nodes)
+            child.recycle()
+        }
+    }
+
     // 기존 터치 기능
     fun performTouch(x: Float, y: Float) {
         val path = Path()
@@ -0,0 +1,664 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM 음성 비서 백엔드 - asyncio(ASGI) 서버 모드
+test_server.py와 같은 엔드포인트를 Starlette로 제공합니다.
+요청마다 OS 스레드를 잡아두지 않고, LLM/STT는 비동기 호출, ffmpeg·VAD 같은 블로킹 작업은
+단계별 스레드 풀로 넘기며, 단계마다 동시 실행 수와 대기열 길이를 제한합니다.
+대기열이 가득 차면 바로 503(단계 혼잡) 또는 429(전체 요청 한도)와 Retry-After를 반환합니다.
+
+실행:
+    pip install starlette uvicorn httpx
+    uvicorn asgi_server:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import test_server as core
+from backend.audio_convert import ConversionBusy, ConversionError
+from backend.backpressure import Overloaded, StageLimiter
+from backend.llm_client import AsyncGeminiClient, LLMError
+from backend.prompting import GENERATION_CONFIG, SYSTEM_INSTRUCTION, build_command_prompt
+from backend.screen_index import ScreenSnapshotError
+from backend.services import ServiceUnavailable
+from backend.stt_backends import STTUnavailable
+from backend.timing import StageTimer
+from backend.tts_stream import CompressedTTSStream, split_sentences
+from backend.wakeword_detector import wav_to_samples
+
+RETRY_AFTER = int(os.getenv('ASYNC_RETRY_AFTER', '1'))
+
+# 전체 동시 요청 한도 (초과 시 429) + 단계별 동시 실행/대기열 한도 (초과 시 503)
+admission = StageLimiter('requests', int(os.getenv('ASYNC_MAX_IN_FLIGHT', '256')), max_queue=0,
+                         retry_after=RETRY_AFTER, status=429)
+limits = {
+    'convert': StageLimiter('convert', int(os.getenv('FFMPEG_MAX_CONCURRENT', '4')),
+                            int(os.getenv('ASYNC_CONVERT_QUEUE', '16')), retry_after=RETRY_AFTER),
+    'cpu': StageLimiter('cpu', os.cpu_count() or 2, int(os.getenv('ASYNC_CPU_QUEUE', '32')),
+                        retry_after=RETRY_AFTER),
+    'stt': StageLimiter('stt', int(os.getenv('ASYNC_STT_CONCURRENT', '32')),
+                        int(os.getenv('ASYNC_STT_QUEUE', '64')), retry_after=RETRY_AFTER),
+    'llm': StageLimiter('llm', int(os.getenv('GEMINI_MAX_CONCURRENT', '8')),
+                        int(os.getenv('ASYNC_LLM_QUEUE', '32')), retry_after=RETRY_AFTER),
+    'tts': StageLimiter('tts', 1, int(os.getenv('ASYNC_TTS_QUEUE', '16')), retry_after=RETRY_AFTER),
+    # 원격 캐시 저장소(Redis) 왕복 - CPU 작업이 아니므로 CPU 수와 무관하게 동시 실행
+    'cache': StageLimiter('cache', int(os.getenv('ASYNC_CACHE_CONCURRENT', '16')),
+                          int(os.getenv('ASYNC_CACHE_QUEUE', '64')), retry_after=RETRY_AFTER),
+}
+
+# Redis 같은 원격 캐시 저장소의 조회/저장은 블로킹 소켓 왕복 - 이벤트 루프를 막지 않도록 스레드 풀에서 실행
+REMOTE_CACHE_STORE = urlparse(core.CACHE_STORE_URL).scheme not in ('', 'memory')
+
+async_gemini_client = None
+
+# 로거와 메트릭은 Flask 모드와 공유 (/metrics 형식 동일)
+logger = core.logger
+metrics = core.metrics
+
+
+def error_response(message, status):
+    return JSONResponse({'error': message}, status_code=status)
+
+
+def overloaded_response(e):
+    logger.warning("🚦 %s", e)
+    return JSONResponse({'error': str(e), 'stage': e.stage}, status_code=e.status,
+                        headers={'Retry-After': str(e.retry_after)})
+
+
+# ---- 파이프라인 단계 (비동기) ----
+
+async def convert_audio_to_wav(audio_bytes, audio_format, profile=None):
+    """ffmpeg 변환 + 전처리 - 변환 단계 스레드 풀에서 실행, 실패 시 None (변환 슬롯 혼잡은 Overloaded → 503)"""
+    # WAV/PCM은 ffmpeg 없이 프로세스 안에서 처리되므로 CPU 단계로
+    stage = limits['cpu'] if audio_format in ('wav', 'pcm') else limits['convert']
+    try:
+        with metrics.timed('convert'):
+            return await stage.run_in_thread(core.audio_converter.convert, audio_bytes, audio_format,
+                                             preprocess=core.audio_preprocess_hook(profile))
+    except ConversionBusy as e:
+        raise Overloaded('convert', retry_after=core.conversion_retry_after()) from e
+    except ConversionError as e:
+        logger.error("❌ 오디오 변환 실패: %s", e)
+        return None
+
+
+async def detect_speech(wav_content):
+    """VAD (NumPy 연산은 CPU 단계 스레드 풀에서)"""
+    with metrics.timed('vad'):
+        return await limits['cpu'].run_in_thread(core.services.get('vad').process, wav_content)
+
+
+async def cache_call(func, *args):
+    """캐시 저장소를 읽고 쓰는 블로킹 호출 - 원격 저장소면 cache 단계 스레드 풀에서, 메모리 저장소면 바로 실행"""
+    if REMOTE_CACHE_STORE:
+        return await limits['cache'].run_in_thread(func, *args)
+    return func(*args)
+
+
+async def recognize_speech(wav_content, purpose='command', preferred=None):
+    """(원본 텍스트, 신뢰도, 단어별 신뢰도) - 결과 없으면 (None, 0.0, []), 지문 캐시 적중 시 STT 생략,
+    같은 오디오 인식이 진행 중이면 그 결과를 기다림"""
+    key = core.stt_flight_key(wav_content, purpose, preferred)
+    return await core.stt_flight.do_async(key, _recognize_speech, wav_content, purpose, preferred)
+
+
+async def _recognize_speech(wav_content, purpose, preferred):
+    fingerprint, cached = await limits['cpu'].run_in_thread(core.lookup_transcript, wav_content, purpose, preferred)
+    if cached is not None:
+        return cached['transcript'], cached['confidence'], cached['words']
+    async with limits['stt']:
+        with metrics.timed('stt'):
+            result = await core.stt_router.recognize_async(wav_content, purpose, preferred)
+    if result is None:
+        await cache_call(core.store_transcript, fingerprint, purpose, preferred, None, 0.0, [])
+        return None, 0.0, []
+    await cache_call(core.store_transcript, fingerprint, purpose, preferred,
+                     result.transcript, result.confidence, result.words)
+    return result.transcript, result.confidence, result.words
+
+
+async def analyze_command_text(command, screen=None):
+    """규칙/캐시 빠른 경로 → 비동기 Gemini 호출 (같은 명령의 호출이 진행 중이면 그 결과 공유)
+    화면 문맥이 있으면 touch 대상을 화면 요소 좌표로 맞춤 (test_server.analyze_command_text와 같음)"""
+    result, cache_key = await cache_call(core.analyze_command_fast_path, command)
+    elements = []
+    if result is None:
+        elements = core.screen_prompt_elements(screen, command)
+        result = await core.llm_flight.do_async(core.llm_flight_key(cache_key, screen, elements),
+                                                analyze_command_with_gemini, command, cache_key, screen, elements)
+    if screen is None:
+        return result
+
+    element, source, pending = core.locate_screen_target(result, command, screen, allow_llm=not elements)
+    if pending:
+        choice = await core.llm_flight.do_async(core.llm_flight_key(command, screen, pending),
+                                                analyze_command_with_gemini, command, None, screen, pending)
+        chosen = core.screen_element_choice(screen, choice)
+        if chosen is not None:
+            element, source = chosen, 'llm'
+    return core.attach_screen_target(result, screen, element, source)
+
+
+async def load_screen_context(request, data, snapshot=None):
+    """요청 기기의 화면 문맥 - 스냅샷 색인은 CPU 단계 스레드 풀에서 (형식 오류는 ScreenSnapshotError)"""
+    device_id = core.request_device_id(data, request.headers)
+    return await limits['cpu'].run_in_thread(core.load_screen_context, device_id, snapshot)
+
+
+async def analyze_command_with_gemini(command, cache_key, screen=None, elements=()):
+    prompt = build_command_prompt(command, screen.describe(elements) if elements else None)
+    try:
+        async with limits['llm']:
+            with metrics.timed('llm'):
+                gemini_response = (await async_gemini_client.generate(
+                    prompt,
+                    generation_config=GENERATION_CONFIG,
+                    system_instruction=SYSTEM_INSTRUCTION,
+                )).strip()
+    except LLMError as e:
+        logger.error("❌ Gemini 호출 실패: %s", e)
+        metrics.record_error('analyze_command', 'llm')
+        return core.command_fallback_response(command, 'AI 분석 실패로 기본 처리')
+    return await cache_call(core.finish_command_analysis, command, cache_key, gemini_response)
+
+
+async def synthesize_speech(text):
+    """TTS 워커 Future를 기다림 (스레드를 잡지 않음)"""
+    async with limits['tts']:
+        with metrics.timed('tts'):
+            # shield: 요청이 끊겨도 같은 문장을 기다리는 다른 요청과 공유하는 Future는 취소하지 않음
+            future = await cache_call(core.tts_worker.submit, text)
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+
+async def tts_available():
+    """TTS 사용 가능 여부 - 첫 호출이면 엔진 초기화가 끝날 때까지 스레드에서 기다림"""
+    if core.services.state('tts') == 'ready':
+        return core.tts_worker.is_available
+    return await asyncio.to_thread(core.tts_available)
+
+
+# ---- 요청 파싱 ----
+
+async def read_audio_request(request):
+    """test_server.read_audio_request의 비동기 버전 - (오디오 바이트, 형식, 옵션, 오류 응답)"""
+    content_type = request.headers.get('content-type', '')
+    mimetype = content_type.split(';')[0].strip().lower()
+    header_format = request.query_params.get('format') or request.headers.get('x-audio-format')
+
+    if mimetype == 'application/json':
+        try:
+            options = await request.json()
+        except ValueError:
+            options = None
+        if not options:
+            return None, None, None, error_response('요청 데이터가 없습니다.', 400)
+        audio_data = options.get('audio_data', '')
+        if not audio_data:
+            return None, None, None, error_response('오디오 데이터가 없습니다.', 400)
+        try:
+            with metrics.timed('base64_decode'):
+                audio_bytes = base64.b64decode(audio_data)
+        except Exception as e:
+            return None, None, None, error_response(f'잘못된 Base64 데이터입니다: {str(e)}', 400)
+        audio_format = options.get('audio_format') or header_format or 'm4a'
+
+    elif mimetype == 'multipart/form-data':
+        try:
+            form = await request.form()
+        except AssertionError:
+            # python-multipart 미설치
+            return None, None, None, error_response('multipart 업로드를 지원하지 않습니다.', 415)
+        upload = form.get('audio')
+        if upload is None or isinstance(upload, str):
+            return None, None, None, error_response('오디오 데이터가 없습니다.', 400)
+        audio_bytes = await upload.read()
+        extension = upload.filename.rsplit('.', 1)[-1].lower() if upload.filename and '.' in upload.filename else None
+        upload_type = (upload.content_type or '').split(';')[0].strip().lower()
+        audio_format = (form.get('audio_format') or header_format
+                        or core.AUDIO_MIMETYPE_FORMATS.get(upload_type) or extension or 'm4a')
+        options = {**request.query_params, **{k: v for k, v in form.items() if isinstance(v, str)}}
+
+    else:
+        audio_bytes = await request.body()
+        audio_format = header_format or core.AUDIO_MIMETYPE_FORMATS.get(mimetype) or 'm4a'
+        options = dict(request.query_params)
+        if 'x-check-wakeword' in request.headers:
+            options.setdefault('check_wakeword', request.headers['x-check-wakeword'])
+
+    audio_format = str(audio_format).lower()
+    error = core.audio_payload_error(audio_bytes, audio_format)
+    if error:
+        return None, None, None, error_response(error, 400)
+    return audio_bytes, audio_format, options, None
+
+
+def tts_output_format(request, data):
+    """test_server.tts_output_format과 같음 (본문 format → ?format=, 기본 wav)"""
+    return str((data or {}).get('format') or request.query_params.get('format') or 'wav').lower()
+
+
+def request_audio_profile(request, options):
+    """test_server.request_audio_profile과 같음 (audio_profile 옵션 → X-Audio-Profile 헤더)"""
+    return options.get('audio_profile') or request.headers.get('x-audio-profile')
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+# ---- 엔드포인트 ----
+
+async def health_check(request):
+    """서버 상태 확인 (+ 단계별 리미터 상태)"""
+    status = core.health_status()
+    status['server_mode'] = 'asgi'
+    status['limits'] = {name: limiter.stats() for name, limiter in [('requests', admission), *limits.items()]}
+    return JSONResponse(status)
+
+
+async def liveness_check(request):
+    """프로세스가 요청을 처리할 수 있는지 (외부 서비스 상태와 무관)"""
+    return JSONResponse({'live': True, 'startup': core.services.startup()})
+
+
+async def readiness_check(request):
+    """트래픽을 받아도 되는지 - 준비 전이면 503"""
+    ready, body = core.readiness_status()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+async def metrics_endpoint(request):
+    """Prometheus 형식 메트릭 (?format=json 이면 p50/p95/p99 요약 JSON)"""
+    if request.query_params.get('format') == 'json':
+        return JSONResponse(metrics.snapshot())
+    return PlainTextResponse(metrics.render_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+async def speech_to_text(request):
+    """음성을 텍스트로 변환"""
+    audio_bytes, audio_format, options, error = await read_audio_request(request)
+    if error:
+        return error
+    check_wakeword = core._is_true(options.get('check_wakeword', False))
+
+    wav_content = await convert_audio_to_wav(audio_bytes, audio_format, request_audio_profile(request, options))
+    if wav_content is None:
+        return error_response('오디오 변환 실패', 500)
+
+    vad_result = await detect_speech(wav_content)
+    if not vad_result.has_speech:
+        return JSONResponse({'transcript': '', 'confidence': 0.0, 'is_wakeword': False, 'speech_span': None})
+
+    try:
+        transcript, confidence, word_confidences = await recognize_speech(
+            vad_result.wav_content,
+            purpose='wakeword' if check_wakeword else 'command',
+            preferred=options.get('stt_backend'),
+        )
+    except STTUnavailable as e:
+        logger.error("❌ %s", e)
+        return error_response(str(e), 503)
+    if transcript is None:
+        return JSONResponse({'transcript': '', 'confidence': 0.0, 'is_wakeword': False,
+                             'speech_span': vad_result.span()})
+
+    transcript = core.post_process_transcript(transcript)
+    is_wakeword = False
+    if check_wakeword:
+        is_wakeword = await cache_call(core.is_wakeword_detected, transcript, confidence, word_confidences)
+
+    return JSONResponse({
+        'transcript': transcript,
+        'confidence': confidence,
+        'is_wakeword': is_wakeword,
+        'speech_span': vad_result.span(),
+    })
+
+
+async def wakeword(request):
+    """로컬 감지기로 호출어 확인 - 통과한 클립만 STT로 재확인"""
+    audio_bytes, audio_format, options, error = await read_audio_request(request)
+    if error:
+        return error
+    wav_content = await convert_audio_to_wav(audio_bytes, audio_format, request_audio_profile(request, options))
+    if wav_content is None:
+        return error_response('오디오 변환 실패', 500)
+
+    def detect():
+        detector = core.services.wakeword_detector
+        samples, _ = wav_to_samples(wav_content)
+        return detector, detector.detect(samples)
+
+    detector, result = await limits['cpu'].run_in_thread(detect)
+    result['detector'] = 'local' if detector.is_ready else 'stt'
+    result['verified_by_stt'] = False
+    if not result['has_speech'] or (detector.is_ready and not result['is_wakeword']):
+        return JSONResponse(result)
+
+    if not detector.is_ready or core.WAKEWORD_VERIFY_WITH_STT:
+        try:
+            transcript, confidence, word_confidences = await recognize_speech(wav_content, purpose='wakeword')
+        except STTUnavailable as e:
+            logger.error("❌ %s", e)
+            return error_response(str(e), 503)
+        transcript = core.post_process_transcript(transcript or '')
+        text_match = await cache_call(core.match_wakeword, transcript, confidence, word_confidences)
+        result['is_wakeword'] = text_match.is_wakeword
+        result['text_match'] = text_match.to_dict()
+        result['transcript'] = transcript
+        result['verified_by_stt'] = True
+    return JSONResponse(result)
+
+
+async def analyze_command(request):
+    """음성 명령을 분석하고 적절한 액션 결정"""
+    data = await read_json(request)
+    if not data:
+        return error_response('요청 데이터가 없습니다.', 400)
+    command = data.get('command', '')
+    if not command:
+        return error_response('명령어가 없습니다.', 400)
+    if len(command.strip()) < 2:
+        return error_response('명령어가 너무 짧습니다.', 400)
+    try:
+        screen = await load_screen_context(request, data, data.get('screen'))
+    except ScreenSnapshotError as e:
+        return error_response(f'화면 정보 형식 오류: {e}', 400)
+    try:
+        return JSONResponse(await analyze_command_text(command, screen))
+    except Overloaded:
+        raise
+    except Exception as e:
+        logger.exception("❌ 명령 분석 오류: %s", e)
+        metrics.record_error('analyze_command', 'exception')
+        return JSONResponse(core.command_error_response(e))
+
+
+async def _tts_stream_response(text, audio_format):
+    """test_server.open_tts_stream과 같음 - TTS 단계 슬롯은 첫 문장이 합성될 때까지만 잡음"""
+    sentences = split_sentences(text, core.TTS_SENTENCE_MAX_CHARS)
+    async with limits['tts']:
+        futures = await cache_call(lambda: [core.tts_worker.submit(sentence) for sentence in sentences])
+        await asyncio.shield(asyncio.wrap_future(futures[0]))
+    stream = CompressedTTSStream(futures, audio_format, bitrate=core.TTS_STREAM_BITRATE,
+                                 on_finish=core.record_tts_stream)
+    await asyncio.to_thread(stream.start)
+
+    async def generate():
+        try:
+            async for chunk in iterate_in_threadpool(iter(stream)):
+                yield chunk
+        finally:
+            # 클라이언트가 끊으면 인코더 정리
+            await asyncio.to_thread(stream.close)
+    return StreamingResponse(generate(), media_type=stream.mimetype,
+                             headers={'X-TTS-Sentences': str(len(sentences)), 'Cache-Control': 'no-store'})
+
+
+async def _tts_response(text, audio_format='wav'):
+    if audio_format != 'wav' and audio_format not in core.STREAM_FORMATS:
+        return error_response(f'지원하지 않는 TTS 형식입니다: {audio_format}', 400)
+    if not await tts_available():
+        return error_response('TTS 엔진이 초기화되지 않았습니다.', 500)
+    try:
+        if audio_format != 'wav':
+            return await _tts_stream_response(text, audio_format)
+        audio_data = await synthesize_speech(text)
+    except Overloaded:
+        raise
+    except Exception as e:
+        logger.exception("❌ TTS 오류: %s", e)
+        return error_response(f'TTS 중 오류가 발생했습니다: {str(e)}', 500)
+    return JSONResponse({'audio_data': base64.b64encode(audio_data).decode('utf-8'), 'text': text})
+
+
+async def text_to_speech(request):
+    """텍스트를 음성으로 변환"""
+    data = await read_json(request)
+    if not data:
+        return error_response('요청 데이터가 없습니다.', 400)
+    text = data.get('text', '')
+    if not text or len(text.strip()) < 1:
+        return error_response('텍스트가 없습니다.', 400)
+    return await _tts_response(text, tts_output_format(request, data))
+
+
+async def screen_context(request):
+    """접근성 트리 스냅샷 등록 - 이후 명령 분석(같은 기기)에서 touch 대상을 실제 좌표로 찾음"""
+    data = await read_json(request)
+    if not data:
+        return error_response('요청 데이터가 없습니다.', 400)
+    try:
+        screen = await load_screen_context(request, data, data.get('screen', data))
+    except ScreenSnapshotError as e:
+        return error_response(f'화면 정보 형식 오류: {e}', 400)
+    return JSONResponse({**screen.stats(), 'expires_in': core.SCREEN_CONTEXT_TTL})
+
+
+async def wakeword_feedback(request):
+    """호출어 인식 피드백 TTS"""
+    return await _tts_response(core.WAKEWORD_FEEDBACK_TEXT, tts_output_format(request, await read_json(request)))
+
+
+async def voice_command_events(audio_bytes, audio_format, with_tts, stt_backend=None, audio_profile=None,
+                               tts_format='wav', screen=None):
+    """test_server.voice_command_events의 비동기 버전"""
+    timer = StageTimer()
+
+    with timer.stage('convert'):
+        wav_content = await convert_audio_to_wav(audio_bytes, audio_format, audio_profile)
+    if wav_content is None:
+        yield 'error', {'error': '오디오 변환 실패', 'status': 500, 'timings': timer.summary()}
+        return
+
+    with timer.stage('vad'):
+        vad_result = await detect_speech(wav_content)
+
+    transcript, raw_transcript, confidence = '', '', 0.0
+    if vad_result.has_speech:
+        try:
+            with timer.stage('stt'):
+                raw_transcript, confidence, _ = await recognize_speech(vad_result.wav_content, preferred=stt_backend)
+        except STTUnavailable as e:
+            logger.error("❌ %s", e)
+            yield 'error', {'error': str(e), 'status': 503, 'timings': timer.summary()}
+            return
+        with timer.stage('post_process'):
+            transcript = core.post_process_transcript(raw_transcript or '')
+
+    yield 'transcript', {
+        'transcript': transcript,
+        'raw_transcript': raw_transcript or '',
+        'confidence': confidence,
+        'speech_span': vad_result.span(),
+    }
+
+    if len(transcript.strip()) < 2:
+        yield 'done', {'timings': timer.summary()}
+        return
+
+    with timer.stage('analyze'):
+        command = await analyze_command_text(transcript, screen)
+    yield 'command', command
+
+    if with_tts and await tts_available():
+        tts_text = command.get('response') or f"'{transcript}' 명령을 실행하겠습니다."
+        try:
+            with timer.stage('tts'):
+                audio_data = await synthesize_speech(tts_text)
+                payload = await limits['convert'].run_in_thread(core.tts_payload, tts_text, audio_data, tts_format)
+            yield 'tts', payload
+        except Overloaded as e:
+            yield 'tts', {'error': str(e), 'text': tts_text}
+        except Exception as e:
+            logger.exception("❌ TTS 오류: %s", e)
+            metrics.record_error('voice_command', 'tts')
+            yield 'tts', {'error': f'TTS 중 오류가 발생했습니다: {str(e)}', 'text': tts_text}
+
+    yield 'done', {'timings': timer.summary()}
+
+
+async def voice_command(request):
+    """음성 → 텍스트 → 명령 분석 → (선택) TTS를 한 번의 요청으로 처리"""
+    audio_bytes, audio_format, options, error = await read_audio_request(request)
+    if error:
+        return error
+    with_tts = core._is_true(options.get('tts', False))
+    try:
+        screen = await load_screen_context(request, options, options.get('screen'))
+    except ScreenSnapshotError as e:
+        return error_response(f'화면 정보 형식 오류: {e}', 400)
+    events = voice_command_events(audio_bytes, audio_format, with_tts, options.get('stt_backend'),
+                                  request_audio_profile(request, options),
+                                  str(options.get('tts_format', 'wav')).lower(), screen)
+
+    if core._is_true(options.get('stream', False)):
+        async def generate():
+            try:
+                async for event, payload in events:
+                    yield json.dumps({'event': event, **payload}, ensure_ascii=False) + '\n'
+            except Overloaded as e:
+                yield json.dumps({'event': 'error', 'error': str(e), 'stage': e.stage,
+                                  'retry_after': e.retry_after}, ensure_ascii=False) + '\n'
+        return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+    result = {'command': None, 'tts': None}
+    async for event, payload in events:
+        if event == 'error':
+            status = payload.pop('status', 500)
+            return JSONResponse(payload, status_code=status)
+        if event == 'transcript':
+            result.update(payload)
+        elif event == 'done':
+            result['timings'] = payload['timings']
+        else:
+            result[event] = payload
+    return JSONResponse(result)
+
+
+# ---- 앱 구성 ----
+
+class AdmissionMiddleware:
+    """전체 동시 요청 수 제한 - 초과 시 대기 없이 429"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in ('/health', '/health/live', '/health/ready', '/metrics'):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await admission.acquire()
+        except Overloaded as e:
+            await overloaded_response(e)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+
+class RequestMetricsMiddleware:
+    """엔드포인트별 요청 수 / 상태 코드 / 처리 시간 집계 (라벨은 Flask 모드와 같은 핸들러 이름)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # 라우팅이 끝나면 scope['endpoint']에 핸들러가 들어 있음 (429 거절은 라우팅 전이라 경로로 기록)
+            endpoint = getattr(scope.get('endpoint'), '__name__', None) or scope['path']
+            metrics.record_request(endpoint, status, time.perf_counter() - started)
+
+
+async def handle_overloaded(request, exc):
+    """단계 대기열 초과 → 503 + Retry-After"""
+    return overloaded_response(exc)
+
+
+async def handle_service_unavailable(request, exc):
+    """서비스 생성 실패 / 재시도 대기 → 503 + Retry-After"""
+    return JSONResponse({'error': str(exc), 'service': exc.name}, status_code=503,
+                        headers={'Retry-After': str(max(1, int(exc.retry_after or 1)))})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global async_gemini_client
+    async_gemini_client = AsyncGeminiClient(
+        api_key=core.GEMINI_API_KEY,
+        model=os.getenv('GEMINI_MODEL', 'gemini-1.5-pro'),
+        base_url=os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com'),
+        timeout=float(os.getenv('GEMINI_TIMEOUT', '15')),
+        max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '2')),
+    )
+
+    def create_async_speech_client():
+        from google.cloud import speech
+        return speech.SpeechAsyncClient(credentials=core.services.google_credentials)
+
+    # gRPC aio 클라이언트는 첫 인식 요청 때 이벤트 루프 안에서 생성 (실패하면 스레드 풀로 대체)
+    core.google_stt.async_client_factory = create_async_speech_client
+    logger.info("🚀 ASGI 서버 모드 시작")
+    yield
+    await async_gemini_client.close()
+    for limiter in limits.values():
+        limiter.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/health/live', liveness_check, methods=['GET']),
+        Route('/health/ready', readiness_check, methods=['GET']),
+        Route('/metrics', metrics_endpoint, methods=['GET']),
+        Route('/speech-to-text', speech_to_text, methods=['POST']),
+        Route('/wakeword', wakeword, methods=['POST']),
+        Route('/analyze-command', analyze_command, methods=['POST']),
+        Route('/screen-context', screen_context, methods=['POST']),
+        Route('/tts', text_to_speech, methods=['POST']),
+        Route('/wakeword-feedback', wakeword_feedback, methods=['POST']),
+        Route('/voice-command', voice_command, methods=['POST']),
+    ],
+    exception_handlers={Overloaded: handle_overloaded, ServiceUnavailable: handle_service_unavailable},
+    lifespan=lifespan,
+)
+app = RequestMetricsMiddleware(AdmissionMiddleware(app))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""LLM 음성 비서 백엔드 구성 모듈"""
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+"""
+ffmpeg 파이프 기반 오디오 변환 엔진
+임시 파일 없이 stdin/stdout으로 변환하고, 미리 띄워 둔 ffmpeg 워커를 재사용합니다.
+전처리 함수(preprocess)를 넘기면 ffmpeg는 디코딩만 하고 필터 체인 대신 그 함수로 처리합니다
+(backend.audio_preprocess). 16bit WAV / raw PCM 입력은 이때 ffmpeg 없이 프로세스 안에서 처리됩니다.
+"""
+
+import io
+import logging
+import os
+import queue
+import struct
+import subprocess
+import tempfile
+import threading
+import wave
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+
+# 노이즈 제거 + 강한 볼륨 증폭 + 다이나믹 레인지 압축
+DEFAULT_FILTER_CHAIN = (
+    'highpass=f=200,lowpass=f=3000,volume=3.0,'
+    'compand=0.3|0.3:1|1:-90/-60/-40/-30/-20/-10/0:6:0:-90:0.2'
+)
+
+# moov 박스가 mdat 뒤에 있으면 파이프 입력으로 디코딩할 수 없는 컨테이너
+MP4_FAMILY_FORMATS = ('m4a', 'mp4', '3gp', 'aac_mp4', 'mov')
+
+
+class ConversionError(Exception):
+    """오디오 변환 실패"""
+
+
+class ConversionTimeout(ConversionError):
+    """ffmpeg 처리 시간 초과"""
+
+
+class ConversionBusy(ConversionError):
+    """동시 변환 슬롯이 모두 사용 중"""
+
+
+def pcm_to_wav(pcm_bytes, sample_rate=TARGET_SAMPLE_RATE, channels=1):
+    """16bit PCM 바이트에 WAV 헤더를 붙여 반환"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm_bytes)
+    return buffer.getvalue()
+
+
+def read_wav_pcm(audio_data):
+    """16bit PCM WAV → (PCM 바이트, 샘플레이트, 채널 수), 다른 형식이면 None"""
+    try:
+        with wave.open(io.BytesIO(audio_data), 'rb') as wav_file:
+            if wav_file.getsampwidth() != 2:
+                return None
+            return (wav_file.readframes(wav_file.getnframes()),
+                    wav_file.getframerate(), wav_file.getnchannels())
+    except (wave.Error, EOFError, struct.error):
+        return None
+
+
+def decode_wav_in_process(audio_data):
+    """이미 16kHz 모노 LINEAR16 WAV인 경우 ffmpeg 없이 그대로 사용"""
+    decoded = read_wav_pcm(audio_data)
+    if decoded is None or decoded[1:] != (TARGET_SAMPLE_RATE, 1):
+        return None
+    return pcm_to_wav(decoded[0])
+
+
+def is_pipe_decodable(audio_data, input_format):
+    """파이프(stdin)로 디코딩 가능한 입력인지 확인 (MP4 계열은 moov 위치 검사)"""
+    if input_format not in MP4_FAMILY_FORMATS:
+        return True
+
+    offset = 0
+    total = len(audio_data)
+    while offset + 8 <= total:
+        size, box_type = struct.unpack('>I4s', audio_data[offset:offset + 8])
+        if box_type == b'moov':
+            return True
+        if box_type == b'mdat':
+            # 데이터 박스가 먼저 나오면 ffmpeg가 뒤로 seek 해야 함
+            return False
+        if size == 1:
+            if offset + 16 > total:
+                break
+            size = struct.unpack('>Q', audio_data[offset + 8:offset + 16])[0]
+        elif size == 0:
+            break
+        if size < 8:
+            break
+        offset += size
+    return False
+
+
+class AudioConverter:
+    """미리 띄워 둔 ffmpeg 워커 풀과 동시 실행 제한을 가진 변환기"""
+
+    def __init__(self, pool_size=2, max_concurrent=4, timeout=10.0,
+                 queue_timeout=2.0, filter_chain=DEFAULT_FILTER_CHAIN,
+                 ffmpeg_bin='ffmpeg'):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.filter_chain = filter_chain
+        self.ffmpeg_bin = ffmpeg_bin
+
+        self._pool = queue.Queue(maxsize=max(pool_size, 1))
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._stopped = threading.Event()
+        self._refill_thread = None
+
+    def start(self):
+        """워커 풀 채우기 스레드 시작"""
+        if self.pool_size <= 0 or self._refill_thread is not None:
+            return
+        self._refill_thread = threading.Thread(
+            target=self._refill_loop, name='ffmpeg-pool', daemon=True
+        )
+        self._refill_thread.start()
+
+    def self_test(self):
+        """짧은 8kHz 무음 WAV를 ffmpeg로 변환해 보고 성공 여부 반환 (준비 상태 점검용)"""
+        silence = pcm_to_wav(b'\x00\x00' * 800, sample_rate=8000)
+        return len(self.convert(silence, 'wav')) > 44
+
+    def stop(self):
+        """대기 중인 워커 정리"""
+        self._stopped.set()
+        while True:
+            try:
+                proc = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._kill(proc)
+
+    def _command(self, input_path='pipe:0', filter_chain=None):
+        chain = self.filter_chain if filter_chain is None else filter_chain
+        cmd = [self.ffmpeg_bin, '-hide_banner', '-loglevel', 'error', '-i', input_path]
+        if chain:
+            cmd += ['-af', chain]
+        cmd += [
+            '-ar', str(TARGET_SAMPLE_RATE),  # 샘플링 레이트 16kHz
+            '-ac', '1',                      # 모노 채널
+            '-f', 's16le',                   # LINEAR16 raw PCM (헤더는 직접 작성)
+            'pipe:1',
+        ]
+        return cmd
+
+    def _spawn(self, input_path='pipe:0', filter_chain=None):
+        return subprocess.Popen(
+            self._command(input_path, filter_chain),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def _refill_loop(self):
+        # put()은 풀이 가득 차면 블록되므로 항상 pool_size개의 워커가 대기함
+        while not self._stopped.is_set():
+            try:
+                proc = self._spawn()
+            except OSError as e:
+                logger.error("❌ ffmpeg 워커 생성 실패: %s", e)
+                self._stopped.wait(5.0)
+                continue
+            self._pool.put(proc)
+
+    def _take_worker(self):
+        while True:
+            try:
+                proc = self._pool.get_nowait()
+            except queue.Empty:
+                return self._spawn()
+            if proc.poll() is None:
+                return proc
+            # 이미 종료된 워커는 버림
+            self._kill(proc)
+
+    @staticmethod
+    def _kill(proc):
+        try:
+            proc.kill()
+            proc.communicate(timeout=1.0)
+        except Exception:
+            pass
+
+    def convert(self, audio_data, input_format='m4a', filter_chain=None, preprocess=None):
+        """오디오 바이트를 16kHz 모노 LINEAR16 WAV 바이트로 변환
+
+        preprocess(PCM 바이트, 샘플레이트, 채널 수) → 16kHz 모노 PCM 바이트가 있으면 필터 체인 대신 사용
+        (이 경우 filter_chain을 따로 주지 않으면 ffmpeg는 필터 없이 디코딩/리샘플만 함)
+        """
+        if preprocess is not None:
+            if input_format == 'wav':
+                decoded = read_wav_pcm(audio_data)
+                if decoded is not None:
+                    return pcm_to_wav(preprocess(*decoded))
+            elif input_format == 'pcm':
+                return pcm_to_wav(preprocess(audio_data, TARGET_SAMPLE_RATE, 1))
+            if filter_chain is None and self.filter_chain:
+                filter_chain = ''
+        elif input_format == 'wav':
+            wav_content = decode_wav_in_process(audio_data)
+            if wav_content is not None:
+                return wav_content
+        elif input_format == 'pcm':
+            # raw 16kHz 모노 s16le 로 간주
+            return pcm_to_wav(audio_data)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ConversionBusy('동시 변환 한도 초과')
+        try:
+            pcm_bytes = self._run_ffmpeg(audio_data, input_format, filter_chain)
+        finally:
+            self._slots.release()
+        if preprocess is not None:
+            pcm_bytes = preprocess(pcm_bytes, TARGET_SAMPLE_RATE, 1)
+        return pcm_to_wav(pcm_bytes)
+
+    def _run_ffmpeg(self, audio_data, input_format, filter_chain):
+        temp_input_path = None
+        try:
+            if is_pipe_decodable(audio_data, input_format):
+                if filter_chain is None:
+                    proc = self._take_worker()
+                else:
+                    proc = self._spawn(filter_chain=filter_chain)
+                stdin_data = audio_data
+            else:
+                # moov가 뒤에 있는 MP4는 seek 가능한 입력이 필요 (가능하면 메모리 기반 /dev/shm 사용)
+                temp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+                with tempfile.NamedTemporaryFile(suffix=f'.{input_format}', dir=temp_dir,
+                                                 delete=False) as temp_input:
+                    temp_input.write(audio_data)
+                    temp_input_path = temp_input.name
+                proc = self._spawn(temp_input_path, filter_chain)
+                stdin_data = None
+
+            try:
+                pcm_bytes, stderr = proc.communicate(input=stdin_data, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                self._kill(proc)
+                raise ConversionTimeout(f'ffmpeg 시간 초과 ({self.timeout:.1f}s)')
+
+            if proc.returncode != 0 or not pcm_bytes:
+                message = stderr.decode('utf-8', errors='replace').strip()[-300:]
+                raise ConversionError(f'ffmpeg 실패 (code={proc.returncode}): {message}')
+
+            return pcm_bytes
+        except OSError as e:
+            raise ConversionError(f'ffmpeg 실행 실패: {e}')
+        finally:
+            if temp_input_path:
+                try:
+                    os.unlink(temp_input_path)
+                except OSError:
+                    pass
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+프로세스 안 오디오 전처리 (NumPy)
+ffmpeg 필터 체인(highpass → lowpass → volume → compand) 대신 디코딩된 PCM을 직접 처리합니다.
+    리샘플(16kHz 모노) + 대역 통과 → 음량 정규화(AGC) → compand (다이나믹 레인지 압축)
+- 리샘플과 대역 통과는 FFT 한 번으로 처리 (대역 제한 리샘플 + 버터워스 크기 응답, 위상 왜곡 없음)
+- AGC는 클립의 음성 레벨(상위 프레임)을 목표 레벨에 맞추되, 잡음 바닥과의 차이가 min_snr_db보다 작은
+  클립(잡음만 있는 클립)은 키우지 않습니다. compand도 잡음 바닥 근처 프레임은 끌어올리지 않으므로
+  생활 소음(-50 dBFS)이 VAD 기준을 넘지 않습니다 (기존 필터 체인은 잡음도 음성처럼 키움).
+- 프로필(기기/클라이언트별 설정)은 요청의 audio_profile 옵션 또는 X-Audio-Profile 헤더로 고릅니다.
+- 작업 버퍼는 스레드마다 한 번 만들어 재사용합니다 (더 긴 클립이 오면 늘림).
+"""
+
+import json
+import math
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+HOP_MS = 10                # 레벨 측정 프레임 (10ms)
+PAD_SECONDS = 0.064        # FFT 순환 컨볼루션의 앞뒤 겹침을 막는 0 패딩
+
+# compand 전달 곡선 (입력 dB, 출력 dB) - 기존 ffmpeg 체인의 -90/-60, -40/-30, -20/-10, 0/0
+DEFAULT_COMPAND = ((-90.0, -60.0), (-40.0, -30.0), (-20.0, -10.0), (0.0, 0.0))
+
+
+class PreprocessProfile:
+    """전처리 설정 하나 (None/0이면 해당 단계 생략)"""
+
+    FIELDS = ('highpass_hz', 'lowpass_hz', 'filter_order', 'target_db', 'max_gain_db', 'min_snr_db',
+              'compand', 'gate_margin_db', 'attack_ms', 'release_ms')
+
+    def __init__(self, name, highpass_hz=200.0, lowpass_hz=3000.0, filter_order=2, target_db=-20.0,
+                 max_gain_db=9.5, min_snr_db=12.0, compand=DEFAULT_COMPAND, gate_margin_db=6.0,
+                 attack_ms=20.0, release_ms=300.0):
+        self.name = name
+        self.highpass_hz = highpass_hz          # 저역 차단 (바람/진동 소음)
+        self.lowpass_hz = lowpass_hz            # 고역 차단
+        self.filter_order = filter_order        # 버터워스 차수 (ffmpeg highpass/lowpass 기본값은 2)
+        self.target_db = target_db              # AGC 목표 음성 레벨 (프레임 RMS dBFS)
+        self.max_gain_db = max_gain_db          # AGC 최대 증폭 (기존 volume=3.0 ≈ 9.5dB)
+        self.min_snr_db = min_snr_db            # 음성 레벨 - 잡음 바닥이 이보다 작으면 AGC 증폭 안 함
+        self.compand = tuple(tuple(point) for point in compand) if compand else None
+        self.gate_margin_db = gate_margin_db    # 잡음 바닥 + 이 값보다 조용한 프레임은 compand로 키우지 않음
+        self.attack_ms = attack_ms
+        self.release_ms = release_ms
+
+    @classmethod
+    def from_dict(cls, name, values, base=None):
+        """JSON 설정 → 프로필 (base의 값 위에 덮어씀, 모르는 키는 ValueError)"""
+        unknown = set(values) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"전처리 프로필 '{name}'에 알 수 없는 항목: {', '.join(sorted(unknown))}")
+        merged = base.to_dict() if base is not None else {}
+        merged.update(values)
+        return cls(name, **merged)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+# 기본 제공 프로필 - default 위에 덮어쓰는 값
+BUILTIN_PROFILES = {
+    'default': {},
+    # 작은 마이크 / 먼 거리 녹음: 더 많이 키움
+    'quiet_mic': {'target_db': -18.0, 'max_gain_db': 20.0},
+    # 입 가까이 대고 말하는 기기 (헤드셋 등): 증폭/압축 최소화
+    'near_field': {'max_gain_db': 3.0, 'compand': ((-60.0, -55.0), (-20.0, -15.0), (0.0, 0.0))},
+    # 넓은 대역 STT 모델용 (전화 대역으로 자르지 않음)
+    'wideband': {'highpass_hz': 80.0, 'lowpass_hz': 7600.0},
+    # 리샘플/다운믹스만
+    'raw': {'highpass_hz': None, 'lowpass_hz': None, 'max_gain_db': 0.0, 'compand': None},
+}
+
+
+def build_profiles(overrides=None):
+    """기본 제공 프로필 + overrides({이름: {항목: 값}}) → {이름: PreprocessProfile}"""
+    default = PreprocessProfile('default')
+    profiles = {}
+    for name, values in list(BUILTIN_PROFILES.items()) + list((overrides or {}).items()):
+        base = profiles.get(name, default)
+        profiles[name] = PreprocessProfile.from_dict(name, values, base=base)
+    return profiles
+
+
+def load_profiles(path=None):
+    """프로필 JSON 파일({이름: {항목: 값}})을 읽어 기본 제공 프로필과 합침 (path가 없으면 기본 제공만)"""
+    if not path:
+        return build_profiles()
+    with open(path, 'r', encoding='utf-8') as f:
+        return build_profiles(json.load(f))
+
+
+def _next_fast_len(n):
+    """n 이상인 가장 작은 2·3·5-smooth 수 (FFT가 빠른 길이)"""
+    best = 1 << max(0, (n - 1).bit_length())
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            value = power35
+            while value < n:
+                value *= 2
+            best = min(best, value)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+def _fft_length(length, sample_rate, target_rate):
+    """입력 FFT 길이 - 출력 길이(n × target / sample_rate)가 정수가 되도록 step의 배수로 맞춤"""
+    step = sample_rate // math.gcd(sample_rate, target_rate)
+    return _next_fast_len(-(-length // step)) * step
+
+
+@lru_cache(maxsize=64)
+def _band_response(n_fft, sample_rate, n_bins, highpass_hz, lowpass_hz, order):
+    """rfft 빈 n_bins개에 곱할 버터워스 대역 통과 크기 응답 (float32)"""
+    freqs = np.arange(n_bins, dtype=np.float64) * (sample_rate / n_fft)
+    response = np.ones(n_bins, dtype=np.float64)
+    if highpass_hz:
+        with np.errstate(divide='ignore'):
+            response /= np.sqrt(1.0 + (highpass_hz / freqs) ** (2 * order))
+    if lowpass_hz:
+        response /= np.sqrt(1.0 + (freqs / lowpass_hz) ** (2 * order))
+    return response.astype(np.float32)
+
+
+class _Workspace(threading.local):
+    """스레드별 재사용 버퍼"""
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, size, dtype):
+        buffer = self.buffers.get(name)
+        if buffer is None or len(buffer) < size:
+            buffer = np.empty(1 << max(0, (size - 1).bit_length()), dtype=dtype)
+            self.buffers[name] = buffer
+        return buffer[:size]
+
+
+class AudioPreprocessor:
+    """PCM 바이트 → 전처리된 16kHz 모노 16bit PCM 바이트"""
+
+    def __init__(self, profiles=None, default_profile='default', target_rate=TARGET_SAMPLE_RATE):
+        self.profiles = profiles if profiles is not None else build_profiles()
+        if default_profile not in self.profiles:
+            raise ValueError(f"기본 전처리 프로필이 없습니다: {default_profile}")
+        self.default_profile = default_profile
+        self.target_rate = target_rate
+        self._workspace = _Workspace()
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.unknown_profiles = 0
+        self.noise_only = 0
+
+    def profile(self, name=None):
+        """이름에 맞는 프로필 - 없는 이름이면 기본 프로필"""
+        if name and name in self.profiles:
+            return self.profiles[name]
+        if name:
+            with self._lock:
+                self.unknown_profiles += 1
+        return self.profiles[self.default_profile]
+
+    def process(self, pcm_bytes, sample_rate=TARGET_SAMPLE_RATE, channels=1, profile=None):
+        """16bit PCM(인터리브) 바이트 → 전처리된 16kHz 모노 16bit PCM 바이트"""
+        samples = np.frombuffer(pcm_bytes, dtype='<i2', count=len(pcm_bytes) // 2)
+        y = self.process_samples(samples, sample_rate, channels, profile)
+        out = self._workspace.get('out', len(y), np.int16)
+        np.multiply(y, 32767.0, out=y)
+        np.clip(y, -32768.0, 32767.0, out=y)
+        np.copyto(out, y, casting='unsafe')
+        return out.tobytes()
+
+    def process_samples(self, samples, sample_rate=TARGET_SAMPLE_RATE, channels=1, profile=None):
+        """int16 샘플(인터리브) → 전처리된 float32 샘플 (-1~1, 작업 버퍼의 뷰이므로 다음 호출 전에 사용)"""
+        selected = self.profile(profile)
+        frames = len(samples) // channels
+        mono = self._workspace.get('mono', frames, np.float32)
+        if channels > 1:
+            np.mean(samples[:frames * channels].reshape(frames, channels), axis=1, dtype=np.float32, out=mono)
+        else:
+            np.copyto(mono, samples[:frames], casting='unsafe')
+        mono *= 1.0 / 32768.0
+
+        y = self._resample_filter(mono, sample_rate, selected)
+        noise_only = self._apply_level(y, selected)
+        with self._lock:
+            self.counts[selected.name] = self.counts.get(selected.name, 0) + 1
+            if noise_only:
+                self.noise_only += 1
+        return y
+
+    def _resample_filter(self, x, sample_rate, profile):
+        """대역 제한 리샘플 + 대역 통과 (FFT 한 번) → 작업 버퍼의 float32 출력"""
+        length = len(x)
+        out_length = int(round(length * self.target_rate / sample_rate))
+        if sample_rate == self.target_rate and not profile.highpass_hz and not profile.lowpass_hz:
+            y = self._workspace.get('signal', out_length, np.float32)
+            np.copyto(y, x)
+            return y
+
+        n_in = _fft_length(length + int(PAD_SECONDS * sample_rate), sample_rate, self.target_rate)
+        n_out = n_in * self.target_rate // sample_rate
+        padded = self._workspace.get('padded', n_in, np.float32)
+        padded[:length] = x
+        padded[length:] = 0.0
+
+        spectrum = np.fft.rfft(padded)
+        n_bins = min(len(spectrum), n_out // 2 + 1)
+        response = _band_response(n_in, sample_rate, n_bins, profile.highpass_hz, profile.lowpass_hz,
+                                  profile.filter_order)
+        if n_bins == n_out // 2 + 1:
+            resampled = spectrum[:n_bins]
+        else:
+            # 업샘플: 원래 나이퀴스트 위 빈은 0
+            resampled = np.zeros(n_out // 2 + 1, dtype=spectrum.dtype)
+        resampled[:n_bins] = spectrum[:n_bins] * response
+        y = self._workspace.get('signal', out_length, np.float32)
+        y[:] = np.fft.irfft(resampled, n=n_out)[:out_length]
+        if n_out != n_in:
+            y *= n_out / n_in
+        return y
+
+    def _apply_level(self, y, profile):
+        """AGC + compand (제자리) - 잡음만 있는 클립이면 True"""
+        hop = self.target_rate * HOP_MS // 1000
+        n_frames = len(y) // hop
+        if n_frames < 2 or (not profile.max_gain_db and not profile.compand):
+            return False
+
+        frames = y[:n_frames * hop].reshape(n_frames, hop)
+        energy = np.einsum('ij,ij->i', frames, frames) / hop
+        frame_db = 10.0 * np.log10(energy + 1e-10)
+        noise_floor, speech_level = np.percentile(frame_db, (10, 95))
+
+        # AGC: 클립 전체에 하나의 이득 (잡음만 있으면 키우지 않음)
+        noise_only = speech_level - noise_floor < profile.min_snr_db
+        agc_db = 0.0
+        if not noise_only and profile.max_gain_db:
+            agc_db = float(min(profile.target_db - speech_level, profile.max_gain_db))
+
+        gain_db = np.full(n_frames, agc_db, dtype=np.float64)
+        if profile.compand:
+            envelope = self._envelope(frame_db + agc_db, profile)
+            points_in, points_out = zip(*profile.compand)
+            compand_db = np.interp(envelope, points_in, points_out) - envelope
+            # 잡음 바닥 근처 프레임은 끌어올리지 않음 (줄이는 것은 허용)
+            quiet = envelope < noise_floor + agc_db + profile.gate_margin_db
+            if noise_only:
+                quiet[:] = True
+            np.minimum(compand_db, 0.0, out=compand_db, where=quiet)
+            gain_db += compand_db
+
+        if not gain_db.any():
+            return noise_only
+        # 프레임 중심 사이를 선형 보간한 샘플별 이득
+        centers = np.arange(n_frames, dtype=np.float32) * hop + hop / 2.0
+        positions = self._workspace.get('positions', len(y), np.float32)
+        if positions[-1] != len(y) - 1:
+            positions[:] = np.arange(len(y), dtype=np.float32)
+        y *= np.interp(positions, centers, np.power(10.0, gain_db / 20.0)).astype(np.float32)
+        return noise_only
+
+    @staticmethod
+    def _envelope(level_db, profile):
+        """프레임 레벨(dB)에 어택/릴리즈 1차 평활 적용"""
+        attack = math.exp(-HOP_MS / max(profile.attack_ms, 1e-3))
+        release = math.exp(-HOP_MS / max(profile.release_ms, 1e-3))
+        envelope = np.empty_like(level_db)
+        current = level_db[0]
+        for index, level in enumerate(level_db.tolist()):
+            coefficient = attack if level > current else release
+            current = coefficient * current + (1.0 - coefficient) * level
+            envelope[index] = current
+        return envelope
+
+    def stats(self):
+        with self._lock:
+            return {
+                'default_profile': self.default_profile,
+                'profiles': sorted(self.profiles),
+                'processed': dict(self.counts),
+                'noise_only_clips': self.noise_only,
+                'unknown_profiles': self.unknown_profiles,
+            }
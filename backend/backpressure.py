@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncio 서버 모드의 단계별 동시 실행 제한 + 백프레셔
+단계(ffmpeg 변환, STT, LLM, TTS 등)마다 동시 실행 수와 대기열 길이를 제한하고,
+대기열이 가득 차면 기다리지 않고 바로 Overloaded를 던져 503/429 + Retry-After로 응답하게 합니다.
+블로킹 작업은 단계 전용 스레드 풀(크기 = 동시 실행 수)로 넘기므로 스레드 수도 제한됩니다.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """단계 대기열이 가득 참 - status / retry_after로 응답"""
+
+    def __init__(self, stage, status=503, retry_after=1):
+        super().__init__(f"'{stage}' 단계가 혼잡합니다. 잠시 후 다시 시도하세요.")
+        self.stage = stage
+        self.status = status
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """동시 실행 max_concurrent + 대기 max_queue 까지만 허용하는 비동기 리미터
+
+    사용법:
+        async with limiter:
+            ...
+        result = await limiter.run_in_thread(blocking_func, arg)
+    """
+
+    def __init__(self, name, max_concurrent, max_queue=None, queue_timeout=None,
+                 retry_after=1, status=503):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_concurrent * 2 if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.status = status
+
+        self._semaphore = None  # 이벤트 루프 안에서 처음 사용할 때 생성
+        self._executor = None
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _overloaded(self):
+        self.rejected += 1
+        return Overloaded(self.name, self.status, self.retry_after)
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        # 빈 자리가 없고 대기열도 가득 차면 바로 거절
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise self._overloaded()
+
+        self.waiting += 1
+        try:
+            if self.queue_timeout is None:
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._overloaded()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    async def run_in_thread(self, func, *args, **kwargs):
+        """슬롯을 잡은 뒤 블로킹 함수를 단계 전용 스레드 풀에서 실행"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent, thread_name_prefix=f'stage-{self.name}'
+            )
+        async with self:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def stats(self):
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
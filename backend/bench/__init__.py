@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""백엔드 마이크로 벤치마크 / 부하 테스트 도구"""
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+음성 인식 후처리 마이크로 벤치마크 - 기존 구현(매 호출 dict 생성 + 패턴별 search/sub)과
+CorrectionEngine(단일 alternation 정규식)의 호출당 비용 비교
+
+사용법:
+    python -m backend.bench.bench_corrections --repeat 20000
+"""
+
+import argparse
+import re
+import timeit
+
+from backend.corrections import CorrectionEngine, KeywordMatcher
+from backend.intent_rules import SCROLL_DOWN_KEYWORDS, SCROLL_KEYWORDS, SCROLL_UP_KEYWORDS
+
+# 실제 로그에서 자주 보이는 인식 결과 형태
+TRANSCRIPTS = [
+    '많이 내려줘',
+    '스크. 내려',
+    '화면 올.',
+    '조금만 올려 줘.',
+    '네이버 열어줘',
+    '로그인 버튼 클릭',
+    '검색창에 오늘 날씨 입력해줘.',
+    '하이프로 유튜브 실행해줘',
+    '스크롤 내.',
+    '첫 번째 검색 결과 보여줘',
+    '아래로 천천히 스크롤 해 줘',
+    '설정 화면으로 가줘',
+]
+
+
+def legacy_post_process(transcript):
+    """기존 test_server.post_process_transcript 구현"""
+    if not transcript:
+        return transcript
+
+    corrections = {
+        r'\b스크\.?\b': '스크롤',
+        r'\b스크롤\.?\b': '스크롤',
+        r'\b내\.?\b': '내려',
+        r'\b올\.?\b': '올려',
+        r'\b내려\.?\b': '내려',
+        r'\b올려\.?\b': '올려',
+        r'\b열어줘\b': '열어줘',
+        r'\b실행해줘\b': '실행해줘',
+        r'\b보여줘\b': '보여줘',
+        r'\b클릭\b': '클릭',
+        r'\b버튼\b': '버튼',
+        r'\b검색\b': '검색',
+        r'\b로그인\b': '로그인',
+        r'\b네이버\b': '네이버',
+    }
+
+    corrected = transcript
+    for wrong_pattern, correct in corrections.items():
+        if re.search(wrong_pattern, corrected):
+            corrected = re.sub(wrong_pattern, correct, corrected)
+    return re.sub(r'\.$', '', corrected)
+
+
+def legacy_scroll_keywords(command):
+    """기존 postprocess_ai_response의 키워드 스캔"""
+    found = set()
+    if any(word in command for word in SCROLL_KEYWORDS):
+        found.add('scroll')
+    if any(word in command for word in SCROLL_UP_KEYWORDS):
+        found.add('up')
+    if any(word in command for word in SCROLL_DOWN_KEYWORDS):
+        found.add('down')
+    return found
+
+
+def _per_call_us(func, repeat):
+    seconds = timeit.timeit(lambda: [func(text) for text in TRANSCRIPTS], number=repeat)
+    return seconds / (repeat * len(TRANSCRIPTS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='후처리 마이크로 벤치마크')
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = CorrectionEngine()
+    matcher = KeywordMatcher({'scroll': SCROLL_KEYWORDS, 'up': SCROLL_UP_KEYWORDS, 'down': SCROLL_DOWN_KEYWORDS})
+
+    # 결과가 기존 구현과 같은지 먼저 확인
+    for text in TRANSCRIPTS:
+        expected, actual = legacy_post_process(text), engine.apply(text)
+        assert expected == actual, f'{text!r}: {expected!r} != {actual!r}'
+        assert legacy_scroll_keywords(text) == matcher.find(text), text
+
+    rows = [
+        ('post_process (기존)', _per_call_us(legacy_post_process, args.repeat)),
+        ('post_process (엔진)', _per_call_us(engine.apply, args.repeat)),
+        ('scroll 키워드 (기존)', _per_call_us(legacy_scroll_keywords, args.repeat)),
+        ('scroll 키워드 (매처)', _per_call_us(matcher.find, args.repeat)),
+    ]
+    print(f"📊 문장 {len(TRANSCRIPTS)}개 × {args.repeat}회")
+    for name, micros in rows:
+        print(f"   {name:<22} {micros:8.2f} µs/호출")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+오디오 지문 벤치마크 - 같은 클립의 재인코딩/음량 변화와 서로 다른 클립 사이의 비트 오류율(BER) 분포,
+지문 계산 비용과 캐시 조회 비용을 측정합니다. 유사 일치 임계값(TRANSCRIPT_CACHE_MAX_BER)을 정할 때 씁니다.
+
+사용법:
+    python -m backend.bench.bench_fingerprint
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from backend.audio_convert import AudioConverter
+from backend.bench.clips import (
+    CLIP_KINDS, DEFAULT_CLIP_DIR, _encode, build_corpus, samples_to_wav, synthesize_speech_like
+)
+from backend.fingerprint import TranscriptCache, bit_error_rate, fingerprint_wav
+
+
+def _summary(values):
+    if not values:
+        return '-'
+    return f'최소 {min(values):.3f} / 평균 {np.mean(values):.3f} / 최대 {max(values):.3f} ({len(values)}쌍)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='오디오 지문 BER / 비용 벤치마크')
+    parser.add_argument('--clip-dir', default=DEFAULT_CLIP_DIR)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    converter = AudioConverter(pool_size=0)
+    clips = [clip for clip in build_corpus(args.clip_dir) if clip.kind in CLIP_KINDS]
+    fingerprints = {}
+    for clip in clips:
+        wav_content = converter.convert(clip.data, clip.audio_format)
+        fingerprints[(clip.kind, clip.audio_format)] = fingerprint_wav(wav_content)
+
+    # 같은 클립: 형식(코덱 / 서버 필터 체인 경로)만 다름 - 잡음만 있는 클립은 따로 (일치하지 않는 것이 정상)
+    same, same_noise, different = [], [], []
+    for (a_key, a), (b_key, b) in itertools.combinations(fingerprints.items(), 2):
+        if abs(a.duration - b.duration) > 0.1 * max(a.duration, b.duration):
+            continue
+        if a_key[0] != b_key[0]:
+            different.append(bit_error_rate(a, b))
+        elif CLIP_KINDS[a_key[0]][1] > 0:
+            same.append(bit_error_rate(a, b))
+        else:
+            same_noise.append(bit_error_rate(a, b))
+
+    # 같은 클립을 같은 형식으로 음량만 바꿔 다시 인코딩 (앱이 같은 녹음을 다시 보내는 경우)
+    reencoded = []
+    with tempfile.TemporaryDirectory() as directory:
+        for seed, kind in enumerate(CLIP_KINDS):
+            duration, speech_seconds, noise = CLIP_KINDS[kind]
+            if not speech_seconds:
+                continue
+            samples = (synthesize_speech_like(duration, speech_seconds, noise, seed) * 0.8).astype(np.int16)
+            for audio_format in ('m4a', '3gp', 'webm'):
+                if (kind, audio_format) not in fingerprints:
+                    continue
+                path = os.path.join(directory, f'{kind}.{audio_format}')
+                _encode(samples_to_wav(samples), audio_format, path, 'ffmpeg')
+                with open(path, 'rb') as f:
+                    again = fingerprint_wav(converter.convert(f.read(), audio_format))
+                reencoded.append(bit_error_rate(fingerprints[(kind, audio_format)], again))
+
+    # 같은 종류 다른 녹음 (시드만 다름) + 음량 변화
+    regenerated, gain = [], []
+    for seed, kind in enumerate(('wakeword', 'command', 'long_command')):
+        duration, speech_seconds, noise = CLIP_KINDS[kind]
+        base = synthesize_speech_like(duration, speech_seconds, noise, seed)
+        other = synthesize_speech_like(duration, speech_seconds, noise, seed + 100)
+        base_fp = fingerprint_wav(samples_to_wav(base))
+        regenerated.append(bit_error_rate(base_fp, fingerprint_wav(samples_to_wav(other))))
+        for factor in (0.5, 2.0):
+            scaled = np.clip(base.astype(np.float32) * factor, -32768, 32767).astype(np.int16)
+            gain.append(bit_error_rate(base_fp, fingerprint_wav(samples_to_wav(scaled))))
+
+    print(f"🔎 BER (임계값 {args.threshold})")
+    print(f"   같은 클립 / 다른 형식:   {_summary(same)}")
+    print(f"   같은 클립 / 음량 ×0.5, ×2: {_summary(gain)}")
+    print(f"   같은 클립 / 같은 형식 재인코딩: {_summary(reencoded)}")
+    print(f"   같은 잡음 클립 / 다른 형식: {_summary(same_noise)}")
+    print(f"   같은 종류 / 다른 녹음:   {_summary(regenerated)}")
+    print(f"   다른 클립:               {_summary(different)}")
+    false_matches = sum(1 for value in different + regenerated if value <= args.threshold)
+    missed = sum(1 for value in same + gain + reencoded if value > args.threshold)
+    print(f"   임계값 기준 오탐 {false_matches}건, 놓침 {missed}건")
+
+    wav_content = samples_to_wav(synthesize_speech_like(*CLIP_KINDS['command'], seed=1))
+    number = 200
+    seconds = timeit.timeit(lambda: fingerprint_wav(wav_content), number=number)
+    print(f"⏱️ 지문 계산 (5초 클립): {seconds / number * 1e3:.3f}ms/회")
+
+    cache = TranscriptCache(max_entries=256)
+    for seed in range(256):
+        samples = synthesize_speech_like(2.0, 0.9, 0.00015, seed + 1000)
+        cache.put(fingerprint_wav(samples_to_wav(samples)), 'command', f'문장 {seed}', 0.9, [])
+    probe = fingerprint_wav(samples_to_wav(synthesize_speech_like(2.0, 0.9, 0.00015, 9999)))
+    seconds = timeit.timeit(lambda: cache.lookup(probe, 'command'), number=number)
+    print(f"⏱️ 캐시 조회 (256개 색인, 미스): {seconds / number * 1e3:.3f}ms/회")
+
+
+if __name__ == '__main__':
+    main()
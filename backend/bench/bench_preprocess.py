@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""
+오디오 전처리 벤치마크 - 기존 ffmpeg 필터 체인과 프로세스 안 NumPy 전처리(backend.audio_preprocess)의
+변환 시간과 인식 정확도를 비교합니다.
+- 속도: 형식별 변환 시간 (ffmpeg 워커 풀 없이 매번 실행, NumPy 전처리 자체 시간은 따로)
+- 정확도(대리 지표): VAD 음성 여부 판정, 음성 구간 경계 오차, 잡음만 있는 클립의 출력 레벨
+- 정확도(STT): --references 디렉터리(오디오 + 같은 이름의 .txt 정답)와 --stt-url 또는 --vosk-model을
+  지정하면 경로별 글자 오류율(CER)을 잽니다.
+
+사용법:
+    python -m backend.bench.bench_preprocess
+    python -m backend.bench.bench_preprocess --profiles default,quiet_mic --references ./recordings \\
+        --vosk-model ./vosk-model-small-ko-0.22
+"""
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from backend.audio_convert import DEFAULT_FILTER_CHAIN, AudioConverter
+from backend.audio_preprocess import AudioPreprocessor
+from backend.bench.clips import CLIP_KINDS, DEFAULT_CLIP_DIR, _encode, build_corpus, synthesize_speech_like
+from backend.vad import EnergyVad
+
+# 코퍼스에 더해 쓰는 경우: 생활 소음 속 명령, 기기마다 다른 WAV 샘플레이트/채널
+NOISY_COMMAND = (5.0, 2.4, 0.003)
+WAV_VARIANTS = ((44100, 2), (8000, 1))
+
+
+class Case:
+    """벤치마크 입력 하나 (정답 음성 구간은 초 단위, 음성이 없으면 None)"""
+
+    def __init__(self, name, data, audio_format, duration, speech_seconds):
+        self.name = name
+        self.data = data
+        self.audio_format = audio_format
+        self.speech = None
+        if speech_seconds:
+            start = (duration - speech_seconds) / 2.0
+            self.speech = (start, start + speech_seconds)
+
+
+def _wav_bytes(samples, sample_rate, channels):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def build_cases(clip_dir):
+    cases = []
+    for clip in build_corpus(clip_dir):
+        if clip.kind in CLIP_KINDS:
+            _, speech_seconds, _ = CLIP_KINDS[clip.kind]
+            cases.append(Case(clip.name, clip.data, clip.audio_format, clip.duration, speech_seconds))
+
+    duration, speech_seconds, noise = NOISY_COMMAND
+    noisy = synthesize_speech_like(duration, speech_seconds, noise, seed=7)
+    cases.append(Case('noisy_command.wav', _wav_bytes(noisy, 16000, 1), 'wav', duration, speech_seconds))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'noisy_command.m4a')
+        _encode(_wav_bytes(noisy, 16000, 1), 'm4a', path, 'ffmpeg')
+        with open(path, 'rb') as f:
+            cases.append(Case('noisy_command.m4a', f.read(), 'm4a', duration, speech_seconds))
+
+    duration, speech_seconds, noise = CLIP_KINDS['command']
+    command = synthesize_speech_like(duration, speech_seconds, noise, seed=2).astype(np.float64)
+    for sample_rate, channels in WAV_VARIANTS:
+        t = np.arange(int(duration * sample_rate)) / sample_rate
+        resampled = np.interp(t, np.arange(len(command)) / 16000.0, command).astype(np.int16)
+        interleaved = np.repeat(resampled, channels)
+        cases.append(Case(f'command_{sample_rate // 1000}k_{channels}ch.wav',
+                          _wav_bytes(interleaved, sample_rate, channels), 'wav', duration, speech_seconds))
+    return cases
+
+
+def char_error_rate(reference, hypothesis):
+    """공백을 뺀 글자 단위 편집 거리 / 정답 길이"""
+    reference = reference.replace(' ', '')
+    hypothesis = (hypothesis or '').replace(' ', '')
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != hyp_char)))
+        previous = current
+    return previous[-1] / max(len(reference), 1)
+
+
+def load_references(directory):
+    """(이름, 오디오 바이트, 형식, 정답 문장) 목록 - 오디오 파일 옆의 같은 이름 .txt가 정답"""
+    references = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        transcript_path = os.path.join(directory, stem + '.txt')
+        if extension == '.txt' or not os.path.exists(transcript_path):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            data = f.read()
+        with open(transcript_path, 'r', encoding='utf-8') as f:
+            references.append((name, data, extension.lstrip('.').lower(), f.read().strip()))
+    return references
+
+
+def create_stt_backend(args):
+    if args.stt_url:
+        from backend.stt_backends import HTTPSTTBackend
+        return HTTPSTTBackend(args.stt_url)
+    if args.vosk_model:
+        from backend.stt_backends import VoskSTTBackend
+        return VoskSTTBackend(args.vosk_model)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ffmpeg 필터 체인 vs NumPy 전처리 속도 / 정확도 비교')
+    parser.add_argument('--clip-dir', default=DEFAULT_CLIP_DIR)
+    parser.add_argument('--profiles', default='default', help='비교할 전처리 프로필 (쉼표 구분)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--references', help='실제 녹음 + 정답 .txt 디렉터리 (STT 정확도)')
+    parser.add_argument('--stt-url', help='HTTP STT 백엔드 URL (STT 정확도)')
+    parser.add_argument('--vosk-model', help='Vosk 모델 경로 (STT 정확도)')
+    args = parser.parse_args()
+
+    ffmpeg_converter = AudioConverter(pool_size=0, filter_chain=DEFAULT_FILTER_CHAIN)
+    decode_converter = AudioConverter(pool_size=0, filter_chain='')
+    preprocessor = AudioPreprocessor()
+    preprocess_seconds = []
+
+    def numpy_path(profile):
+        def preprocess(pcm_bytes, sample_rate, channels):
+            started = time.perf_counter()
+            result = preprocessor.process(pcm_bytes, sample_rate, channels, profile)
+            preprocess_seconds.append(time.perf_counter() - started)
+            return result
+        return lambda data, audio_format: decode_converter.convert(data, audio_format, preprocess=preprocess)
+
+    paths = {'ffmpeg': lambda data, audio_format: ffmpeg_converter.convert(data, audio_format)}
+    for profile in args.profiles.split(','):
+        paths[f'numpy:{profile}'] = numpy_path(profile)
+
+    cases = build_cases(args.clip_dir)
+    vad = EnergyVad()
+    print(f"⏱️ 변환 시간 (중앙값 ms, {args.repeat}회) / VAD 판정 / 음성 구간 경계 오차")
+    print("   (ffmpeg 경로에서 16kHz 모노 WAV는 기존처럼 필터 없이 그대로 통과)")
+    print(f"   {'클립':<24}" + ''.join(f'{name:>28}' for name in paths))
+    totals = {name: {'ms': [], 'correct': 0, 'boundary': [], 'noise_db': []} for name in paths}
+    numpy_only = []
+    for case in cases:
+        row = f"   {case.name:<24}"
+        for name, convert in paths.items():
+            preprocess_seconds.clear()
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                wav_content = convert(case.data, case.audio_format)
+                timings.append(time.perf_counter() - started)
+            if name == 'numpy:' + args.profiles.split(',')[0] and preprocess_seconds:
+                numpy_only.append(statistics.median(preprocess_seconds) * 1e3)
+
+            result = vad.process(wav_content)
+            total = totals[name]
+            total['ms'].append(statistics.median(timings) * 1e3)
+            total['correct'] += result.has_speech == (case.speech is not None)
+            cell = f"{total['ms'][-1]:.1f}ms "
+            if case.speech is None:
+                with wave.open(io.BytesIO(wav_content), 'rb') as wav_file:
+                    pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2') / 32768.0
+                total['noise_db'].append(10 * np.log10(np.mean(pcm * pcm) + 1e-12))
+                cell += f"{'❌ 음성' if result.has_speech else '✅ 무음'} {total['noise_db'][-1]:.0f}dB"
+            elif not result.has_speech:
+                cell += '❌ 무음'
+            else:
+                error = abs(result.start - case.speech[0]) + abs(result.end - case.speech[1])
+                total['boundary'].append(error)
+                cell += f"✅ ±{error:.2f}s"
+            row += f'{cell:>28}'
+        print(row)
+
+    print("📊 요약")
+    for name, total in totals.items():
+        boundary = f"{np.mean(total['boundary']):.2f}s" if total['boundary'] else '-'
+        noise = f"{max(total['noise_db']):.0f}dBFS" if total['noise_db'] else '-'
+        print(f"   {name:<18} 평균 {np.mean(total['ms']):6.1f}ms  VAD 정답 {total['correct']}/{len(cases)}"
+              f"  경계 오차 평균 {boundary}  잡음 클립 최대 레벨 {noise}")
+    if numpy_only:
+        print(f"   (NumPy 전처리 자체: 클립당 평균 {np.mean(numpy_only):.2f}ms)")
+
+    stt = create_stt_backend(args)
+    if not args.references or stt is None:
+        print("🗣️ STT 정확도: --references와 --stt-url 또는 --vosk-model을 지정하면 측정합니다.")
+        return
+    references = load_references(args.references)
+    print(f"🗣️ STT 글자 오류율 ({len(references)}개 녹음)")
+    for name, convert in paths.items():
+        errors = []
+        for _, data, audio_format, transcript in references:
+            result = stt.recognize(convert(data, audio_format))
+            errors.append(char_error_rate(transcript, result.transcript if result else ''))
+        print(f"   {name:<18} CER {np.mean(errors):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+추측 명령 분석 벤치마크 - 스트리밍 인식의 interim 결과로 분석을 미리 시작했을 때
+최종 결과부터 명령 분석 결과까지 걸린 시간을 기존 방식(최종 결과 뒤에 분석 시작)과 비교하고 적중률을 봅니다.
+실제 STT / Gemini 대신 interim 간격, 발화 끝 → 최종 결과 지연(STT 꼬리), Gemini 지연을 흉내 냅니다.
+
+사용법:
+    python -m backend.bench.bench_speculation
+    python -m backend.bench.bench_speculation --llm-ms 800 --tail-ms 500 --repeat 5
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.command_cache import normalize_command_key
+from backend.intent_rules import classify_command
+from backend.speculation import SpeculativeAnalyzer
+
+# (이름, interim 문장들(마지막은 발화 끝 직전), 최종 문장)
+SCENARIOS = [
+    ('rule', ['많이', '많이 내려'], '많이 내려줘'),
+    ('rule-stable', ['많이', '많이 내려줘'], '많이 내려줘'),
+    ('llm', ['날씨', '날씨 알려', '오늘 날씨 알려줘'], '오늘 날씨 알려줘'),
+    ('llm-spacing', ['오늘', '오늘 날씨', '오늘 날씨 알려 주세요'], '오늘 날씨 알려주세요.'),
+    ('llm-changed', ['메일', '메일 보내', '메일 보내줘'], '메일 보내지 마'),
+]
+
+
+def make_analyzer(llm_seconds):
+    def analyze(command, allow_llm, context):
+        result = classify_command(command)
+        if result is not None or not allow_llm:
+            return result
+        time.sleep(llm_seconds)
+        return {'action': 'touch', 'target': command, 'source': 'llm'}
+    return SpeculativeAnalyzer(analyze, normalize_command_key, workers=2)
+
+
+def run(analyzer, interims, final, interim_seconds, tail_seconds, speculate):
+    """최종 결과 도착 → 명령 분석 결과까지 걸린 시간 (초)"""
+    speculation = analyzer.session()
+    for transcript in interims:
+        if speculate:
+            speculation.offer(transcript, stability=0.5)
+        time.sleep(interim_seconds)
+    if speculate:
+        speculation.end_of_speech()
+    time.sleep(tail_seconds)
+    final_at = time.perf_counter()
+    if speculate:
+        speculation.commit(final)
+    else:
+        analyzer.analyze(final, True, None)
+    return time.perf_counter() - final_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description='interim 기반 추측 명령 분석 - 최종 결과 후 명령까지 시간 / 적중률')
+    parser.add_argument('--interim-ms', type=float, default=150, help='interim 결과 간격')
+    parser.add_argument('--tail-ms', type=float, default=300, help='발화 끝 → 최종 결과 지연 (STT 꼬리)')
+    parser.add_argument('--llm-ms', type=float, default=600, help='Gemini 호출 지연')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    baseline = make_analyzer(args.llm_ms / 1e3)
+    speculative = make_analyzer(args.llm_ms / 1e3)
+    print(f"⏱️ 최종 결과 → 명령까지 (중앙값 ms, {args.repeat}회) - interim {args.interim_ms:.0f}ms 간격, "
+          f"STT 꼬리 {args.tail_ms:.0f}ms, Gemini {args.llm_ms:.0f}ms")
+    print(f"   {'시나리오':<14}{'기존':>10}{'추측':>10}{'절약':>10}")
+    for name, interims, final in SCENARIOS:
+        timings = {}
+        for label, analyzer, speculate in (('base', baseline, False), ('spec', speculative, True)):
+            timings[label] = statistics.median(
+                run(analyzer, interims, final, args.interim_ms / 1e3, args.tail_ms / 1e3, speculate)
+                for _ in range(args.repeat)) * 1e3
+        print(f"   {name:<14}{timings['base']:>8.1f}ms{timings['spec']:>8.1f}ms"
+              f"{timings['base'] - timings['spec']:>8.1f}ms")
+
+    stats = speculative.stats()
+    print(f"🎯 적중률 {stats['hit_rate'] * 100:.0f}% (hit {stats['hit']} / miss {stats['miss']}), "
+          f"적중당 절약 {stats['saved_ms_avg']:.1f}ms, 시작한 추측 {stats['started']}건")
+
+
+if __name__ == '__main__':
+    main()
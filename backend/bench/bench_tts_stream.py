@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+TTS 응답 벤치마크 - 기존 방식(답변 전체를 WAV로 합성 → base64 JSON)과 문장 단위 압축 스트림(Ogg/Opus, MP3)의
+첫 오디오까지 걸린 시간(TTFA), 전체 시간, 전송 바이트를 비교합니다.
+실제 엔진 대신 글자 수에 비례해 시간이 걸리는 StubTTSEngine을 쓰며, 매 회 캐시를 비운 상태로 잽니다.
+
+사용법:
+    python -m backend.bench.bench_tts_stream
+    python -m backend.bench.bench_tts_stream --seconds-per-char 0.02 --formats opus --repeat 5
+"""
+
+import argparse
+import base64
+import json
+import statistics
+import time
+
+from backend.storage import MemoryStore
+from backend.tts_stream import CompressedTTSStream, split_sentences
+from backend.tts_worker import StubTTSEngine, TTSWorker
+
+TEXTS = {
+    'short': '네, 알겠습니다.',
+    'medium': '네이버 앱을 열겠습니다. 검색창에 오늘 날씨를 입력하고 검색 버튼을 누르겠습니다.',
+    'long': ('네, 네이버 앱을 열겠습니다. 검색창에 오늘 날씨를 입력하고 검색 버튼을 누르겠습니다. '
+             '잠시만 기다려 주세요! 결과가 나오면 첫 번째 기사를 열어 드릴까요? '
+             '화면을 아래로 스크롤하면 더 많은 결과를 볼 수 있습니다. 다른 도움이 필요하시면 호출어를 말씀해 주세요.'),
+}
+
+
+def run_wav(worker, text):
+    """기존 /tts: 전체 합성이 끝나야 응답 (첫 오디오 = 전체 시간)"""
+    started = time.perf_counter()
+    body = json.dumps({'audio_data': base64.b64encode(worker.synthesize(text)).decode('utf-8'), 'text': text})
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed, len(body.encode('utf-8'))
+
+
+def run_stream(worker, text, audio_format, max_chars):
+    started = time.perf_counter()
+    futures = [worker.submit(sentence) for sentence in split_sentences(text, max_chars)]
+    stream = CompressedTTSStream(futures, audio_format).start()
+    for _ in stream:
+        pass
+    if stream.error is not None:
+        raise stream.error
+    return stream.first_chunk_seconds, time.perf_counter() - started, stream.bytes_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WAV + base64 JSON vs 압축 TTS 스트림 TTFA / 전송량 비교')
+    parser.add_argument('--formats', default='opus,mp3', help='비교할 압축 형식 (쉼표 구분)')
+    parser.add_argument('--seconds-per-char', type=float, default=0.01, help='스텁 엔진 합성 시간 (글자당 초)')
+    parser.add_argument('--max-chars', type=int, default=120, help='문장 분할 최대 글자 수')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    worker = TTSWorker(engine_factory=lambda: StubTTSEngine(args.seconds_per_char))
+    if not worker.start():
+        raise SystemExit('❌ 스텁 TTS 엔진을 시작하지 못했습니다.')
+
+    paths = {'wav(json)': lambda text: run_wav(worker, text)}
+    for audio_format in args.formats.split(','):
+        paths[audio_format] = (lambda fmt: lambda text: run_stream(worker, text, fmt, args.max_chars))(audio_format)
+
+    print(f"⏱️ 첫 오디오 / 전체 시간 (중앙값 ms, {args.repeat}회, 캐시 비움) / 전송 바이트")
+    print(f"   {'문장':<8}" + ''.join(f'{name:>34}' for name in paths))
+    for name, text in TEXTS.items():
+        row = f"   {name:<8}"
+        for runner in paths.values():
+            results = []
+            for _ in range(args.repeat):
+                worker.store = MemoryStore()
+                results.append(runner(text))
+            first = statistics.median(r[0] for r in results) * 1e3
+            total = statistics.median(r[1] for r in results) * 1e3
+            cell = f"{first:.0f} / {total:.0f}ms {results[-1][2]:,}B"
+            row += f'{cell:>34}'
+        print(row + f"  ({len(split_sentences(text, args.max_chars))}문장)")
+
+
+if __name__ == '__main__':
+    main()
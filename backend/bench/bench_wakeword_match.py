@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+호출어 텍스트 매칭 벤치마크 - 기존 구현(부분 문자열 + 글자 포함 비율 유사도)과
+WakewordMatcher의 정확도(정밀도/재현율)와 호출당 비용 비교
+
+사용법:
+    python -m backend.bench.bench_wakeword_match
+"""
+
+import argparse
+import json
+import os
+import timeit
+
+from backend.wakeword_match import WakewordMatcher
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wakeword_corpus.json')
+
+# test_server.WAKE_WORDS와 동일 (중복 포함)
+WAKE_WORDS = [
+    '하이프로', '하이 프로', '하이프로', '하이프로',
+    'hi pro', 'hi pro', 'hi pro', 'hi pro',
+    '하이프로야', '하이프로씨', '하이프로님',
+    '프로야', '프로씨', '프로님',
+    '비서야', '비서씨', '비서님',
+    '어시스턴트', '어시스턴트야', '어시스턴트씨'
+]
+
+
+def _legacy_similarity(text1, text2):
+    if not text1 or not text2:
+        return 0.0
+    common_chars = sum(1 for c in text1 if c in text2)
+    total_chars = max(len(text1), len(text2))
+    return common_chars / total_chars if total_chars > 0 else 0.0
+
+
+def legacy_is_wakeword(transcript, confidence):
+    """기존 test_server.is_wakeword_detected 구현 (confidence는 사용되지 않음)"""
+    if not transcript:
+        return False
+    transcript_lower = transcript.lower().strip()
+    for wake_word in WAKE_WORDS:
+        if wake_word.lower() in transcript_lower:
+            return True
+    for wake_word in WAKE_WORDS:
+        if _legacy_similarity(transcript_lower, wake_word.lower()) > 0.8:
+            return True
+    return False
+
+
+def evaluate(predict, samples):
+    tp = fp = fn = tn = 0
+    errors = []
+    for sample in samples:
+        predicted = predict(sample['text'], sample['confidence'])
+        if predicted and sample['label']:
+            tp += 1
+        elif predicted:
+            fp += 1
+            errors.append(('오탐', sample['text']))
+        elif sample['label']:
+            fn += 1
+            errors.append(('미탐', sample['text']))
+        else:
+            tn += 1
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    accuracy = (tp + tn) / len(samples)
+    return precision, recall, accuracy, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='호출어 텍스트 매칭 벤치마크')
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        samples = json.load(f)['samples']
+
+    matcher = WakewordMatcher(WAKE_WORDS)
+    candidates = [
+        ('기존 구현', legacy_is_wakeword),
+        ('WakewordMatcher', lambda text, conf: matcher.match(text, conf).is_wakeword),
+    ]
+
+    print(f"📊 코퍼스 {len(samples)}개, 호출어 변형 {len(WAKE_WORDS)}개 → 인덱스 {len(matcher.variants)}개")
+    for name, predict in candidates:
+        precision, recall, accuracy, errors = evaluate(predict, samples)
+        seconds = timeit.timeit(
+            lambda: [predict(s['text'], s['confidence']) for s in samples], number=args.repeat
+        )
+        micros = seconds / (args.repeat * len(samples)) * 1e6
+        print(f"   {name:<16} 정밀도 {precision:.2f}  재현율 {recall:.2f}  정확도 {accuracy:.2f}  {micros:7.1f} µs/호출")
+        for kind, text in errors:
+            print(f"      {kind}: {text}")
+
+    # 호출어가 없는 긴 문장 - 단어 시작 위치마다 창을 보므로 길이에 따른 비용 확인
+    long_text = ' '.join(s['text'] for s in samples if not s['label'])[:150]
+    print(f"📏 호출어 없는 긴 문장 ({len(long_text)}자)")
+    for name, predict in candidates:
+        seconds = timeit.timeit(lambda: predict(long_text, None), number=max(1, args.repeat // 5))
+        print(f"   {name:<16} {seconds / max(1, args.repeat // 5) * 1e6:9.1f} µs/호출")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+부하 테스트용 샘플 클립 코퍼스
+말소리와 비슷한 합성 신호(피치가 변하는 배음 + 음절 단위 진폭 변조)를 길이/종류별로 만들고
+ffmpeg로 앱이 보내는 형식(m4a, 3gp, webm 등)으로 인코딩해 캐시 디렉터리에 저장합니다.
+시드가 고정되어 있어 같은 설정이면 항상 같은 클립이 만들어집니다.
+
+사용법:
+    python -m backend.bench.clips            # 코퍼스 생성 + 목록 출력
+"""
+
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+DEFAULT_CLIP_DIR = os.path.join(tempfile.gettempdir(), 'voice_assistant_bench_clips')
+REPO_SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp_audio.3gp')
+
+# 종류: (클립 길이 초, 음성 길이 초, 배경 잡음 표준편차) - 앱의 호출어 폴링은 2초, 명령 녹음은 5초
+# 조용한 방(-76 dBFS)과 달리 생활 소음(-50 dBFS)은 서버 필터 체인(증폭 + compand)을 거치면 음성 구간으로 잡힐 수 있음
+CLIP_KINDS = {
+    'silence': (2.0, 0.0, 0.00015),
+    'room_noise': (2.0, 0.0, 0.003),
+    'wakeword': (2.0, 0.9, 0.00015),
+    'command': (5.0, 2.4, 0.00015),
+    'long_command': (10.0, 6.0, 0.00015),
+}
+
+# 형식: ffmpeg 인코딩 옵션 (wav는 직접 작성)
+FORMAT_ENCODERS = {
+    'm4a': ['-c:a', 'aac', '-b:a', '64k'],
+    '3gp': ['-ar', '8000', '-c:a', 'libopencore_amrnb', '-b:a', '12.2k'],
+    'webm': ['-c:a', 'libopus', '-b:a', '32k'],
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '64k'],
+}
+DEFAULT_FORMATS = ('wav', 'm4a', '3gp', 'webm')
+
+
+class Clip:
+    """코퍼스 클립 하나 (데이터는 처음 읽을 때 메모리에 올림)"""
+
+    def __init__(self, name, kind, audio_format, duration, path):
+        self.name = name
+        self.kind = kind
+        self.audio_format = audio_format
+        self.duration = duration
+        self.path = path
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+
+def synthesize_speech_like(duration, speech_seconds, noise=0.00015, seed=0, sample_rate=SAMPLE_RATE):
+    """가운데에 speech_seconds 길이의 말소리 같은 구간이 있는 16비트 PCM 샘플"""
+    rng = np.random.default_rng(seed)
+    length = int(duration * sample_rate)
+    samples = rng.normal(0.0, noise, length)  # 배경 잡음
+
+    speech_length = int(speech_seconds * sample_rate)
+    if speech_length:
+        start = (length - speech_length) // 2
+        t = np.arange(speech_length) / sample_rate
+        f0 = 130.0 + 35.0 * np.sin(2 * np.pi * 0.8 * t + rng.uniform(0, np.pi))
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 9))
+        # 초당 4~5음절 정도의 진폭 변조
+        syllables = np.clip(np.sin(2 * np.pi * rng.uniform(4.0, 5.0) * t), 0.0, None) ** 0.5
+        samples[start:start + speech_length] += 0.25 * voiced * syllables
+
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def samples_to_wav(samples, sample_rate=SAMPLE_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _encode(wav_content, audio_format, path, ffmpeg_bin):
+    cmd = [ffmpeg_bin, '-hide_banner', '-loglevel', 'error', '-y', '-f', 'wav', '-i', 'pipe:0',
+           *FORMAT_ENCODERS[audio_format], path]
+    subprocess.run(cmd, input=wav_content, check=True, timeout=30)
+
+
+def build_corpus(directory=DEFAULT_CLIP_DIR, formats=DEFAULT_FORMATS, kinds=None, ffmpeg_bin='ffmpeg'):
+    """코퍼스 생성 (이미 있는 파일은 재사용) - Clip 목록 반환
+
+    ffmpeg가 없거나 인코더가 빠진 형식은 건너뜁니다.
+    """
+    os.makedirs(directory, exist_ok=True)
+    has_ffmpeg = shutil.which(ffmpeg_bin) is not None
+    clips = []
+    for seed, kind in enumerate(kinds or CLIP_KINDS):
+        duration, speech_seconds, noise = CLIP_KINDS[kind]
+        wav_content = None
+        for audio_format in formats:
+            name = f'{kind}.{audio_format}'
+            path = os.path.join(directory, name)
+            if not os.path.exists(path):
+                if wav_content is None:
+                    wav_content = samples_to_wav(synthesize_speech_like(duration, speech_seconds, noise, seed))
+                if audio_format == 'wav':
+                    with open(path, 'wb') as f:
+                        f.write(wav_content)
+                elif not has_ffmpeg or audio_format not in FORMAT_ENCODERS:
+                    continue
+                else:
+                    try:
+                        _encode(wav_content, audio_format, path, ffmpeg_bin)
+                    except (subprocess.SubprocessError, OSError) as e:
+                        print(f"⚠️ {name} 인코딩 실패 - 건너뜀: {e}")
+                        continue
+            clips.append(Clip(name, kind, audio_format, duration, path))
+
+    # 저장소에 포함된 실제 녹음 샘플 (안드로이드 3gp)
+    if os.path.exists(REPO_SAMPLE_PATH):
+        clips.append(Clip('temp_audio.3gp', 'sample', '3gp', None, REPO_SAMPLE_PATH))
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description='부하 테스트용 샘플 클립 코퍼스 생성')
+    parser.add_argument('--dir', default=DEFAULT_CLIP_DIR)
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS))
+    args = parser.parse_args()
+
+    clips = build_corpus(args.dir, args.formats.split(','))
+    print(f"📁 {args.dir}")
+    for clip in clips:
+        duration = f'{clip.duration:.1f}s' if clip.duration else '-'
+        print(f"   {clip.name:<22} {clip.kind:<13} {duration:>6} {len(clip.data):>8} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+# -*- coding: utf-8 -*-
+
+"""
+엔드투엔드 부하 테스트
+로컬 STT/Gemini 스텁(지연·오류·타임아웃 주입)을 띄우고 서버를 서브프로세스로 실행한 뒤,
+시나리오별 동시 클라이언트를 돌려 엔드포인트별 처리량 / 꼬리 지연 / 오류율과 서버 메모리를 보고합니다.
+--baseline으로 이전 결과(JSON)와 비교해 회귀가 있으면 종료 코드 1을 반환합니다.
+
+시나리오:
+    polling   앱의 호출어 폴링 (3초마다 2초 클립을 /wakeword로 전송, 응답을 기다리지 않는 개방형 부하)
+    session   폴링 → 호출어 감지 시 /speech-to-text → /analyze-command (→ /tts) 앱 흐름 전체
+    voice     /voice-command 한 번에 처리 (폐쇄형 부하)
+    analyze   /analyze-command 텍스트 명령만 (폐쇄형 부하)
+
+사용법:
+    python -m backend.bench.load_test --scenario polling --clients 50 --duration 30
+    python -m backend.bench.load_test --server asgi --scenario session --stt-latency 0.4 --llm-latency 0.8
+    python -m backend.bench.load_test --url http://127.0.0.1:8000 --scenario analyze
+    python -m backend.bench.load_test --workers 4 --store kv --scenario analyze   # prefork + 공유 캐시(Redis 스텁)
+    python -m backend.bench.load_test --json after.json --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from backend import llm_stub_server, stt_stub_server
+from backend.bench.clips import DEFAULT_CLIP_DIR, build_corpus
+from backend.kv_stub_server import start_kv_stub
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POLL_INTERVAL = 3.0  # lib/main.dart _detectWakewordInBackground
+COMMANDS = [
+    '아래로 스크롤해줘',      # 규칙 기반 빠른 경로
+    '위로 올려줘',
+    '네이버 열어줘',
+    '검색 버튼 눌러줘',        # LLM 경로
+    '로그인 버튼 클릭해줘',
+    '설정 메뉴에서 알림 꺼줘',
+]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ---- 스텁 서버 / 대상 서버 ----
+
+def start_stub(handler_class, **settings):
+    """스텁 핸들러를 설정값으로 서브클래싱해 백그라운드 스레드에서 실행 - (서버, 기본 URL)"""
+    handler = type(f'Bench{handler_class.__name__}', (handler_class,), settings)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+class ServerProcess:
+    """Flask(test_server) 또는 ASGI(asgi_server) 서버 서브프로세스 + RSS 측정"""
+
+    def __init__(self, mode, env):
+        self.mode = mode
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.env = {**os.environ, **env}
+        self.log_path = os.path.join(tempfile.gettempdir(), f'voice_assistant_bench_{mode}.log')
+        self.proc = None
+        self.startup = None  # 프로세스 시작부터 /health/live, /health/ready 응답까지 걸린 시간
+
+    def start(self, timeout=60.0):
+        if self.mode == 'asgi':
+            cmd = [sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--host', '127.0.0.1',
+                   '--port', str(self.port), '--log-level', 'warning']
+        else:
+            cmd = [sys.executable, '-c',
+                   f"import test_server as s; s.run_server(host='127.0.0.1', port={self.port})"]
+        self._log = open(self.log_path, 'wb')
+        started = time.perf_counter()
+        self.proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+
+        # 준비 상태(/health/ready)가 될 때까지 기다림 - 준비 전 요청이 결과를 흐리지 않도록
+        live_ms = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f'서버가 종료되었습니다 (code={self.proc.returncode}), 로그: {self.log_path}')
+            try:
+                response = requests.get(f'{self.url}/health/ready', timeout=1)
+                if live_ms is None:
+                    live_ms = round((time.perf_counter() - started) * 1000, 1)
+                if response.status_code == 200:
+                    self.startup = {'live_ms': live_ms,
+                                    'ready_ms': round((time.perf_counter() - started) * 1000, 1)}
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f'서버 시작(준비) 시간 초과, 로그: {self.log_path}')
+
+    @staticmethod
+    def _process_rss(pid):
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def rss_bytes(self):
+        """서버 프로세스 상주 메모리 (prefork면 워커 합계 - 공유 페이지도 중복 집계, Linux /proc, 그 외 None)"""
+        rss = self._process_rss(self.proc.pid)
+        if rss is None:
+            return None
+        try:
+            with open(f'/proc/{self.proc.pid}/task/{self.proc.pid}/children') as f:
+                children = f.read().split()
+        except OSError:
+            children = []
+        return rss + sum(self._process_rss(pid) or 0 for pid in children)
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        if self.proc:
+            self._log.close()
+
+
+class MemorySampler(threading.Thread):
+    """주기적으로 서버 RSS를 기록 (시작 / 최대 / 종료)"""
+
+    def __init__(self, server, interval=0.5):
+        super().__init__(daemon=True)
+        self.server = server
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = self.server.rss_bytes()
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        mb = 1024 * 1024
+        return {
+            'start_mb': round(self.samples[0] / mb, 1),
+            'peak_mb': round(max(self.samples) / mb, 1),
+            'end_mb': round(self.samples[-1] / mb, 1),
+        }
+
+
+# ---- 요청 기록 ----
+
+class Recorder:
+    """엔드포인트별 (지연, 상태) 기록"""
+
+    def __init__(self):
+        self.results = {}
+        self._lock = threading.Lock()
+
+    def request(self, session, endpoint, url, timeout, **kwargs):
+        """POST 한 번 - 응답 또는 None (연결 오류/타임아웃)"""
+        started = time.perf_counter()
+        response, status = None, None
+        try:
+            response = session.post(url, timeout=timeout, **kwargs)
+            status = response.status_code
+        except requests.Timeout:
+            status = 'timeout'
+        except requests.RequestException:
+            status = 'connection'
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.results.setdefault(endpoint, []).append((elapsed, status))
+        return response
+
+    def summary(self, elapsed):
+        report = {}
+        with self._lock:
+            for endpoint, entries in sorted(self.results.items()):
+                latencies = sorted(latency for latency, _ in entries)
+                statuses = {}
+                for _, status in entries:
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+                errors = sum(1 for _, status in entries if not isinstance(status, int) or status >= 400)
+                report[endpoint] = {
+                    'requests': len(entries),
+                    'errors': errors,
+                    'error_rate': round(errors / len(entries), 4),
+                    'throughput_rps': round(len(entries) / elapsed, 2),
+                    'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+                    'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+                    'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+                    'max_ms': round(latencies[-1] * 1000, 1),
+                    'statuses': statuses,
+                }
+        return report
+
+
+# ---- 시나리오 ----
+
+class LoadContext:
+    def __init__(self, base_url, clips, recorder, stop_event, args):
+        self.base_url = base_url
+        self.clips = clips
+        self.recorder = recorder
+        self.stop_event = stop_event
+        self.args = args
+
+    def clip(self, kind):
+        return self.clips[kind]
+
+    def poll_clip(self, rng):
+        """폴링 클립 선택 - 호출어 / 생활 소음 / 조용한 무음"""
+        roll = rng.random()
+        if roll < self.args.wakeword_ratio:
+            return self.clips['wakeword']
+        if roll < self.args.wakeword_ratio + self.args.noise_ratio:
+            return self.clips['room_noise']
+        return self.clips['silence']
+
+    def post_wakeword(self, session, clip):
+        return self.recorder.request(
+            session, 'wakeword', f'{self.base_url}/wakeword?format={clip.audio_format}', 10,
+            data=clip.data, headers={'Content-Type': 'application/octet-stream'},
+        )
+
+
+def run_polling_client(ctx, client_id):
+    """3초 주기 타이머 - 이전 응답을 기다리지 않고 다음 클립 전송 (Timer.periodic과 동일)"""
+    rng = random.Random(client_id)
+    session = requests.Session()
+    with ThreadPoolExecutor(max_workers=4) as pending:
+        next_tick = time.monotonic() + rng.uniform(0, POLL_INTERVAL)
+        while not ctx.stop_event.wait(max(0.0, next_tick - time.monotonic())):
+            next_tick += POLL_INTERVAL
+            pending.submit(ctx.post_wakeword, session, ctx.poll_clip(rng))
+
+
+def run_session_client(ctx, client_id):
+    """폴링 → 호출어 감지 → 명령 녹음(5초) 인식 → 명령 분석 (→ TTS 피드백)"""
+    rng = random.Random(client_id)
+    session = requests.Session()
+    ctx.stop_event.wait(rng.uniform(0, POLL_INTERVAL))
+    while not ctx.stop_event.is_set():
+        tick = time.monotonic()
+        response = ctx.post_wakeword(session, ctx.poll_clip(rng))
+        detected = response is not None and response.status_code == 200 and response.json().get('is_wakeword')
+
+        if detected:
+            clip = ctx.clip('command')
+            response = ctx.recorder.request(
+                session, 'speech_to_text',
+                f'{ctx.base_url}/speech-to-text?format={clip.audio_format}&check_wakeword=false', 30,
+                data=clip.data, headers={'Content-Type': 'application/octet-stream'},
+            )
+            transcript = response.json().get('transcript') if response is not None and response.ok else ''
+            if transcript and len(transcript.strip()) >= 2:
+                ctx.recorder.request(session, 'analyze_command', f'{ctx.base_url}/analyze-command', 30,
+                                     json={'command': transcript})
+                if ctx.args.tts:
+                    ctx.recorder.request(session, 'text_to_speech', f'{ctx.base_url}/tts', 5,
+                                         json={'text': f'{transcript}을 실행했습니다.'})
+
+        ctx.stop_event.wait(max(0.0, tick + POLL_INTERVAL - time.monotonic()))
+
+
+def run_voice_client(ctx, client_id):
+    session = requests.Session()
+    clip = ctx.clip('command')
+    options = '&tts=true' if ctx.args.tts else ''
+    while not ctx.stop_event.is_set():
+        ctx.recorder.request(
+            session, 'voice_command', f'{ctx.base_url}/voice-command?format={clip.audio_format}{options}', 30,
+            data=clip.data, headers={'Content-Type': 'application/octet-stream'},
+        )
+        ctx.stop_event.wait(ctx.args.think_time)
+
+
+def run_analyze_client(ctx, client_id):
+    rng = random.Random(client_id)
+    session = requests.Session()
+    iteration = 0
+    while not ctx.stop_event.is_set():
+        command = rng.choice(COMMANDS)
+        if ctx.args.cache_bust:
+            iteration += 1
+            command = f'{command} {client_id}-{iteration}'
+        ctx.recorder.request(session, 'analyze_command', f'{ctx.base_url}/analyze-command', 30,
+                             json={'command': command})
+        ctx.stop_event.wait(ctx.args.think_time)
+
+
+SCENARIOS = {
+    'polling': run_polling_client,
+    'session': run_session_client,
+    'voice': run_voice_client,
+    'analyze': run_analyze_client,
+}
+
+
+# ---- 보고 / 회귀 비교 ----
+
+def print_report(result):
+    print(f"\n📊 {result['scenario']} ({result['server']}, 워커 {result.get('workers', 1)}, 캐시 {result.get('store', 'memory')})"
+          f" - 클라이언트 {result['clients']}명, {result['duration_seconds']}s")
+    print(f"   {'엔드포인트':<16}{'요청':>7}{'오류율':>8}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"   {endpoint:<16}{stats['requests']:>7}{stats['error_rate']:>8.1%}{stats['throughput_rps']:>8.1f}"
+              f"{stats['p50_ms']:>7.0f}ms{stats['p95_ms']:>7.0f}ms{stats['p99_ms']:>7.0f}ms{stats['max_ms']:>7.0f}ms")
+        non_ok = {status: count for status, count in stats['statuses'].items() if status != '200'}
+        if non_ok:
+            print(f"      상태: {non_ok}")
+    startup = result.get('startup')
+    if startup:
+        print(f"   🚀 서버 시작: 응답 가능 {startup['live_ms']:.0f}ms / 준비 완료 {startup['ready_ms']:.0f}ms")
+    memory = result.get('memory')
+    if memory:
+        print(f"   🧠 서버 RSS: 시작 {memory['start_mb']}MB / 최대 {memory['peak_mb']}MB / 종료 {memory['end_mb']}MB")
+    stages = (result.get('server_metrics') or {}).get('stages') or {}
+    if stages:
+        print("   ⏱️ 서버 단계별 지연 (/metrics):")
+        for stage, stats in stages.items():
+            print(f"      {stage:<14} {stats['count']:>7}건  p50 {stats['p50_ms']:>8.1f}ms  "
+                  f"p95 {stats['p95_ms']:>8.1f}ms  p99 {stats['p99_ms']:>8.1f}ms")
+
+
+def compare_with_baseline(result, baseline, tolerance, min_delta_ms=5.0):
+    """p95/p99 지연·오류율·처리량·최대 메모리 회귀 목록"""
+    regressions = []
+    for endpoint, base in baseline.get('endpoints', {}).items():
+        current = result['endpoints'].get(endpoint)
+        if current is None:
+            regressions.append(f'{endpoint}: 요청 기록 없음')
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            if current[key] > base[key] * (1 + tolerance) and current[key] - base[key] > min_delta_ms:
+                regressions.append(f'{endpoint} {key}: {base[key]} → {current[key]}')
+        if current['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"{endpoint} 오류율: {base['error_rate']:.1%} → {current['error_rate']:.1%}")
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{endpoint} 처리량: {base['throughput_rps']} → {current['throughput_rps']} req/s")
+    base_memory, memory = baseline.get('memory'), result.get('memory')
+    if base_memory and memory and memory['peak_mb'] > base_memory['peak_mb'] * (1 + tolerance):
+        regressions.append(f"최대 RSS: {base_memory['peak_mb']}MB → {memory['peak_mb']}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='엔드투엔드 부하 테스트')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='session')
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask')
+    parser.add_argument('--workers', type=int, default=1, help='flask 서버 prefork 워커 수')
+    parser.add_argument('--store', choices=['memory', 'kv'], default='memory',
+                        help='캐시 저장소 (kv: 로컬 Redis 스텁으로 워커 간 공유)')
+    parser.add_argument('--url', help='이미 실행 중인 서버 주소 (지정하면 스텁/서버를 띄우지 않음)')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30.0, help='측정 시간 (초)')
+    parser.add_argument('--format', default='m4a', help='클립 형식 (wav, m4a, 3gp, webm)')
+    parser.add_argument('--wakeword-ratio', type=float, default=0.1, help='폴링 클립 중 호출어 클립 비율')
+    parser.add_argument('--noise-ratio', type=float, default=0.0, help='폴링 클립 중 생활 소음 클립 비율')
+    parser.add_argument('--think-time', type=float, default=0.0, help='폐쇄형 시나리오의 요청 간 대기 (초)')
+    parser.add_argument('--cache-bust', action='store_true', help='analyze: 명령마다 고유 문장으로 캐시 우회')
+    parser.add_argument('--tts', action='store_true', help='TTS 요청 포함')
+    parser.add_argument('--stt-latency', type=float, default=0.3)
+    parser.add_argument('--llm-latency', type=float, default=0.8)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='스텁 503 오류 주입 비율')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='스텁 타임아웃 주입 비율')
+    parser.add_argument('--clip-dir', default=DEFAULT_CLIP_DIR)
+    parser.add_argument('--json', help='결과 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='회귀 허용 비율')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.clip_dir, formats=(args.format,))
+    clips = {clip.kind: clip for clip in corpus if clip.audio_format == args.format}
+    missing = {'silence', 'room_noise', 'wakeword', 'command'} - set(clips)
+    if missing:
+        parser.error(f'{args.format} 형식 클립을 만들 수 없습니다 (ffmpeg 확인): {sorted(missing)}')
+
+    stubs, server = [], None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        injection = {'latency': 0.0, 'jitter': args.jitter, 'error_rate': args.error_rate,
+                     'hang_rate': args.hang_rate, 'hang_seconds': 30.0}
+        stt_stub, stt_url = start_stub(stt_stub_server.StubHandler, **{**injection, 'latency': args.stt_latency})
+        llm_stub, llm_url = start_stub(llm_stub_server.StubHandler, **{**injection, 'latency': args.llm_latency})
+        stubs = [stt_stub, llm_stub]
+        store_env = {}
+        if args.store == 'kv':
+            kv_stub, kv_url = start_kv_stub()
+            stubs.append(kv_stub)
+            store_env['CACHE_STORE_URL'] = kv_url
+        server = ServerProcess(args.server, {
+            **store_env,
+            'SERVER_WORKERS': str(args.workers),
+            'GEMINI_API_KEY': 'bench-stub',
+            'GEMINI_BASE_URL': llm_url,
+            'STT_HTTP_URL': f'{stt_url}/recognize',
+            'STT_CLOUD_BACKEND': 'http',
+            'STT_FAILOVER': 'false',
+            'LOG_LEVEL': 'WARNING',
+        })
+        print(f"🚀 {args.server} 서버 시작 중... (STT 스텁 {stt_url}, Gemini 스텁 {llm_url})")
+        server.start()
+        base_url = server.url
+
+    recorder = Recorder()
+    stop_event = threading.Event()
+    ctx = LoadContext(base_url, clips, recorder, stop_event, args)
+    sampler = MemorySampler(server) if server else None
+    threads = [threading.Thread(target=SCENARIOS[args.scenario], args=(ctx, i), daemon=True)
+               for i in range(args.clients)]
+
+    try:
+        if sampler:
+            sampler.start()
+        print(f"🏃 {args.scenario}: 클라이언트 {args.clients}명, {args.duration:.0f}초")
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop_event.set()
+        for thread in threads:
+            thread.join(timeout=35)
+        elapsed = time.perf_counter() - started
+
+        try:
+            server_metrics = requests.get(f'{base_url}/metrics?format=json', timeout=5).json()
+        except (requests.RequestException, ValueError):
+            server_metrics = None
+    finally:
+        if sampler:
+            sampler.stop()
+        if server:
+            server.stop()
+        for stub in stubs:
+            stub.shutdown()
+
+    result = {
+        'scenario': args.scenario,
+        'server': args.url or args.server,
+        'workers': args.workers,
+        'store': args.store,
+        'clients': args.clients,
+        'duration_seconds': round(elapsed, 1),
+        'endpoints': recorder.summary(elapsed),
+        'startup': server.startup if server else None,
+        'memory': sampler.summary() if sampler else None,
+        'server_metrics': server_metrics,
+    }
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(result, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ 기준 대비 회귀:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("✅ 기준 대비 회귀 없음")
+
+
+if __name__ == '__main__':
+    main()
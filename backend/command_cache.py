@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+명령 분석 결과 캐시 (Gemini 호출 앞단)
+정규화된 명령어를 키로 LRU + TTL 방식으로 보관하고, 선택적으로 파일에 저장해 재시작 후에도 재사용합니다.
+저장소를 Redis로 바꾸면 여러 워커 프로세스 / 노드가 캐시를 공유합니다.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+from backend.storage import MemoryStore
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+# 같은 의미의 명령형 어미 통일 (긴 표현부터 치환) - 단어 끝에서만 바꿔 다른 단어 속 글자는 건드리지 않음
+_PHRASE_FOLDS = [(re.compile(pattern + r'(?=\s|$)'), replacement) for pattern, replacement in [
+    (r'해 주세요', '해줘'),
+    (r'해주세요', '해줘'),
+    (r'해 줘', '해줘'),
+    (r'주세요', '줘'),
+    (r'줄래요', '줘'),
+    (r'줄래', '줘'),
+]]
+# 동사(-아/-어 형) 뒤의 '봐/봐줘/줘'는 붙여 쓰든 띄어 쓰든 '줘'로 ("열어 봐" = "열어봐" = "열어 줘")
+_VERB_ENDING = re.compile(r'(?<!\S)(\S*?[^\s봐]) ?(?:봐 ?줘|봐|줘)(?=\s|$)')
+# 모음으로 끝나 동사 어미처럼 보이는 대명사 ("이거 봐"는 "이거 줘"와 다른 명령)
+_NOT_VERB_STEMS = {'이거', '그거', '저거', '요거', '뭐', '나', '너', '저'}
+_CONNECTIVE_VOWELS = {0, 4, 6, 9, 10, 14}  # ㅏ ㅓ ㅕ ㅘ ㅙ ㅝ
+
+
+def _is_verb_stem(word):
+    """-아/-어 연결형으로 끝나는 동사인지 (받침 없는 ㅏ/ㅓ/ㅕ/ㅘ/ㅙ/ㅝ 음절 또는 '해')"""
+    if word in _NOT_VERB_STEMS:
+        return False
+    code = ord(word[-1]) - 0xAC00
+    if not 0 <= code < 11172 or code % 28:
+        return False
+    return word[-1] == '해' or (code // 28) % 21 in _CONNECTIVE_VOWELS
+
+
+def _fold_verb_ending(match):
+    stem = match.group(1)
+    if _is_verb_stem(stem):
+        return stem + '줘'
+    return match.group(0)
+
+
+_FILLER_WORDS = {'좀', '그', '저기', '음', '어'}
+
+
+def normalize_command_key(command):
+    """캐시 키용 명령어 정규화 - 문장부호/공백/어미 차이를 흡수"""
+    text = _PUNCTUATION.sub(' ', (command or '').lower())
+    words = [word for word in _SPACES.split(text) if word and word not in _FILLER_WORDS]
+    text = ' '.join(words)
+    for pattern, replacement in _PHRASE_FOLDS:
+        text = pattern.sub(replacement, text)
+    text = _VERB_ENDING.sub(_fold_verb_ending, text)
+    # 한국어 띄어쓰기 차이("내려 줘" / "내려줘")는 공백 제거로 통일
+    return text.replace(' ', '')
+
+
+class CommandCache:
+    """LRU + TTL 명령 분석 결과 캐시 (스레드 안전)
+
+    결과는 저장소(backend.storage)에 JSON으로 보관합니다. 기본은 프로세스 안 LRU이며,
+    공유 저장소(Redis)를 주면 여러 워커 프로세스 / 노드가 같은 캐시를 씁니다.
+    """
+
+    def __init__(self, max_size=512, ttl=3600.0, path=None, version=None, store=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.version = version  # 프롬프트 버전이 바뀌면 저장된 캐시는 버림
+        self.store = store if store is not None else MemoryStore(max_entries=max_size)
+        self._prefix = f'{version}:'  # 공유 저장소에서도 버전이 다른 항목은 보이지 않도록
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, command, record=True):
+        """캐시된 결과 복사본 반환 (없거나 만료되면 None) - record=False면 적중/미스 통계에 넣지 않음 (추측 조회용)"""
+        raw = self.store.get(self._prefix + normalize_command_key(command))
+        if not record:
+            return json.loads(raw) if raw is not None else None
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def put(self, command, result):
+        key = normalize_command_key(command)
+        if not key:
+            return
+        self.store.set(self._prefix + key, json.dumps(result, ensure_ascii=False).encode('utf-8'), ttl=self.ttl)
+
+    def stats(self):
+        """/health 노출용 통계 (적중/미스는 이 프로세스 기준)"""
+        store_stats = self.store.stats()
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'store': store_stats['backend'],
+                'size': store_stats.get('entries'),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': store_stats.get('evictions'),
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def load(self):
+        """저장된 캐시 파일에서 만료되지 않은 항목 복원 (프로세스 안 저장소만)"""
+        if not self.path or not self.store.local or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 명령 캐시 파일 로드 실패: {e}")
+            return 0
+        if saved.get('prompt_version') != self.version:
+            return 0
+
+        now = time.time()
+        for key, stored_at, result in saved.get('entries', []):
+            remaining = self.ttl - (now - stored_at)
+            if remaining > 0:
+                self.store.set(self._prefix + key, json.dumps(result, ensure_ascii=False).encode('utf-8'),
+                               ttl=remaining)
+        return self.store.stats()['entries']
+
+    def save(self):
+        """캐시를 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+        if not self.path or not self.store.local:
+            return
+        entries = [[key[len(self._prefix):], expires_at - self.ttl, json.loads(value)]
+                   for key, value, expires_at in self.store.items() if key.startswith(self._prefix)]
+        temp_path = f'{self.path}.tmp'
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'prompt_version': self.version, 'entries': entries},
+                          f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 명령 캐시 파일 저장 실패: {e}")
+
+    def enable_persistence(self, interval=60.0):
+        """주기적 저장 스레드 시작 + 종료 시 저장 (공유 저장소는 저장소가 보존을 맡음)"""
+        if not self.path or not self.store.local:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                self.save()
+
+        threading.Thread(target=_loop, name='command-cache-save', daemon=True).start()
+        atexit.register(self.save)
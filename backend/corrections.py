@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+음성 인식 결과 후처리 엔진
+언어별 보정 규칙을 데이터 파일(backend/rules/corrections_<언어>.json)에서 한 번 읽어
+하나의 정규식 alternation으로 컴파일하고, 모든 보정을 한 번의 치환으로 적용합니다.
+규칙 파일이 바뀌면 다음 호출 때 자동으로 다시 읽습니다.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules')
+_TRAILING_PERIOD = re.compile(r'\.$')
+
+
+def _alternation(words):
+    # 긴 단어부터 시도해야 '내'가 '내려'보다 먼저 선택되지 않음
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+class RuleSet:
+    """컴파일된 한 언어의 보정 규칙"""
+
+    def __init__(self, words, strip_trailing_period=True, mtime=None):
+        self.words = dict(words)
+        self.strip_trailing_period = strip_trailing_period
+        self.mtime = mtime
+        # '스크.' / '스크' 처럼 단어 뒤 마침표까지 한 번에 매칭
+        self.pattern = re.compile(rf'\b({_alternation(self.words)})\.?\b') if self.words else None
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            data.get('words', {}),
+            strip_trailing_period=data.get('strip_trailing_period', True),
+            mtime=os.path.getmtime(path),
+        )
+
+    def _replace(self, match):
+        return self.words[match.group(1)]
+
+    def apply(self, text):
+        if self.pattern is not None:
+            text = self.pattern.sub(self._replace, text)
+        if self.strip_trailing_period:
+            # 불필요한 마침표 제거 (전체 문장 끝에 있는 경우)
+            text = _TRAILING_PERIOD.sub('', text)
+        return text
+
+
+class CorrectionEngine:
+    """언어별 RuleSet을 보관하고 규칙 파일 변경 시 다시 읽는 보정 엔진 (스레드 안전)"""
+
+    def __init__(self, rules_dir=DEFAULT_RULES_DIR, default_language='ko', check_interval=2.0):
+        self.rules_dir = rules_dir
+        self.default_language = default_language
+        self.check_interval = check_interval
+        self._rulesets = {}     # 언어 -> RuleSet
+        self._checked_at = {}   # 언어 -> 마지막 mtime 확인 시각
+        self._lock = threading.Lock()
+
+    def rules_path(self, language):
+        return os.path.join(self.rules_dir, f'corrections_{language}.json')
+
+    def _load(self, language):
+        path = self.rules_path(language)
+        try:
+            ruleset = RuleSet.from_file(path)
+        except FileNotFoundError:
+            ruleset = RuleSet({}, mtime=None)
+        except (OSError, ValueError) as e:
+            # 잘못 저장된 규칙 파일은 무시하고 기존 규칙 유지
+            print(f"❌ 보정 규칙 로드 실패 ({path}): {e}")
+            return self._rulesets.get(language) or RuleSet({}, mtime=None)
+        print(f"📖 보정 규칙 로드: {language} ({len(ruleset.words)}개)")
+        return ruleset
+
+    def ruleset(self, language=None):
+        """언어의 RuleSet (check_interval마다 파일 mtime을 확인해 바뀌었으면 다시 로드)"""
+        language = language or self.default_language
+        ruleset = self._rulesets.get(language)
+        now = time.monotonic()
+        if ruleset is not None and now - self._checked_at.get(language, 0.0) < self.check_interval:
+            return ruleset
+
+        with self._lock:
+            ruleset = self._rulesets.get(language)
+            self._checked_at[language] = now
+            try:
+                mtime = os.path.getmtime(self.rules_path(language))
+            except OSError:
+                mtime = None
+            if ruleset is None or ruleset.mtime != mtime:
+                ruleset = self._load(language)
+                self._rulesets[language] = ruleset
+            return ruleset
+
+    def reload(self, language=None):
+        """규칙 파일 강제 재로드"""
+        language = language or self.default_language
+        with self._lock:
+            self._rulesets[language] = self._load(language)
+            self._checked_at[language] = time.monotonic()
+            return len(self._rulesets[language].words)
+
+    def apply(self, text, language=None):
+        """모든 보정 규칙을 한 번에 적용"""
+        if not text:
+            return text
+        return self.ruleset(language).apply(text)
+
+
+class KeywordMatcher:
+    """여러 키워드 그룹을 한 번의 스캔으로 찾는 매처
+
+    매칭된 키워드에 포함된 다른 키워드의 그룹까지 미리 계산해 두므로
+    결과는 그룹마다 any(word in text ...)를 돌린 것과 같습니다.
+    """
+
+    def __init__(self, groups):
+        keywords = {word for words in groups.values() for word in words}
+        self._groups = {
+            keyword: frozenset(
+                name for name, words in groups.items() if any(word in keyword for word in words)
+            )
+            for keyword in keywords
+        }
+        # lookahead로 겹치는 위치까지 모든 시작점을 검사
+        self.pattern = re.compile(f'(?=({_alternation(keywords)}))')
+
+    def find(self, text):
+        """텍스트에 등장한 키워드 그룹 이름 집합"""
+        found = set()
+        for match in self.pattern.finditer(text or ''):
+            found |= self._groups[match.group(1)]
+        return found
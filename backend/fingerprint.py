@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+오디오 지문 + 인식 결과(transcript) 캐시
+클라이언트 재전송이나 호출어 폴링처럼 같은(거의 같은) 클립이 다시 오면 STT를 호출하지 않고 저장된 결과를 돌려줍니다.
+- 정확 일치: 변환된 PCM의 해시
+- 유사 일치: 구간별 로그 대역 에너지 차분의 부호로 만든 512비트 스펙트럼 지문 (Haitsma-Kalker 방식을 단순화)
+  → 코덱마다 다른 앞뒤 지연/패딩을 없애려고 소리가 있는 구간(ACTIVE_RANGE_DB)만 잘라 시간 구간을 나누고,
+    가장 큰 칸보다 LOUDNESS_RANGE_DB 이상 작은 (구간, 대역) 칸은 비교에서 뺀 뒤
+    나머지 비트의 오류율이 max_bit_error 이하이며 소리 구간 길이가 비슷하면 같은 클립으로 봅니다.
+  음량 차이, 서버 필터 체인(compand), 코덱 재인코딩에는 강하지만
+  서로 다른 잡음 녹음은 지문이 무작위라 일치하지 않습니다 (완전히 같은 클립은 정확 일치로 처리).
+
+결과 값은 저장소(backend.storage)에 두어 워커 간에 공유하고, 유사 검색용 지문 색인은 프로세스마다 둡니다.
+"""
+
+import hashlib
+import io
+import json
+import threading
+import time
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+from backend.storage import MemoryStore
+
+FRAME_SIZE = 1024          # 16kHz 기준 64ms
+HOP_SIZE = 512
+BANDS = 17                 # 인접 대역 차분 16개
+SEGMENTS = 33              # 시간 구간 차분 32개 → 32 x 16 = 512비트
+BAND_RANGE_HZ = (300.0, 3400.0)  # 전화 대역 (8kHz 3gp 입력도 포함)
+ACTIVE_RANGE_DB = 30.0     # 가장 큰 프레임보다 이만큼 작은 앞뒤 프레임은 잘라냄
+LOUDNESS_RANGE_DB = 40.0   # 가장 큰 칸보다 이만큼 작은 (구간, 대역) 칸의 비트는 비교하지 않음
+MIN_COMPARED_BITS = 64     # 비교할 비트가 이보다 적으면 유사 일치를 하지 않음
+FINGERPRINT_BYTES = (SEGMENTS - 1) * (BANDS - 1) // 8
+
+_WINDOW = np.hanning(FRAME_SIZE).astype(np.float32)
+# 바이트별 1비트 개수 (해밍 거리 계산용)
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint16)
+
+
+class AudioFingerprint:
+    """클립 하나의 정확 해시 + 스펙트럼 지문"""
+
+    def __init__(self, exact, bits, mask, duration):
+        self.exact = exact        # PCM 해시 (hex)
+        self.bits = bits          # np.uint8[FINGERPRINT_BYTES]
+        self.mask = mask          # 비교할 비트 (같은 모양, 조용한 칸은 0)
+        self.duration = duration  # 소리 구간 길이 (초)
+
+
+@lru_cache(maxsize=8)
+def _band_matrix(sample_rate):
+    """FFT 빈 → 로그 간격 대역 합산 행렬 (샘플레이트별로 한 번만 생성)"""
+    high = min(BAND_RANGE_HZ[1], sample_rate / 2.0 * 0.95)
+    edges = np.geomspace(BAND_RANGE_HZ[0], high, BANDS + 1)
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / sample_rate)
+    matrix = np.zeros((len(freqs), BANDS), dtype=np.float32)
+    for band in range(BANDS):
+        matrix[(freqs >= edges[band]) & (freqs < edges[band + 1]), band] = 1.0
+    return matrix
+
+
+def spectral_fingerprint(samples, sample_rate):
+    """int16 샘플 → (512비트 지문, 비교 마스크, 소리 구간 길이 초) - 지문/마스크는 np.uint8 64바이트
+
+    소리 구간의 프레임별 대역 에너지를 SEGMENTS개 시간 구간으로 평균내 길이와 무관한 크기로 만든 뒤,
+    (로그 대역 차분)의 시간 차분 부호를 비트로 씁니다. 로그 차분이라 구간마다 음량이 달라져도 비트는 같습니다.
+    """
+    x = samples.astype(np.float32) / 32768.0
+    if len(x) < FRAME_SIZE:
+        x = np.pad(x, (0, FRAME_SIZE - len(x)))
+    n_frames = 1 + (len(x) - FRAME_SIZE) // HOP_SIZE
+    frames = np.lib.stride_tricks.as_strided(
+        x, shape=(n_frames, FRAME_SIZE), strides=(x.strides[0] * HOP_SIZE, x.strides[0]), writeable=False
+    )
+    spectrum = np.abs(np.fft.rfft(frames * _WINDOW, axis=1)) ** 2
+    energy = spectrum @ _band_matrix(sample_rate)  # (프레임, 대역)
+
+    frame_db = 10.0 * np.log10(energy.sum(axis=1) + 1e-12)
+    active = np.flatnonzero(frame_db >= frame_db.max() - ACTIVE_RANGE_DB)
+    energy = energy[active[0]:active[-1] + 1]
+    n_frames = len(energy)
+    active_seconds = ((n_frames - 1) * HOP_SIZE + FRAME_SIZE) / float(sample_rate)
+
+    if n_frames >= SEGMENTS:
+        starts = (np.arange(SEGMENTS) * n_frames) // SEGMENTS
+        counts = np.diff(np.append(starts, n_frames))
+        segments = np.add.reduceat(energy, starts, axis=0) / counts[:, None]
+    else:
+        segments = energy[np.linspace(0, n_frames - 1, SEGMENTS).round().astype(int)]
+
+    log_energy = np.log(segments + 1e-12)
+    band_diff = log_energy[:, :-1] - log_energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+
+    cell_db = 10.0 * np.log10(segments + 1e-12)
+    loud = cell_db >= cell_db.max() - LOUDNESS_RANGE_DB
+    # 비트 하나는 (구간 2개 × 대역 2개) 칸으로 만들어지므로 네 칸이 모두 충분히 커야 비교
+    mask = loud[1:, :-1] & loud[1:, 1:] & loud[:-1, :-1] & loud[:-1, 1:]
+    return np.packbits(bits & mask), np.packbits(mask), active_seconds
+
+
+def fingerprint_wav(wav_content):
+    """16bit 모노 WAV → AudioFingerprint (읽을 수 없으면 None)"""
+    try:
+        with wave.open(io.BytesIO(wav_content), 'rb') as wav_file:
+            if wav_file.getsampwidth() != 2 or wav_file.getnchannels() != 1:
+                return None
+            sample_rate = wav_file.getframerate()
+            pcm = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    digest = hashlib.blake2b(str(sample_rate).encode('ascii'), digest_size=16)
+    digest.update(pcm)
+    exact = digest.hexdigest()
+    samples = np.frombuffer(pcm, dtype='<i2')
+    bits, mask, active_seconds = spectral_fingerprint(samples, sample_rate)
+    return AudioFingerprint(exact, bits, mask, active_seconds)
+
+
+def bit_error_rate(a, b):
+    """두 지문의 비트 오류율 - 어느 한쪽에서라도 비교 대상인 비트 기준 (비교할 비트가 너무 적으면 1.0)"""
+    compared = _POPCOUNT[np.bitwise_or(a.mask, b.mask)].sum()
+    if compared < MIN_COMPARED_BITS:
+        return 1.0
+    return _POPCOUNT[np.bitwise_xor(a.bits, b.bits)].sum() / float(compared)
+
+
+class TranscriptCache:
+    """지문 기반 인식 결과 캐시 - 정확 일치 후 유사 일치 (scope가 같은 항목끼리만)
+
+    scope는 인식 목적 / 요청한 백엔드처럼 결과가 달라질 수 있는 조건을 구분합니다.
+    """
+
+    def __init__(self, store=None, max_entries=256, ttl=600.0, max_bit_error=0.2, duration_tolerance=0.15):
+        self.store = store if store is not None else MemoryStore(max_entries=max_entries)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bit_error = max_bit_error
+        self.duration_tolerance = duration_tolerance
+
+        # 유사 검색 색인 (고리 버퍼) - 지문 행렬은 미리 할당해 두고 행 단위로 덮어씀
+        self._bits = np.zeros((max_entries, FINGERPRINT_BYTES), dtype=np.uint8)
+        self._masks = np.zeros((max_entries, FINGERPRINT_BYTES), dtype=np.uint8)
+        self._durations = np.zeros(max_entries, dtype=np.float64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)  # 0이면 빈 칸
+        self._keys = [None] * max_entries
+        self._scopes = [None] * max_entries
+        self._next = 0
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(wav_content):
+        return fingerprint_wav(wav_content)
+
+    @staticmethod
+    def _key(scope, fingerprint):
+        return f'{scope}:{fingerprint.exact}'
+
+    def _find_near(self, fingerprint, scope):
+        """같은 scope, 비슷한 길이, 해밍 거리가 가장 작은 색인 항목의 키"""
+        with self._lock:
+            candidates = np.flatnonzero(
+                (self._expires > time.time())
+                & (np.abs(self._durations - fingerprint.duration)
+                   <= self.duration_tolerance * max(fingerprint.duration, 0.1))
+            )
+            candidates = [index for index in candidates if self._scopes[index] == scope]
+            if not candidates:
+                return None
+            # 마스크 밖 비트는 0이므로 XOR는 한쪽에서만 비교 대상인 비트의 1도 오류로 셈
+            errors = _POPCOUNT[np.bitwise_xor(self._bits[candidates], fingerprint.bits)].sum(axis=1)
+            compared = _POPCOUNT[np.bitwise_or(self._masks[candidates], fingerprint.mask)].sum(axis=1)
+            rates = np.where(compared >= MIN_COMPARED_BITS, errors / np.maximum(compared, 1), 1.0)
+            best = int(np.argmin(rates))
+            if rates[best] > self.max_bit_error:
+                return None
+            return self._keys[candidates[best]]
+
+    def lookup(self, fingerprint, scope=''):
+        """저장된 {'transcript', 'confidence', 'words', 'match'} 또는 None"""
+        if fingerprint is None:
+            return None
+        match = 'exact'
+        raw = self.store.get(self._key(scope, fingerprint))
+        if raw is None:
+            near_key = self._find_near(fingerprint, scope)
+            raw = self.store.get(near_key) if near_key else None
+            match = 'near'
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            if match == 'exact':
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+        cached = json.loads(raw)
+        cached['words'] = [tuple(word) for word in cached['words']]
+        cached['match'] = match
+        return cached
+
+    def put(self, fingerprint, scope, transcript, confidence, words):
+        if fingerprint is None:
+            return
+        key = self._key(scope, fingerprint)
+        value = {'transcript': transcript, 'confidence': confidence, 'words': [list(word) for word in words]}
+        self.store.set(key, json.dumps(value, ensure_ascii=False).encode('utf-8'), ttl=self.ttl)
+        with self._lock:
+            index = self._next
+            self._next = (self._next + 1) % self.max_entries
+            self._bits[index] = fingerprint.bits
+            self._masks[index] = fingerprint.mask
+            self._durations[index] = fingerprint.duration
+            self._expires[index] = time.time() + self.ttl
+            self._keys[index] = key
+            self._scopes[index] = scope
+
+    def stats(self):
+        with self._lock:
+            total = self.exact_hits + self.near_hits + self.misses
+            return {
+                'store': self.store.stats()['backend'],
+                'indexed': int(np.count_nonzero(self._expires > time.time())),
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.exact_hits + self.near_hits) / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+규칙 기반 명령 분류기 (Gemini 호출 전 빠른 경로)
+스크롤/방향/강도 부사와 단순 터치·이동 명령은 로컬에서 바로 판정하고,
+애매한 명령만 None을 반환해 LLM으로 넘깁니다.
+"""
+
+import re
+
+# 스크롤 판정 키워드 (프롬프트의 절대 규칙과 동일)
+SCROLL_KEYWORDS = ['내려', '올려', '스크롤', '내려줘', '올려줘', '아래', '위', '위로', '아래로', '화면 내려', '화면 올려']
+SCROLL_UP_KEYWORDS = ['올려', '올려줘', '위', '위로']
+SCROLL_DOWN_KEYWORDS = ['내려', '내려줘', '아래', '아래로']
+
+# 규칙 분류기에서 사용하는 확실한 스크롤 표현 - 단어 단위로만 비교 ('위로해줘', '내려받아줘' 같은 합성어는 LLM으로)
+_SCROLL_UP = re.compile(r'(?:^|\s)(?:위로|맨 ?위(?:로)?|스크롤 ?업|scroll up)(?=\s|$)')
+_SCROLL_DOWN = re.compile(r'(?:^|\s)(?:아래로|맨 ?아래(?:로)?|스크롤 ?다운|scroll down)(?=\s|$)')
+_SCROLL_NEUTRAL = re.compile(r'(?:^|\s)(?:스크롤|scroll)')
+# 단독 동사 '올려/내려' (+ 줘/봐) - 앞에 화면/강도 부사 같은 단어만 있을 때만 스크롤 ("사진 올려줘"는 업로드일 수 있음)
+_SCROLL_VERB = re.compile(r'^(올려|내려)(?:줘|줘요|봐|봐줘|주세요|줄래)?$')
+_SCROLL_CONTEXT_WORDS = {'화면', '화면을', '페이지', '페이지를', '목록', '목록을', '좀', '더', '다시', '계속',
+                         '끝까지', '한', '번', '스크롤', '위로', '아래로', '맨', '위', '아래'}
+
+# 부사형 단어 → 스크롤 양 (클라이언트 _performScrollAction 기준과 동일)
+SCROLL_INTENSITY = [
+    (('많이', '크게', '강하게', '무겁게', '빠르게', '빨리'), 600),
+    (('조금', '살짝', '적게', '약하게', '가볍게', '천천히', '느리게'), 150),
+    (('한번', '한 번', '쭉'), 400),
+    (('부드럽게', '조용히'), 250),
+]
+DEFAULT_SCROLL_AMOUNT = 300
+
+_TOUCH_VERBS = ('눌러', '클릭', '터치', '탭해', '선택해')
+_NAVIGATE_VERBS = ('열어', '실행해', '켜줘', '켜 줘', '들어가', '이동해', '가줘', '가 줘')
+_INPUT_VERBS = ('입력', '써줘', '써 줘', '타이핑', '적어')
+_NAVIGATE_SPECIAL = {
+    'back': ('뒤로 가', '뒤로가', '이전 화면', '이전화면', '뒤로 돌아'),
+    'home': ('홈으로', '홈 화면', '홈화면', '처음 화면'),
+}
+
+_PUNCTUATION = re.compile(r'[.,!?~]+')
+_SPACES = re.compile(r'\s+')
+# 대상 뒤에 붙는 군더더기 제거
+_TARGET_FILLER = re.compile(r'\s*(좀|한번|한 번)?\s*$')
+# 대상 끝 조사와 조사를 뗀 뒤 남아야 하는 최소 글자 수 ('고양이'의 '이'처럼 명사의 일부일 수 있는 조사는 길게)
+_TARGET_PARTICLES = (('을', 1), ('를', 1), ('에', 2), ('이', 3), ('가', 3), ('은', 3), ('는', 3))
+
+RULE_CONFIDENCE = 0.95
+# 화면 정보 없이 이름만으로 고른 터치 대상은 덜 확실함 (좌표는 화면 색인이 채움)
+RULE_TOUCH_CONFIDENCE = 0.7
+
+
+def normalize_command(command):
+    """문장부호와 중복 공백 제거"""
+    text = _PUNCTUATION.sub(' ', command or '')
+    return _SPACES.sub(' ', text).strip().lower()
+
+
+def _contains(text, words):
+    return any(word in text for word in words)
+
+
+def _extract_target(text, verbs):
+    """동사 앞 부분을 대상으로 추출 ("로그인 버튼 눌러줘" → "로그인 버튼")"""
+    positions = [text.find(verb) for verb in verbs if verb in text]
+    head = text[:min(positions)] if positions else text
+    return _strip_particle(_TARGET_FILLER.sub('', head).strip())
+
+
+def _strip_particle(target):
+    """대상 끝 조사 제거 - 띄어 쓴 조사이거나 뗀 뒤에도 이름이 충분히 길 때만 ("버튼을" → "버튼", "고양이"는 그대로)"""
+    head, _, word = target.rpartition(' ')
+    for particle, min_stem in _TARGET_PARTICLES:
+        if word == particle:
+            return head.strip()
+        if word.endswith(particle) and len(word) - len(particle) >= min_stem:
+            return f'{head} {word[:-len(particle)]}'.strip()
+    return target
+
+
+def _verb_direction(words):
+    """단독 '올려/내려' 동사의 방향 집합 (앞 단어가 모두 화면/강도 표현일 때만)"""
+    directions = set()
+    for i, word in enumerate(words):
+        match = _SCROLL_VERB.match(word)
+        if match and all(_is_scroll_context(w) for w in words[:i]):
+            directions.add('up' if match.group(1) == '올려' else 'down')
+    return directions
+
+
+def _is_scroll_context(word):
+    return word in _SCROLL_CONTEXT_WORDS or any(word.startswith(w) for words, _ in SCROLL_INTENSITY for w in words)
+
+
+def scroll_direction(text):
+    """명령의 스크롤 방향 (판단 불가 시 None)"""
+    verbs = _verb_direction(text.split())
+    up = 'up' in verbs or bool(_SCROLL_UP.search(text))
+    down = 'down' in verbs or bool(_SCROLL_DOWN.search(text))
+    if up and not down:
+        return 'up'
+    if down and not up:
+        return 'down'
+    if not up and not down and _SCROLL_NEUTRAL.search(text):
+        # "스크롤 해줘"처럼 방향이 없으면 아래로 (프롬프트 예시와 동일)
+        return 'down'
+    return None
+
+
+def scroll_amount(text):
+    """부사형 단어로 스크롤 양 결정"""
+    for words, amount in SCROLL_INTENSITY:
+        if _contains(text, words):
+            return amount
+    return DEFAULT_SCROLL_AMOUNT
+
+
+def classify_command(command):
+    """확실한 명령이면 분석 결과 딕셔너리, 애매하면 None (LLM으로 위임)"""
+    text = normalize_command(command)
+    if len(text) < 2:
+        return None
+
+    is_touch = _contains(text, _TOUCH_VERBS)
+    is_navigate = _contains(text, _NAVIGATE_VERBS)
+    is_input = _contains(text, _INPUT_VERBS)
+
+    # 스크롤: 터치/입력 의도가 함께 있으면 애매하므로 LLM으로
+    direction = scroll_direction(text)
+    if direction and not is_touch and not is_input:
+        label = '위' if direction == 'up' else '아래'
+        return {
+            'action': 'scroll',
+            'direction': direction,
+            'scroll_amount': scroll_amount(text),
+            'target': command,
+            'response': f'{label}로 스크롤하겠습니다.',
+            'confidence': RULE_CONFIDENCE,
+            'source': 'rule',
+        }
+
+    if is_input or direction:
+        return None
+
+    for destination, phrases in _NAVIGATE_SPECIAL.items():
+        if _contains(text, phrases) and not is_touch:
+            return {
+                'action': 'navigate',
+                'target': destination,
+                'response': f"'{command}' 명령을 실행하겠습니다.",
+                'confidence': RULE_CONFIDENCE,
+                'source': 'rule',
+            }
+
+    # 터치/이동 동사가 정확히 하나만 있고 대상이 분명한 경우만 처리
+    if is_touch == is_navigate:
+        return None
+
+    verbs = _TOUCH_VERBS if is_touch else _NAVIGATE_VERBS
+    target = _extract_target(text, verbs)
+    if not target or len(target.split()) > 4:
+        return None
+
+    # 터치 좌표는 넣지 않음 - 화면 문맥이 있으면 화면 색인이 채우고, 없으면 클라이언트 기본 좌표 사용
+    return {
+        'action': 'touch' if is_touch else 'navigate',
+        'target': target,
+        'response': f"'{command}' 명령을 실행하겠습니다.",
+        'confidence': RULE_TOUCH_CONFIDENCE if is_touch else RULE_CONFIDENCE,
+        'source': 'rule',
+    }
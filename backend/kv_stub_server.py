@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Redis 로컬 스텁 서버 (테스트 / 부하 테스트용, RESP 프로토콜)
+RedisStore가 쓰는 명령(GET, SET EX/PX/NX, DEL, EXISTS, PING, SELECT, AUTH, DBSIZE, FLUSHDB)만 지원하며
+지연을 주입할 수 있습니다. 데이터는 메모리에만 있고 db 번호는 구분하지 않습니다.
+
+사용법:
+    python -m backend.kv_stub_server --port 6390 --latency 0.001
+    CACHE_STORE_URL=redis://127.0.0.1:6390/0 python test_server.py
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+from backend.storage import read_reply
+
+
+class KVStubHandler(socketserver.StreamRequestHandler):
+    latency = 0.0
+    data = {}               # 키 -> (값, 만료 시각 또는 None) - 서브클래스마다 새 dict를 지정
+    lock = threading.Lock()
+
+    def _write(self, reply):
+        if reply is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(reply, int):
+            self.wfile.write(b':%d\r\n' % reply)
+        elif isinstance(reply, bytes):
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(reply), reply))
+        elif reply.startswith('ERR'):
+            self.wfile.write(f'-{reply}\r\n'.encode('utf-8'))
+        else:
+            self.wfile.write(f'+{reply}\r\n'.encode('utf-8'))
+
+    def _alive(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and now > entry[1]:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command, args):
+        now = time.time()
+        with self.lock:
+            if command == 'PING':
+                return 'PONG'
+            if command in ('SELECT', 'AUTH'):
+                return 'OK'
+            if command == 'GET':
+                entry = self._alive(args[0], now)
+                return entry[0] if entry else None
+            if command == 'SET':
+                key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+                expires_at = None
+                for flag, scale in ((b'EX', 1.0), (b'PX', 0.001)):
+                    if flag in options:
+                        expires_at = now + int(args[2 + options.index(flag) + 1]) * scale
+                if b'NX' in options and self._alive(key, now):
+                    return None
+                self.data[key] = (value, expires_at)
+                return 'OK'
+            if command == 'DEL':
+                return sum(1 for key in args if self.data.pop(key, None) is not None)
+            if command == 'EXISTS':
+                return sum(1 for key in args if self._alive(key, now))
+            if command == 'DBSIZE':
+                return len(self.data)
+            if command == 'FLUSHDB':
+                self.data.clear()
+                return 'OK'
+        return f"ERR unknown command '{command}'"
+
+    def handle(self):
+        while True:
+            try:
+                request = read_reply(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if not isinstance(request, list) or not request:
+                self._write('ERR protocol error')
+                continue
+            if self.latency:
+                time.sleep(self.latency)
+            self._write(self.execute(request[0].decode('utf-8').upper(), request[1:]))
+            self.wfile.flush()
+
+
+class KVStubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_kv_stub(host='127.0.0.1', port=0, latency=0.0):
+    """백그라운드 스레드에서 스텁 실행 - (서버, redis:// URL)"""
+    handler = type('BenchKVStubHandler', (KVStubHandler,),
+                   {'latency': latency, 'data': {}, 'lock': threading.Lock()})
+    server = KVStubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'redis://{host}:{server.server_address[1]}/0'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Redis(RESP) 스텁 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    parser.add_argument('--latency', type=float, default=0.0, help='명령당 응답 지연 (초)')
+    args = parser.parse_args()
+
+    KVStubHandler.latency = args.latency
+    server = KVStubServer((args.host, args.port), KVStubHandler)
+    print(f"🧪 Redis 스텁 서버: redis://{args.host}:{args.port}/0")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+Gemini REST 클라이언트
+서버 시작 시 한 번 생성해 재사용하며, keep-alive 연결 풀 / 요청별 타임아웃 /
+동시 요청 제한 / 지터 백오프 재시도를 제공합니다.
+base_url을 바꾸면 로컬 스텁 서버(backend/llm_stub_server.py)로 부하 테스트할 수 있습니다.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = 'https://generativelanguage.googleapis.com'
+
+# 재시도 대상 HTTP 상태 코드 (요청 한도 초과 / 일시적 서버 오류)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 재시도 대상 전송 오류 (연결 실패 / 타임아웃 / 응답 본문이 중간에 끊김)
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ContentDecodingError)
+
+
+class LLMError(Exception):
+    """LLM 호출 실패"""
+
+
+class LLMBusy(LLMError):
+    """동시 요청 한도 초과"""
+
+
+def build_generate_body(prompt, generation_config=None, system_instruction=None):
+    """generateContent 요청 본문"""
+    body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    if generation_config:
+        body['generationConfig'] = generation_config
+    if system_instruction:
+        body['systemInstruction'] = {'parts': [{'text': system_instruction}]}
+    return body
+
+
+def candidate_text(data):
+    """generateContent 응답의 첫 번째 후보 텍스트"""
+    try:
+        parts = data['candidates'][0]['content']['parts']
+    except (KeyError, IndexError, TypeError):
+        raise LLMError(f'Gemini 응답에 후보가 없습니다: {str(data)[:200]}')
+    return ''.join(part.get('text', '') for part in parts)
+
+
+def parse_response(response):
+    """응답을 (JSON 본문, 재시도할 오류)로 - 200이 아니거나 본문이 JSON이 아니면 LLMError (재시도 불가 상태는 바로 발생)
+
+    200인데 JSON이 아닌 본문(프록시 오류 페이지 / 잘린 응답)은 일시적 오류로 보고 재시도합니다.
+    """
+    if response.status_code != 200:
+        error = LLMError(f'Gemini 응답 오류 {response.status_code}: {response.text[:200]}')
+        if response.status_code not in RETRYABLE_STATUS:
+            raise error
+        return None, error
+    try:
+        return response.json(), None
+    except ValueError:
+        return None, LLMError(f'Gemini 응답이 JSON이 아닙니다: {response.text[:200]}')
+
+
+def backoff_delay(attempt, retry_after=None, backoff_base=0.25, backoff_max=4.0):
+    """Retry-After가 있으면 우선, 없으면 full jitter 지수 백오프"""
+    if retry_after:
+        try:
+            return min(float(retry_after), backoff_max)
+        except ValueError:
+            pass
+    return random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+
+
+class GeminiClient:
+    """연결 풀과 재시도를 갖춘 Gemini generateContent 클라이언트"""
+
+    def __init__(self, api_key, model='gemini-1.5-pro', base_url=DEFAULT_BASE_URL,
+                 timeout=15.0, connect_timeout=3.0, max_concurrent=8, queue_timeout=5.0,
+                 max_retries=2, backoff_base=0.25, backoff_max=4.0, pool_size=16):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._session.headers.update({
+            'Content-Type': 'application/json',
+            'x-goog-api-key': api_key or '',
+        })
+
+    @property
+    def endpoint(self):
+        return f'{self.base_url}/v1beta/models/{self.model}:generateContent'
+
+    def _backoff(self, attempt, retry_after=None):
+        return backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max)
+
+    def generate_content(self, body, timeout=None):
+        """generateContent 원본 요청/응답 (딕셔너리)"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMBusy('LLM 동시 요청 한도 초과')
+        try:
+            return self._post_with_retry(body, timeout or self.timeout)
+        finally:
+            self._slots.release()
+
+    def _post_with_retry(self, body, timeout):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self._session.post(
+                    self.endpoint, json=body, timeout=(self.connect_timeout, timeout)
+                )
+            except RETRYABLE_ERRORS as e:
+                last_error = LLMError(f'Gemini 연결 오류: {e}')
+            except requests.RequestException as e:
+                raise LLMError(f'Gemini 요청 오류: {e}')
+            else:
+                data, last_error = parse_response(response)
+                if last_error is None:
+                    return data
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+        raise last_error
+
+    def generate(self, prompt, generation_config=None, system_instruction=None, timeout=None):
+        """프롬프트를 보내고 첫 번째 후보의 텍스트 반환"""
+        body = build_generate_body(prompt, generation_config, system_instruction)
+        return candidate_text(self.generate_content(body, timeout))
+
+    def ping(self, timeout=3.0):
+        """모델 정보 조회로 API Key / 연결 확인 (할당량을 쓰지 않음, 연결 풀도 미리 채워짐)"""
+        try:
+            response = self._session.get(
+                f'{self.base_url}/v1beta/models/{self.model}', timeout=(self.connect_timeout, timeout)
+            )
+        except requests.RequestException as e:
+            raise LLMError(f'Gemini 연결 오류: {e}')
+        if response.status_code != 200:
+            raise LLMError(f'Gemini 응답 오류 {response.status_code}: {response.text[:200]}')
+        return True
+
+    def close(self):
+        self._session.close()
+
+
+class AsyncGeminiClient:
+    """asyncio 서버 모드용 Gemini 클라이언트 (httpx.AsyncClient 연결 풀, 재시도 규칙은 GeminiClient와 동일)
+
+    동시 요청 제한은 호출하는 쪽의 단계별 리미터가 담당합니다.
+    """
+
+    def __init__(self, api_key, model='gemini-1.5-pro', base_url=DEFAULT_BASE_URL,
+                 timeout=15.0, connect_timeout=3.0, max_retries=2, backoff_base=0.25,
+                 backoff_max=4.0, pool_size=64):
+        import httpx
+
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._httpx = httpx
+        self._client = httpx.AsyncClient(
+            headers={'Content-Type': 'application/json', 'x-goog-api-key': api_key or ''},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    @property
+    def endpoint(self):
+        return f'{self.base_url}/v1beta/models/{self.model}:generateContent'
+
+    async def generate_content(self, body, timeout=None):
+        """generateContent 원본 요청/응답 (딕셔너리)"""
+        request_timeout = self._httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await self._client.post(self.endpoint, json=body, timeout=request_timeout)
+            except self._httpx.RequestError as e:
+                # 연결 실패 / 타임아웃 / 프로토콜 오류 / 본문 디코딩 실패
+                last_error = LLMError(f'Gemini 연결 오류: {e}')
+            else:
+                data, last_error = parse_response(response)
+                if last_error is None:
+                    return data
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max))
+        raise last_error
+
+    async def generate(self, prompt, generation_config=None, system_instruction=None, timeout=None):
+        """프롬프트를 보내고 첫 번째 후보의 텍스트 반환"""
+        body = build_generate_body(prompt, generation_config, system_instruction)
+        return candidate_text(await self.generate_content(body, timeout))
+
+    async def close(self):
+        await self._client.aclose()
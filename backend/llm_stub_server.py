@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+Gemini generateContent 로컬 스텁 서버 (부하 테스트용)
+
+사용법:
+    python -m backend.llm_stub_server --port 8081 --latency 0.3 --error-rate 0.05
+    GEMINI_BASE_URL=http://127.0.0.1:8081 GEMINI_API_KEY=stub python test_server.py
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.intent_rules import classify_command
+
+_COMMAND_PATTERN = re.compile(r'"([^"\n]+)"\s*$', re.MULTILINE)
+
+
+def fake_analysis(prompt):
+    """프롬프트 마지막 따옴표 안의 명령을 규칙 분류기로 흉내 내어 JSON 응답 생성"""
+    matches = _COMMAND_PATTERN.findall(prompt)
+    command = matches[-1] if matches else prompt.strip().splitlines()[-1]
+    result = classify_command(command) or {
+        'action': 'touch',
+        'target': command,
+        'coordinates': {'x': 200, 'y': 300},
+    }
+    result.pop('source', None)
+    return json.dumps(result, ensure_ascii=False)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    hang_rate = 0.0          # 응답하지 않고 hang_seconds 동안 붙잡는 비율 (타임아웃 주입)
+    hang_seconds = 30.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # 모델 정보 조회 (GeminiClient.ping)
+        if '/v1beta/models/' not in self.path:
+            self._send(404, {'error': {'message': 'not found'}})
+            return
+        model = self.path.rsplit('/', 1)[-1]
+        self._send(200, {'name': f'models/{model}', 'displayName': 'stub'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request_body = json.loads(self.rfile.read(length) or b'{}')
+
+        if not self.path.endswith(':generateContent'):
+            self._send(404, {'error': {'message': 'not found'}})
+            return
+
+        roll = random.random()
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if roll >= 1.0 - self.error_rate:
+            self._send(503, {'error': {'message': 'stub injected error'}}, {'Retry-After': '0'})
+            return
+
+        prompt = ''.join(
+            part.get('text', '')
+            for content in request_body.get('contents', [])
+            for part in content.get('parts', [])
+        )
+        self._send(200, {
+            'candidates': [{
+                'content': {'role': 'model', 'parts': [{'text': fake_analysis(prompt)}]},
+                'finishReason': 'STOP',
+            }]
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gemini 스텁 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='응답 지연 (초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='지연 편차 (초)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 오류 주입 비율 (0~1)')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='응답 지연(타임아웃) 주입 비율 (0~1)')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.jitter = args.jitter
+    StubHandler.error_rate = args.error_rate
+    StubHandler.hang_rate = args.hang_rate
+    StubHandler.hang_seconds = args.hang_seconds
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"🧪 Gemini 스텁 서버: http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
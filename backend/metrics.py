@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+"""
+단계별 지연 시간 히스토그램 + 엔드포인트별 요청/오류 카운터
+Prometheus 텍스트 형식(/metrics)으로 내보내며, p50/p95/p99는 최근 관측값 창에서 계산합니다.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 초 단위 히스토그램 버킷 (음성 파이프라인 지연 범위에 맞춤)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+class LatencyHistogram:
+    """누적 버킷 + 최근 window개 관측값 (분위수 계산용)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=2048):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        return {q: _quantile(values, q) for q in QUANTILES}
+
+
+class MetricsRegistry:
+    """단계 지연 / 엔드포인트 지연 / 요청·오류 카운터 보관 (스레드 안전)"""
+
+    def __init__(self, namespace='voice_assistant', buckets=DEFAULT_BUCKETS, window=2048):
+        self.namespace = namespace
+        self.buckets = buckets
+        self.window = window
+        self._stages = {}      # 단계 -> LatencyHistogram
+        self._endpoints = {}   # 엔드포인트 -> LatencyHistogram
+        self._requests = {}    # (엔드포인트, 상태 코드) -> 건수
+        self._errors = {}      # (엔드포인트, 단계/원인) -> 건수
+        self._coalesced = {}   # (작업 그룹, leader|merged) -> 건수
+        self._speculation = {}  # 추측 분석 결과(hit|miss|none) -> 건수
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = LatencyHistogram(self.buckets, self.window)
+        return histogram
+
+    def observe(self, stage, seconds):
+        """단계 소요 시간 기록 (초)"""
+        with self._lock:
+            self._histogram(self._stages, stage).observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        """with metrics.timed('stt'): ... - 예외가 나도 소요 시간은 기록"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def record_request(self, endpoint, status, seconds=None):
+        """엔드포인트 요청 1건 (상태 코드 400 이상은 오류로도 집계)"""
+        with self._lock:
+            key = (endpoint, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if int(status) >= 400:
+                error_key = (endpoint, f'http_{status}')
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+            if seconds is not None:
+                self._histogram(self._endpoints, endpoint).observe(seconds)
+
+    def record_error(self, endpoint, kind):
+        """응답 코드로 드러나지 않는 오류 (예: STT 실패 후 기본 응답)"""
+        with self._lock:
+            key = (endpoint, kind)
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def record_coalesced(self, group, merged):
+        """동시 요청 합치기 - 직접 실행한 호출(leader)과 진행 중인 결과를 공유한 호출(merged)"""
+        with self._lock:
+            key = (group, 'merged' if merged else 'leader')
+            self._coalesced[key] = self._coalesced.get(key, 0) + 1
+
+    def record_speculation(self, outcome):
+        """interim 기반 추측 분석 - 최종 문장과 일치(hit), 불일치(miss), 추측 없음(none)"""
+        with self._lock:
+            self._speculation[outcome] = self._speculation.get(outcome, 0) + 1
+
+    def snapshot(self):
+        """JSON용 요약 (밀리초)"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._stages.items():
+                quantiles = histogram.quantiles()
+                stages[stage] = {
+                    'count': histogram.count,
+                    'avg_ms': round(histogram.total / histogram.count * 1000, 2) if histogram.count else 0.0,
+                    **{f'p{int(q * 100)}_ms': round(value * 1000, 2) for q, value in quantiles.items()},
+                }
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'stages': stages,
+                'requests': {f'{endpoint} {status}': count for (endpoint, status), count in self._requests.items()},
+                'errors': {f'{endpoint} {kind}': count for (endpoint, kind), count in self._errors.items()},
+                'coalesced': {f'{group} {role}': count for (group, role), count in self._coalesced.items()},
+                'speculation': dict(self._speculation),
+            }
+
+    def _render_histograms(self, lines, name, label_name, table, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key in sorted(table):
+            histogram = table[key]
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_label_text({label_name: key, "le": bound})} {cumulative}')
+            lines.append(f'{name}_bucket{_label_text({label_name: key, "le": "+Inf"})} {histogram.count}')
+            lines.append(f'{name}_sum{_label_text({label_name: key})} {histogram.total:.6f}')
+            lines.append(f'{name}_count{_label_text({label_name: key})} {histogram.count}')
+
+        quantile_name = f'{name}_quantile'
+        lines.append(f'# HELP {quantile_name} {help_text} (최근 {self.window}건 기준 분위수)')
+        lines.append(f'# TYPE {quantile_name} gauge')
+        for key in sorted(table):
+            for q, value in table[key].quantiles().items():
+                lines.append(f'{quantile_name}{_label_text({label_name: key, "quantile": q})} {value:.6f}')
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 노출 형식"""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, f'{ns}_stage_duration_seconds', 'stage', self._stages,
+                                    '파이프라인 단계별 소요 시간')
+            self._render_histograms(lines, f'{ns}_request_duration_seconds', 'endpoint', self._endpoints,
+                                    '엔드포인트별 요청 처리 시간')
+
+            lines.append(f'# HELP {ns}_requests_total 엔드포인트별 요청 수')
+            lines.append(f'# TYPE {ns}_requests_total counter')
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'{ns}_requests_total{_label_text({"endpoint": endpoint, "status": status})} {count}')
+
+            lines.append(f'# HELP {ns}_errors_total 엔드포인트별 오류 수')
+            lines.append(f'# TYPE {ns}_errors_total counter')
+            for (endpoint, kind), count in sorted(self._errors.items()):
+                lines.append(f'{ns}_errors_total{_label_text({"endpoint": endpoint, "kind": kind})} {count}')
+
+            lines.append(f'# HELP {ns}_coalesced_calls_total 동시 요청 합치기 호출 수 (role=merged는 실행을 생략한 호출)')
+            lines.append(f'# TYPE {ns}_coalesced_calls_total counter')
+            for (group, role), count in sorted(self._coalesced.items()):
+                lines.append(f'{ns}_coalesced_calls_total{_label_text({"group": group, "role": role})} {count}')
+
+            lines.append(f'# HELP {ns}_speculation_total interim 기반 추측 명령 분석 결과 수 (hit는 최종 문장과 일치)')
+            lines.append(f'# TYPE {ns}_speculation_total counter')
+            for outcome, count in sorted(self._speculation.items()):
+                lines.append(f'{ns}_speculation_total{_label_text({"outcome": outcome})} {count}')
+
+        lines.append(f'# HELP {ns}_uptime_seconds 서버 가동 시간')
+        lines.append(f'# TYPE {ns}_uptime_seconds gauge')
+        lines.append(f'{ns}_uptime_seconds {time.time() - self.started_at:.1f}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+멀티 프로세스(prefork) 실행
+부모 프로세스가 리슨 소켓을 열고 fork해도 안전한 모델(VAD, 호출어 템플릿 등)을 미리 올린 뒤 워커를 fork합니다.
+워커들은 같은 소켓에서 accept하므로 CPU 코어 수만큼 요청을 나눠 처리하고,
+모델 메모리는 copy-on-write로 공유됩니다. 워커가 죽으면 부모가 다시 띄웁니다.
+캐시를 워커 간에 공유하려면 CACHE_STORE_URL을 Redis로 지정하세요 (backend.storage).
+"""
+
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+
+class PreforkServer:
+    """werkzeug 스레드 서버 워커 N개를 fork해 하나의 소켓을 공유"""
+
+    def __init__(self, app, host='0.0.0.0', port=8000, workers=2, after_fork=None, backlog=128,
+                 restart_delay=1.0):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.after_fork = after_fork  # 워커 프로세스에서 서버 시작 전에 호출 (클라이언트/스레드 생성)
+        self.backlog = backlog
+        self.restart_delay = restart_delay
+        self.children = {}  # pid -> 시작 시각
+        self._socket = None
+        self._stopping = False
+
+    def _listen(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self):
+        sys.stdout.flush()  # 버퍼에 남은 출력이 워커마다 중복되지 않도록
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # 워커 프로세스
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            if self.after_fork is not None:
+                self.after_fork()
+            server = make_server(self.host, self.port, self.app, threaded=True, fd=self._socket.fileno())
+            server.serve_forever()
+        except Exception as e:
+            print(f"❌ 워커 {os.getpid()} 종료: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self):
+        self._socket = self._listen()
+        print(f"🧵 prefork 워커 {self.workers}개 시작: http://{self.host}:{self.port}")
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if self._stopping or started is None:
+                continue
+            print(f"⚠️ 워커 {pid} 종료 (status={status}) - 다시 시작")
+            # 시작하자마자 죽는 워커가 빠르게 반복 재시작되지 않도록
+            if time.monotonic() - started < self.restart_delay:
+                time.sleep(self.restart_delay)
+            self._spawn()
+        self._socket.close()
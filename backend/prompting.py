@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""
+명령 분석 프롬프트 구성
+버전이 붙은 짧은 시스템 지시문을 재사용하고, 명령과 관련된 예시만 골라 붙이며,
+JSON 스키마 강제 출력 + 견고한 JSON 추출기로 응답을 파싱합니다.
+"""
+
+import json
+import re
+
+PROMPT_VERSION = 'command-v3'
+
+ACTIONS = ('touch', 'scroll', 'input', 'navigate')
+
+SYSTEM_INSTRUCTION = """음성 명령을 touch / scroll / input / navigate 중 하나로 분류해 JSON 하나만 출력하세요.
+- touch: 화면의 버튼·항목을 누름 ("눌러", "클릭", "터치"). target에 대상 이름.
+- scroll: 화면 이동. "내려", "올려", "스크롤", "위로", "아래로"가 있으면 항상 scroll이며 절대 touch가 아님.
+  "많이/조금/살짝/쭉/천천히" 같은 부사는 양만 바꿀 뿐 scroll 그대로. direction은 up 또는 down.
+- input: 글자 입력. text에 입력할 내용, target에 입력 위치.
+- navigate: 앱·페이지 열기/이동. target에 앱 또는 페이지 이름.
+화면 요소 목록이 있으면 touch 대상은 목록에서 골라 그 번호를 element에 넣으세요 (맞는 요소가 없으면 생략).
+response에는 사용자에게 들려줄 짧은 한국어 안내 문장을 넣으세요."""
+
+# Gemini responseSchema (OpenAPI 부분집합)
+RESPONSE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'action': {'type': 'STRING', 'enum': list(ACTIONS)},
+        'direction': {'type': 'STRING', 'enum': ['up', 'down']},
+        'target': {'type': 'STRING'},
+        'text': {'type': 'STRING'},
+        'coordinates': {
+            'type': 'OBJECT',
+            'properties': {'x': {'type': 'INTEGER'}, 'y': {'type': 'INTEGER'}},
+        },
+        'element': {'type': 'INTEGER'},
+        'response': {'type': 'STRING'},
+    },
+    'required': ['action'],
+}
+
+GENERATION_CONFIG = {
+    'responseMimeType': 'application/json',
+    'responseSchema': RESPONSE_SCHEMA,
+    'temperature': 0.0,
+    'maxOutputTokens': 256,
+}
+
+# 예시 후보 (기존 프롬프트 예시 + touch/input/navigate 보강)
+FEW_SHOT_EXAMPLES = [
+    ('스크롤 해줘', {'action': 'scroll', 'direction': 'down'}),
+    ('위로 올려줘', {'action': 'scroll', 'direction': 'up'}),
+    ('아래로 내려줘', {'action': 'scroll', 'direction': 'down'}),
+    ('많이 내려줘', {'action': 'scroll', 'direction': 'down'}),
+    ('조금 올려줘', {'action': 'scroll', 'direction': 'up'}),
+    ('살짝 내려줘', {'action': 'scroll', 'direction': 'down'}),
+    ('천천히 내려줘', {'action': 'scroll', 'direction': 'down'}),
+    ('부드럽게 올려줘', {'action': 'scroll', 'direction': 'up'}),
+    ('쭉 내려줘', {'action': 'scroll', 'direction': 'down'}),
+    ('화면 눌러줘', {'action': 'touch', 'target': '화면', 'coordinates': {'x': 100, 'y': 300}}),
+    ('로그인 버튼 눌러줘', {'action': 'touch', 'target': '로그인 버튼'}),
+    ('첫 번째 검색 결과 클릭해줘', {'action': 'touch', 'target': '첫 번째 검색 결과'}),
+    ('검색창에 날씨 입력해줘', {'action': 'input', 'target': '검색창', 'text': '날씨'}),
+    ('아이디에 hong123 써줘', {'action': 'input', 'target': '아이디', 'text': 'hong123'}),
+    ('유튜브 열어줘', {'action': 'navigate', 'target': '유튜브'}),
+    ('설정 화면으로 가줘', {'action': 'navigate', 'target': '설정'}),
+]
+
+MAX_EXAMPLES = 4
+
+
+def _bigrams(text):
+    compact = re.sub(r'\s+', '', text)
+    return {compact[i:i + 2] for i in range(len(compact) - 1)} or {compact}
+
+
+# 예시 bigram은 미리 계산
+_EXAMPLE_BIGRAMS = [(_bigrams(command), command, output) for command, output in FEW_SHOT_EXAMPLES]
+
+
+def select_examples(command, limit=MAX_EXAMPLES):
+    """명령과 글자 bigram이 많이 겹치는 예시를 관련도 순으로 선택"""
+    query = _bigrams(command)
+    scored = []
+    for index, (bigrams, example_command, output) in enumerate(_EXAMPLE_BIGRAMS):
+        overlap = len(query & bigrams) / len(query | bigrams)
+        scored.append((-overlap, index, example_command, output))
+    scored.sort()
+
+    selected = []
+    for _, _, example_command, output in scored:
+        # 같은 액션만 반복되지 않도록 액션당 최대 2개
+        if sum(1 for _, o in selected if o['action'] == output['action']) >= 2:
+            continue
+        selected.append((example_command, output))
+        if len(selected) >= limit:
+            break
+    return selected
+
+
+def build_command_prompt(command, screen_elements=None):
+    """관련 예시 몇 개 + (있으면) 추린 화면 요소 목록 + 분석할 명령으로 구성된 짧은 사용자 프롬프트"""
+    lines = ['예시:']
+    for example_command, output in select_examples(command):
+        lines.append(f'"{example_command}" → {json.dumps(output, ensure_ascii=False)}')
+    if screen_elements:
+        lines.append('화면 요소 (번호: 이름 [종류] @(x,y)):')
+        lines.append(screen_elements)
+    lines.append('명령:')
+    lines.append(f'"{command}"')
+    return '\n'.join(lines)
+
+
+_CODE_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+
+
+def _first_json_object(text):
+    """문자열 안의 첫 번째 균형 잡힌 {...} 구간 (문자열 리터럴 안의 괄호는 무시)"""
+    start = text.find('{')
+    while start != -1:
+        depth = 0
+        in_string = False
+        escaped = False
+        for index in range(start, len(text)):
+            char = text[index]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    return text[start:index + 1]
+        start = text.find('{', start + 1)
+    return None
+
+
+def extract_command_json(text):
+    """LLM 응답에서 명령 JSON 추출 - 코드 블록/앞뒤 설명문이 있어도 처리, 실패 시 None"""
+    if not text:
+        return None
+    candidates = _CODE_FENCE.findall(text) + [text]
+    for candidate in candidates:
+        snippet = _first_json_object(candidate)
+        if snippet is None:
+            continue
+        try:
+            parsed = json.loads(snippet)
+        except ValueError:
+            continue
+        if isinstance(parsed, dict) and parsed.get('action') in ACTIONS:
+            return parsed
+    return None
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+
+"""
+화면 문맥 색인 - 접근성 트리 스냅샷으로 터치 대상을 실제 좌표로 찾기
+앱(MyAccessibilityService.collectScreenSnapshot)이 보낸 화면 요소 목록으로 메모리 색인을 만듭니다.
+- 글자 bigram 역색인: 텍스트 / 콘텐츠 설명 / 리소스 ID → 요소 (띄어쓰기·조사 차이에 강함)
+- 공간 격자: 좌표 → 그 칸에 걸친 요소 (좌표 검증, 위치 표현 "오른쪽 위", 누를 수 있는 상위 요소 찾기)
+"로그인 버튼 눌러"는 색인 조회만으로 좌표가 정해지고, 후보가 여럿이라 애매할 때만 추린 후보 목록을 LLM에 넘깁니다.
+
+스냅샷 형식 (JSON, 키를 짧게 줄임):
+    {"package": "com.example", "width": 1080, "height": 2340,
+     "nodes": [{"t": "로그인", "d": "", "id": "com.example:id/login", "c": "Button",
+                "b": [left, top, right, bottom], "f": 1, "p": 0}, ...]}
+    f: 플래그 비트 (1 누를 수 있음, 2 입력 가능, 4 스크롤 가능, 8 체크 가능), p: 부모 노드 번호 (선택)
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+CLICKABLE = 1
+EDITABLE = 2
+SCROLLABLE = 4
+CHECKABLE = 8
+
+MAX_NODES = 3000
+GRID_COLUMNS = 6
+GRID_ROWS = 12
+
+MIN_SCORE = 0.5            # 이보다 낮은 일치는 후보로 보지 않음
+RESOLVE_SCORE = 0.75       # 조회만으로 확정하려면 이 이상 (낮으면 후보를 LLM이 확인)
+AMBIGUITY_MARGIN = 0.1     # 1등과 점수 차가 이보다 작은 다른 대상이 있으면 애매함
+SNAP_DISTANCE_RATIO = 0.08  # 좌표 보정: 화면 대각선의 이 비율 안에 있는 누를 수 있는 요소로 옮김
+
+_PUNCTUATION = re.compile(r'[^\w]+')
+_ID_SEPARATORS = re.compile(r'[_\-.]+')
+
+# 대상 표현에서 빼는 동사/군더더기 (순서대로 제거)
+_FILLER = re.compile(r'(눌러|클릭|터치|탭해|선택해|선택|해\s*줘|해\s*주세요|줘|주세요|좀|한\s*번|한번)')
+_PARTICLE = re.compile(r'(을|를|이|가|은|는|에|에서|의|으로|로)$')
+
+# 대상 종류 표현 → (원하는 요소 플래그, 검색어에 남길 부분) - "검색창"은 입력 요소 + 검색어 '검색'
+_ROLE_WORDS = (
+    ('검색창', EDITABLE, '검색'), ('입력창', EDITABLE, ''), ('입력란', EDITABLE, ''), ('입력 칸', EDITABLE, ''),
+    ('체크박스', CHECKABLE, ''), ('스위치', CHECKABLE, ''), ('토글', CHECKABLE, ''),
+    ('버튼', CLICKABLE, ''), ('아이콘', CLICKABLE, ''), ('링크', CLICKABLE, ''), ('항목', CLICKABLE, ''),
+)
+
+# 위치 표현 → 화면 영역 (가로 시작, 세로 시작, 가로 끝, 세로 끝 비율)
+_REGIONS = (
+    (('오른쪽 위', '우측 상단', '오른쪽 상단'), (0.5, 0.0, 1.0, 0.34)),
+    (('왼쪽 위', '좌측 상단', '왼쪽 상단'), (0.0, 0.0, 0.5, 0.34)),
+    (('오른쪽 아래', '우측 하단', '오른쪽 하단'), (0.5, 0.66, 1.0, 1.0)),
+    (('왼쪽 아래', '좌측 하단', '왼쪽 하단'), (0.0, 0.66, 0.5, 1.0)),
+    (('맨 위', '위쪽', '상단', '위에 있는'), (0.0, 0.0, 1.0, 0.34)),
+    (('맨 아래', '아래쪽', '하단', '밑에 있는', '아래에 있는'), (0.0, 0.66, 1.0, 1.0)),
+    (('오른쪽', '우측'), (0.5, 0.0, 1.0, 1.0)),
+    (('왼쪽', '좌측'), (0.0, 0.0, 0.5, 1.0)),
+    (('가운데', '중앙'), (0.25, 0.25, 0.75, 0.75)),
+)
+
+_ORDINAL_WORDS = {'첫': 1, '두': 2, '세': 3, '네': 4, '다섯': 5, '여섯': 6, '일곱': 7, '여덟': 8, '아홉': 9, '열': 10}
+_ORDINAL = re.compile(r'(\d+|첫|두|세|네|다섯|여섯|일곱|여덟|아홉|열)\s*번\s*째|(마지막)')
+
+
+class ScreenSnapshotError(ValueError):
+    """스냅샷 형식 오류"""
+
+
+def compact_text(text):
+    """비교용 텍스트 - 소문자, 문장부호/공백 제거"""
+    return _PUNCTUATION.sub('', (text or '').lower())
+
+
+def _bigrams(compact):
+    if len(compact) < 2:
+        return {compact} if compact else set()
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+def _label_similarity(query, label):
+    """0~1 - 같으면 1, 한쪽이 다른 쪽을 포함하면 길이 비율 반영, 아니면 bigram Dice 계수"""
+    if not query or not label:
+        return 0.0
+    if query == label:
+        return 1.0
+    query_bigrams, label_bigrams = _bigrams(query), _bigrams(label)
+    dice = 2 * len(query_bigrams & label_bigrams) / (len(query_bigrams) + len(label_bigrams))
+    if query in label or label in query:
+        shorter, longer = sorted((len(query), len(label)))
+        dice = max(dice, 0.6 + 0.35 * shorter / longer)
+    return dice
+
+
+class UIElement:
+    """화면 요소 하나 (bounds는 화면 픽셀 [left, top, right, bottom])"""
+
+    __slots__ = ('index', 'text', 'desc', 'view_id', 'class_name', 'bounds', 'flags', 'parent', 'target', 'keys',
+                 'inherited')
+
+    def __init__(self, index, text, desc, view_id, class_name, bounds, flags, parent):
+        self.index = index
+        self.text = text
+        self.desc = desc
+        self.view_id = view_id
+        self.class_name = class_name
+        self.bounds = bounds
+        self.flags = flags
+        self.parent = parent
+        self.target = self      # 실제로 누를 요소 (글자만 있는 요소면 누를 수 있는 상위 요소)
+        self.inherited = ''     # 글자 없는 누를 수 있는 요소면 안쪽 글자 (표시용)
+        id_name = view_id.rsplit('/', 1)[-1] if view_id else ''
+        # (비교용 텍스트, 가중치) - 화면에 보이는 글자를 가장 믿음
+        self.keys = [(key, weight) for key, weight in (
+            (compact_text(text), 1.0),
+            (compact_text(desc), 0.95),
+            (compact_text(_ID_SEPARATORS.sub(' ', id_name)), 0.8),
+        ) if key]
+
+    @property
+    def label(self):
+        if self.text or self.desc or self.inherited:
+            return self.text or self.desc or self.inherited
+        return self.view_id.rsplit('/', 1)[-1] if self.view_id else self.class_name
+
+    @property
+    def center(self):
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+    @property
+    def area(self):
+        left, top, right, bottom = self.bounds
+        return max(right - left, 0) * max(bottom - top, 0)
+
+    def has(self, flag):
+        return bool(self.flags & flag)
+
+    def contains(self, x, y):
+        left, top, right, bottom = self.bounds
+        return left <= x < right and top <= y < bottom
+
+    def to_dict(self):
+        x, y = self.center
+        return {'index': self.index, 'label': self.label, 'class': self.class_name,
+                'bounds': list(self.bounds), 'center': {'x': x, 'y': y}}
+
+
+class TargetQuery:
+    """대상 표현 분해 - "오른쪽 위 두 번째 검색 버튼" → 검색어 '검색', 순서 2, 영역, 원하는 플래그"""
+
+    def __init__(self, text):
+        self.raw = text or ''
+        rest = ' ' + ' '.join(self.raw.lower().split()) + ' '
+
+        self.region = None
+        for phrases, region in _REGIONS:
+            phrase = next((p for p in phrases if p in rest), None)
+            if phrase:
+                self.region = region
+                rest = rest.replace(phrase, ' ')
+                break
+
+        self.ordinal = None
+        match = _ORDINAL.search(rest)
+        if match:
+            word = match.group(1)
+            self.ordinal = -1 if match.group(2) else int(word) if word.isdigit() else _ORDINAL_WORDS[word]
+            rest = rest[:match.start()] + ' ' + rest[match.end():]
+
+        self.role = 0
+        for word, flag, keep in _ROLE_WORDS:
+            if word in rest:
+                self.role = flag
+                remaining = rest.replace(word, f' {keep} ')
+                # 종류 표현만 있으면 ("버튼 눌러") 그대로 검색어로 둠
+                if compact_text(_FILLER.sub(' ', remaining)):
+                    rest = remaining
+                break
+
+        words = _FILLER.sub(' ', rest).split()
+        self.text = compact_text(''.join(words))
+        # 조사를 뗀 형태도 함께 비교 ("장바구니로" → "장바구니", "특가"처럼 남는 말이 한 글자면 떼지 않음)
+        stripped = compact_text(''.join(_PARTICLE.sub('', word) if len(_PARTICLE.sub('', word)) >= 2 else word
+                                        for word in words))
+        self.variants = [self.text] + ([stripped] if stripped != self.text else [])
+
+    @property
+    def is_positional(self):
+        """검색어 없이 위치/순서만 있는 표현 ("첫 번째 결과", "오른쪽 위")"""
+        return not self.text and (self.ordinal is not None or self.region is not None)
+
+
+class TargetMatch:
+    """대상 찾기 결과 - element(누를 요소)가 있으면 확정, ambiguous면 candidates를 LLM에 넘김"""
+
+    def __init__(self, element=None, score=0.0, candidates=(), ambiguous=False, matched=None):
+        self.element = element
+        self.score = score
+        self.candidates = list(candidates)
+        self.ambiguous = ambiguous
+        self.matched = matched or element
+
+    @property
+    def resolved(self):
+        return self.element is not None and not self.ambiguous
+
+    def to_dict(self):
+        return {
+            'resolved': self.resolved,
+            'score': round(self.score, 3),
+            'element': self.element.to_dict() if self.element is not None else None,
+            'candidates': [element.to_dict() for element in self.candidates],
+        }
+
+
+class ScreenIndex:
+    """스냅샷 하나에 대한 역색인 + 공간 격자 (만든 뒤에는 읽기 전용이라 스레드 간 공유 가능)"""
+
+    def __init__(self, elements, width, height, package=None, screen_id=None):
+        self.elements = elements
+        self.width = max(int(width), 1)
+        self.height = max(int(height), 1)
+        self.package = package
+        self.screen_id = screen_id
+        self.built_at = time.time()
+
+        self._grid = [[] for _ in range(GRID_COLUMNS * GRID_ROWS)]
+        for element in elements:
+            for cell in self._cells(element.bounds):
+                self._grid[cell].append(element)
+        for element in elements:
+            element.target = self._tap_target(element)
+            if element.target is not element and element.keys and not element.target.keys:
+                element.target.inherited = element.target.inherited or element.text or element.desc
+
+        self._postings = {}   # bigram → 요소 번호 집합
+        for element in elements:
+            for key, _ in element.keys:
+                for bigram in _bigrams(key):
+                    self._postings.setdefault(bigram, set()).add(element.index)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """앱이 보낸 스냅샷 딕셔너리로 색인 생성 (형식 오류는 ScreenSnapshotError)"""
+        if not isinstance(snapshot, dict) or not isinstance(snapshot.get('nodes'), list):
+            raise ScreenSnapshotError('nodes 목록이 없습니다.')
+        nodes = snapshot['nodes']
+        if len(nodes) > MAX_NODES:
+            raise ScreenSnapshotError(f'요소가 너무 많습니다 ({len(nodes)} > {MAX_NODES}).')
+        try:
+            width = int(snapshot.get('width') or 0)
+            height = int(snapshot.get('height') or 0)
+            elements = []
+            for index, node in enumerate(nodes):
+                left, top, right, bottom = (int(value) for value in node['b'])
+                parent = node.get('p')
+                elements.append(UIElement(
+                    index, str(node.get('t') or ''), str(node.get('d') or ''), str(node.get('id') or ''),
+                    str(node.get('c') or '').rsplit('.', 1)[-1], (left, top, right, bottom),
+                    int(node.get('f') or 0), int(parent) if parent is not None else None,
+                ))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ScreenSnapshotError(f'요소 형식이 올바르지 않습니다: {e}')
+        # 화면 크기가 없으면 요소 범위로 추정
+        width = width or max((element.bounds[2] for element in elements), default=1)
+        height = height or max((element.bounds[3] for element in elements), default=1)
+        return cls(elements, width, height, snapshot.get('package'), snapshot_id(snapshot))
+
+    def _cells(self, bounds):
+        left, top, right, bottom = bounds
+        first_column = min(max(left * GRID_COLUMNS // self.width, 0), GRID_COLUMNS - 1)
+        last_column = min(max((right - 1) * GRID_COLUMNS // self.width, 0), GRID_COLUMNS - 1)
+        first_row = min(max(top * GRID_ROWS // self.height, 0), GRID_ROWS - 1)
+        last_row = min(max((bottom - 1) * GRID_ROWS // self.height, 0), GRID_ROWS - 1)
+        return [row * GRID_COLUMNS + column
+                for row in range(first_row, last_row + 1) for column in range(first_column, last_column + 1)]
+
+    def _cell_at(self, x, y):
+        column = min(max(int(x) * GRID_COLUMNS // self.width, 0), GRID_COLUMNS - 1)
+        row = min(max(int(y) * GRID_ROWS // self.height, 0), GRID_ROWS - 1)
+        return self._grid[row * GRID_COLUMNS + column]
+
+    def _tap_target(self, element):
+        """누를 요소 - 자신이 누를 수 있으면 자신, 아니면 부모 번호를 따라 (없으면 중심점을 감싸는 가장 작은) 누를 수 있는 요소"""
+        if element.has(CLICKABLE) or element.has(EDITABLE):
+            return element
+        seen = set()
+        parent = element.parent
+        while parent is not None and 0 <= parent < len(self.elements) and parent not in seen:
+            seen.add(parent)
+            ancestor = self.elements[parent]
+            if ancestor.has(CLICKABLE):
+                return ancestor
+            parent = ancestor.parent
+        x, y = element.center
+        containers = [other for other in self._cell_at(x, y)
+                      if other.has(CLICKABLE) and other.contains(x, y) and other.area >= element.area]
+        return min(containers, key=lambda other: other.area) if containers else element
+
+    def element_at(self, x, y):
+        """좌표를 감싸는 가장 작은 누를 수 있는 요소 (없으면 None)"""
+        hits = [element.target for element in self._cell_at(x, y)
+                if element.contains(x, y) and element.target.has(CLICKABLE | EDITABLE)]
+        return min(hits, key=lambda element: element.area) if hits else None
+
+    def snap(self, x, y):
+        """LLM이 준 좌표 검증 - 요소 위면 그 요소, 아니면 가까운 누를 수 있는 요소 (너무 멀면 None)"""
+        element = self.element_at(x, y)
+        if element is not None:
+            return element
+        limit = SNAP_DISTANCE_RATIO * (self.width ** 2 + self.height ** 2) ** 0.5
+        best, best_distance = None, limit
+        for other in self.elements:
+            if not other.has(CLICKABLE):
+                continue
+            cx, cy = other.center
+            distance = ((cx - x) ** 2 + (cy - y) ** 2) ** 0.5
+            if distance < best_distance:
+                best, best_distance = other, distance
+        return best
+
+    def _in_region(self, element, region):
+        x, y = element.center
+        return (region[0] * self.width <= x <= region[2] * self.width
+                and region[1] * self.height <= y <= region[3] * self.height)
+
+    def _score(self, element, query):
+        score = max((_label_similarity(text, key) * weight
+                     for key, weight in element.keys for text in query.variants), default=0.0)
+        if query.role:
+            score += 0.1 if element.target.has(query.role) else -0.15
+        if element.target.has(CLICKABLE | EDITABLE):
+            score += 0.05
+        return score
+
+    def candidates(self, target, limit=8, positional=False):
+        """(점수, 요소) 목록 - 점수 내림차순, 같은 누를 요소는 한 번만 (positional이면 글자는 보지 않음)"""
+        query = target if isinstance(target, TargetQuery) else TargetQuery(target)
+        if query.text and not positional:
+            indexes = set()
+            for text in query.variants:
+                for bigram in _bigrams(text):
+                    indexes |= self._postings.get(bigram, set())
+            scored = [(self._score(self.elements[index], query), self.elements[index]) for index in indexes]
+            scored = [(score, element) for score, element in scored if score >= MIN_SCORE]
+        else:
+            # 위치/순서만 있는 표현: 글자가 있는 누를 수 있는 요소 전체
+            scored = [(MIN_SCORE, element) for element in self.elements
+                      if element.keys and element.target.has(CLICKABLE | EDITABLE)]
+        if query.region is not None:
+            scored = [(score, element) for score, element in scored if self._in_region(element.target, query.region)]
+        if query.role and (positional or not query.text or query.role != CLICKABLE):
+            # 입력창 / 체크박스처럼 종류가 분명하면 그 종류만 (해당 요소가 하나라도 있을 때)
+            narrowed = [(score, element) for score, element in scored if element.target.has(query.role)]
+            scored = narrowed or scored
+
+        scored.sort(key=lambda item: (-item[0], item[1].target.bounds[1], item[1].target.bounds[0]))
+        unique, seen = [], set()
+        for score, element in scored:
+            if element.target.index not in seen:
+                seen.add(element.target.index)
+                unique.append((score, element))
+        return unique[:limit] if limit else unique
+
+    def resolve(self, target, limit=8):
+        """대상 표현 → TargetMatch (조회만으로 정해지면 resolved, 아니면 추린 후보와 함께 ambiguous)"""
+        query = TargetQuery(target)
+        scored = self.candidates(query, limit=0)
+        positional = query.is_positional
+        if not scored and (query.ordinal is not None or query.region is not None):
+            # "첫 번째 검색 결과"처럼 글자가 화면에 없으면 위치/순서만으로
+            scored = self.candidates(query, limit=0, positional=True)
+            positional = True
+        if not scored:
+            return TargetMatch()
+        best_score = scored[0][0]
+        tied = [(score, element) for score, element in scored if score >= best_score - AMBIGUITY_MARGIN]
+        if query.ordinal is not None:
+            # "두 번째 ○○": 점수가 비슷한 후보를 읽는 순서(위→아래, 왼→오른쪽)로 세어 고름
+            # 위치/순서만으로 고른 경우는 추정값이므로 애매함으로 표시 (LLM이 후보 이름을 보고 확인)
+            ordered = sorted(tied, key=lambda item: (item[1].target.bounds[1], item[1].target.bounds[0]))
+            position = query.ordinal - 1 if query.ordinal > 0 else len(ordered) - 1
+            if 0 <= position < len(ordered):
+                score, element = ordered[position]
+                return TargetMatch(element.target, score, [e.target for _, e in ordered[:limit]],
+                                   ambiguous=positional or score < RESOLVE_SCORE, matched=element)
+            return TargetMatch(None, best_score, [e.target for _, e in scored[:limit]], ambiguous=True)
+        candidates = [element.target for _, element in scored[:limit]]
+        if len(tied) > 1 or positional or best_score < RESOLVE_SCORE:
+            return TargetMatch(scored[0][1].target, best_score, candidates, ambiguous=True, matched=scored[0][1])
+        return TargetMatch(scored[0][1].target, best_score, candidates, matched=scored[0][1])
+
+    def describe(self, elements):
+        """LLM 프롬프트용 후보 목록 (번호는 스냅샷 노드 번호)"""
+        lines = []
+        for element in elements:
+            x, y = element.center
+            kind = '입력' if element.has(EDITABLE) else element.class_name or '요소'
+            label = element.label
+            if element.desc and element.text and element.desc != element.text:
+                label = f'{element.text} / {element.desc}'
+            lines.append(f'{element.index}: "{label}" [{kind}] @({x},{y})')
+        return '\n'.join(lines)
+
+    def stats(self):
+        return {
+            'screen_id': self.screen_id,
+            'package': self.package,
+            'elements': len(self.elements),
+            'clickable': sum(1 for element in self.elements if element.has(CLICKABLE)),
+            'size': [self.width, self.height],
+        }
+
+
+def snapshot_id(snapshot):
+    """스냅샷 내용 해시 (같은 화면이면 같은 값 - 색인 재사용 / 요청 합치기 키)"""
+    material = json.dumps([snapshot.get('package'), snapshot.get('width'), snapshot.get('height'),
+                           snapshot.get('nodes')], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(material.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class ScreenContextRegistry:
+    """기기별 최신 화면 스냅샷 - 원본은 저장소(워커 간 공유, TTL), 만든 색인은 프로세스별 LRU"""
+
+    def __init__(self, store, ttl=60.0, max_indexes=64):
+        self.store = store
+        self.ttl = ttl
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()   # screen_id → ScreenIndex
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.reuses = 0
+
+    def _index(self, snapshot, screen_id=None):
+        screen_id = screen_id or snapshot_id(snapshot)
+        with self._lock:
+            index = self._indexes.get(screen_id)
+            if index is not None:
+                self._indexes.move_to_end(screen_id)
+                self.reuses += 1
+                return index
+        index = ScreenIndex.from_snapshot(snapshot)
+        with self._lock:
+            self.builds += 1
+            self._indexes[screen_id] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def put(self, device_id, snapshot):
+        """스냅샷 등록 → ScreenIndex (형식 오류는 ScreenSnapshotError)"""
+        index = self._index(snapshot)
+        value = {'screen_id': index.screen_id, 'snapshot': snapshot}
+        self.store.set(f'device:{device_id}', json.dumps(value, ensure_ascii=False).encode('utf-8'), ttl=self.ttl)
+        return index
+
+    def get(self, device_id):
+        """기기의 최신 화면 색인 (없거나 만료되면 None)"""
+        raw = self.store.get(f'device:{device_id}')
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        return self._index(value['snapshot'], value.get('screen_id'))
+
+    def stats(self):
+        with self._lock:
+            return {'indexes': len(self._indexes), 'builds': self.builds, 'reuses': self.reuses}
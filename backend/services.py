@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+지연 생성 서비스 컨테이너
+무거운 백엔드(Google STT 클라이언트, TTS 엔진, ffmpeg 워커, 호출어 템플릿 등)를 import 시점이 아니라
+처음 사용할 때 만들거나, 서버가 뜬 뒤 백그라운드 스레드에서 미리 만들어 둡니다(워밍업).
+생성 실패는 None 대신 상태/오류로 남기고 retry_interval 뒤에 다시 시도하며,
+/health/ready는 서비스별 실제 점검 함수로 준비 상태를 판단합니다.
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailable(Exception):
+    """서비스 생성 실패 또는 재시도 대기 중"""
+
+    def __init__(self, name, reason, retry_after=None):
+        super().__init__(f"'{name}' 서비스를 사용할 수 없습니다: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Service:
+    """처음 get() 할 때 factory로 한 번 생성 (동시 호출은 생성이 끝날 때까지 대기)"""
+
+    def __init__(self, name, factory, check=None, required=True, retry_interval=30.0, check_interval=10.0,
+                 fork_safe=False):
+        self.name = name
+        self.factory = factory
+        self.check = check
+        self.required = required
+        self.fork_safe = fork_safe  # 스레드/소켓이 없어 fork 전에 만들어 워커가 물려받아도 되는지
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+
+        self.state = 'pending'   # pending | starting | ready | failed
+        self.instance = None
+        self.error = None
+        self.init_seconds = None
+        self._retry_at = 0.0
+        self._checked_at = None
+        self._check_result = (False, None)
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == 'ready':
+            return self.instance
+        with self._lock:
+            if self.state == 'ready':
+                return self.instance
+            if self.state == 'failed' and time.monotonic() < self._retry_at:
+                raise ServiceUnavailable(self.name, self.error, self._retry_at - time.monotonic())
+
+            self.state = 'starting'
+            started = time.perf_counter()
+            try:
+                instance = self.factory()
+            except Exception as e:
+                self.state = 'failed'
+                self.error = str(e) or type(e).__name__
+                self._retry_at = time.monotonic() + self.retry_interval
+                logger.error("❌ 서비스 '%s' 초기화 실패: %s", self.name, self.error)
+                raise ServiceUnavailable(self.name, self.error, self.retry_interval) from e
+            finally:
+                self.init_seconds = time.perf_counter() - started
+
+            self.instance = instance
+            self.error = None
+            self.state = 'ready'
+            return instance
+
+    def reset(self):
+        """fork된 워커에서 다시 만들도록 초기 상태로 (부모의 스레드/연결은 자식에 없음)"""
+        self._lock = threading.Lock()
+        self.state = 'pending'
+        self.instance = None
+        self.error = None
+        self.init_seconds = None
+        self._retry_at = 0.0
+        self._checked_at = None
+
+    def probe(self):
+        """준비 상태 점검 (생성은 하지 않음) - (준비 여부, 사유), 점검 결과는 check_interval 동안 재사용"""
+        if self.state != 'ready':
+            return False, self.error if self.state == 'failed' else self.state
+        if self.check is None:
+            return True, None
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._check_result
+        try:
+            result = self.check(self.instance)
+            self._check_result = (True, None) if result is True else (False, result or '점검 실패')
+        except Exception as e:
+            self._check_result = (False, str(e) or type(e).__name__)
+        self._checked_at = now
+        return self._check_result
+
+    def status(self):
+        ready, reason = self.probe()
+        status = {
+            'state': self.state,
+            'ready': ready,
+            'required': self.required,
+            'init_ms': round(self.init_seconds * 1000, 1) if self.init_seconds is not None else None,
+        }
+        if reason and not ready:
+            status['reason'] = reason
+        return status
+
+
+class ServiceContainer:
+    """이름별 지연 생성 서비스 + 백그라운드 워밍업 + 준비 상태 / 시작 시간 측정
+
+    services.get('tts') 또는 services.tts 로 접근합니다.
+    """
+
+    def __init__(self, started_at=None, lazy=False, retry_interval=30.0, check_interval=10.0):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.lazy = lazy
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+        self._services = {}
+        self.loaded_seconds = None      # 모듈 로드 완료 (요청 처리 가능)
+        self.warmed_up_seconds = None   # 워밍업 완료
+        self._warmup_thread = None
+
+    def register(self, name, factory, check=None, required=True, fork_safe=False):
+        service = Service(name, factory, check, required, self.retry_interval, self.check_interval, fork_safe)
+        self._services[name] = service
+        return service
+
+    def get(self, name):
+        return self._services[name].get()
+
+    def __getattr__(self, name):
+        services = self.__dict__.get('_services', {})
+        if name in services:
+            return services[name].get()
+        raise AttributeError(name)
+
+    def state(self, name):
+        return self._services[name].state
+
+    def mark_loaded(self):
+        self.loaded_seconds = time.perf_counter() - self.started_at
+
+    def fork_safe_names(self):
+        return [name for name, service in self._services.items() if service.fork_safe]
+
+    def after_fork(self):
+        """prefork 워커 시작 시 - fork 전에 만든 fork_safe 서비스는 물려받고 나머지는 새로 생성"""
+        for service in self._services.values():
+            if service.fork_safe and service.state == 'ready':
+                service._lock = threading.Lock()
+            else:
+                service.reset()
+        self._warmup_thread = None
+        self.warmed_up_seconds = None
+
+    def warm_up(self, names=None, background=True):
+        """등록 순서대로 서비스 생성 (실패는 상태로 남기고 계속 진행)"""
+        def run():
+            for name in names or list(self._services):
+                try:
+                    self.get(name)
+                except ServiceUnavailable:
+                    pass
+            self.warmed_up_seconds = time.perf_counter() - self.started_at
+            print(f"🔥 서비스 워밍업 완료: {self.warmed_up_seconds * 1000:.0f}ms "
+                  f"(모듈 로드 {self.loaded_seconds * 1000 if self.loaded_seconds else 0:.0f}ms)")
+
+        if not background:
+            run()
+            return None
+        if self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=run, name='service-warmup', daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def readiness(self):
+        """(준비 여부, 서비스별 상태) - 필수 서비스가 모두 점검을 통과해야 준비 완료
+
+        lazy 모드에서는 아직 생성되지 않은(pending) 서비스를 첫 사용 때 만들 것으로 보고 준비로 칩니다.
+        """
+        details = {}
+        ready = True
+        for name, service in self._services.items():
+            status = service.status()
+            if self.lazy and service.state == 'pending':
+                status['ready'] = True
+            details[name] = status
+            if service.required and not status['ready']:
+                ready = False
+        return ready, details
+
+    def startup(self):
+        return {
+            'mode': 'lazy' if self.lazy else 'background',
+            'pid': os.getpid(),
+            'loaded_ms': round(self.loaded_seconds * 1000, 1) if self.loaded_seconds is not None else None,
+            'warmed_up_ms': round(self.warmed_up_seconds * 1000, 1) if self.warmed_up_seconds is not None else None,
+            'uptime_seconds': round(time.perf_counter() - self.started_at, 1),
+        }
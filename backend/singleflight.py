@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+동시 요청 합치기 (single-flight)
+같은 키(정규화된 입력)의 작업이 이미 진행 중이면 새로 실행하지 않고 그 결과를 같이 기다립니다.
+여러 기기가 같은 명령을 동시에 보내거나 한 기기가 재시도할 때 Gemini / STT / TTS 호출이 한 번만 나갑니다.
+
+진행 중인 작업은 concurrent.futures.Future로 들고 있어서 Flask 스레드와 asyncio 서버(스레드 풀 포함)가
+같은 표를 함께 씁니다. 합쳐지는 범위는 프로세스 하나이며, 끝난 결과의 재사용은 각 캐시가 맡습니다.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """키별 진행 중 작업 표 - 먼저 온 호출(leader)이 실행하고 나머지(merged)는 결과를 공유"""
+
+    def __init__(self, name, metrics=None, enabled=True, share=None):
+        self.name = name
+        self.metrics = metrics      # record_coalesced(name, merged)를 가진 MetricsRegistry
+        self.enabled = enabled
+        self.share = share          # 결과 복사 (예: copy.deepcopy - 변경 가능한 결과용, 호출마다 자기 사본을 받음)
+        self._inflight = {}         # 키 -> Future
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.merged = 0
+
+    def begin(self, key):
+        """(Future, leader 여부) - leader면 작업을 실행하고 finish()를 반드시 호출해야 함"""
+        with self._lock:
+            future = self._inflight.get(key) if self.enabled else None
+            merged = future is not None
+            if merged:
+                self.merged += 1
+            else:
+                future = Future()
+                if self.enabled:
+                    self._inflight[key] = future
+                self.leaders += 1
+        if self.metrics is not None:
+            self.metrics.record_coalesced(self.name, merged)
+        return future, not merged
+
+    def finish(self, key, future, result=None, error=None):
+        """leader의 결과(또는 예외)를 기다리던 호출 모두에게 전달
+        share가 있으면 Future에는 사본을 넣어, leader가 나중에 자기 결과를 바꿔도 다른 호출에 드러나지 않음"""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(self.share(result) if self.share is not None else result)
+
+    def _shared(self, future):
+        result = future.result()
+        return self.share(result) if self.share is not None else result
+
+    def do(self, key, fn, *args, **kwargs):
+        """fn(*args, **kwargs) 결과 - 같은 키가 진행 중이면 그 결과를 기다림"""
+        future, leader = self.begin(key)
+        if not leader:
+            return self._shared(future)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return self._shared(future)
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """await fn(*args, **kwargs) 결과 - leader의 작업은 별도 태스크로 돌려,
+        leader 요청이 끊겨도(취소) 기다리던 다른 요청과 캐시 저장은 계속 진행됨"""
+        future, leader = self.begin(key)
+        if leader:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+
+            def publish(done):
+                error = asyncio.CancelledError() if done.cancelled() else done.exception()
+                self.finish(key, future, None if error is not None else done.result(), error)
+            task.add_done_callback(publish)
+        # shield: 이 요청이 취소돼도 공유 Future는 취소하지 않음
+        await asyncio.shield(asyncio.wrap_future(future))
+        return self._shared(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'in_flight': len(self._inflight),
+                'leaders': self.leaders,
+                'merged': self.merged,
+            }
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+중간 인식 결과 기반 추측 명령 분석 (speculative analysis)
+스트리밍 인식 중 interim 결과가 나오면 최종 결과를 기다리지 않고 명령 분석(규칙 / 캐시 / Gemini)을 미리 시작합니다.
+최종 결과가 나왔을 때 정규화한 명령 키가 추측한 문장과 같으면 그 결과를 바로 쓰고(적중),
+다르면 버리고 최종 문장으로 다시 분석합니다(실패). STT 꼬리 지연과 LLM 지연이 겹쳐서 그만큼 응답이 빨라집니다.
+
+- 규칙 경로는 모든 interim에서, Gemini 호출은 안정도(stability)가 기준 이상이거나 발화 끝이 감지된 뒤에만 시작
+- 세션마다 Gemini 추측 횟수를 제한하고, 새 추측이 오면 아직 시작하지 않은 이전 추측은 취소
+- 최종 결과가 왔을 때 일치하는 추측이 아직 시작 전이면 취소하고 바로 분석 (이미 실행 중인 추측만 기다림)
+- 적중률과 절약한 시간은 MetricsRegistry(record_speculation, observe('speculation_saved'))에 기록
+"""
+
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+class _Attempt:
+    """추측 한 건 - 분석한 문장, Gemini 허용 여부, 결과 Future, 실행 시작/끝 시각"""
+
+    __slots__ = ('command', 'allow_llm', 'future', 'started', 'finished')
+
+    def __init__(self, command, allow_llm):
+        self.command = command
+        self.allow_llm = allow_llm
+        self.future = None
+        self.started = None
+        self.finished = None
+
+
+class SpeculativeAnalyzer:
+    """세션들이 공유하는 추측 분석 실행기
+
+    analyze(command, allow_llm, context) -> 분석 결과 (allow_llm=False에서 LLM이 필요하면 None)
+    key(command) -> 비교용 정규화 키, prepare(transcript) -> 분석에 넘길 문장 (후처리)
+    """
+
+    def __init__(self, analyze, key, prepare=None, metrics=None, workers=2, min_chars=2,
+                 llm_stability=0.8, max_llm_attempts=2, enabled=True):
+        self.analyze = analyze
+        self.key = key
+        self.prepare = prepare or (lambda text: text)
+        self.metrics = metrics
+        self.min_chars = min_chars
+        self.llm_stability = llm_stability
+        self.max_llm_attempts = max_llm_attempts
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='speculate')
+        self._lock = threading.Lock()
+        self._counts = {'started': 0, 'superseded': 0, 'hit': 0, 'miss': 0, 'none': 0}
+        self.saved_seconds = 0.0
+
+    def session(self, context=None):
+        """세션 하나의 추측 상태 - context는 analyze에 그대로 전달 (예: 화면 문맥)"""
+        return Speculation(self, context)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _record(self, outcome, saved=None):
+        with self._lock:
+            self._counts[outcome] += 1
+            if saved is not None:
+                self.saved_seconds += saved
+        if self.metrics is not None:
+            self.metrics.record_speculation(outcome)
+            if saved is not None:
+                self.metrics.observe('speculation_saved', saved)
+
+    def _run(self, attempt, context):
+        # 큐에서 기다린 시간은 빼고 실제 분석 시간만 잼
+        attempt.started = time.perf_counter()
+        try:
+            return self.analyze(attempt.command, attempt.allow_llm, context)
+        finally:
+            attempt.finished = time.perf_counter()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            saved = self.saved_seconds
+        committed = counts['hit'] + counts['miss'] + counts['none']
+        return {
+            'enabled': self.enabled,
+            **counts,
+            'hit_rate': round(counts['hit'] / committed, 3) if committed else 0.0,
+            'saved_ms_total': round(saved * 1000, 1),
+            'saved_ms_avg': round(saved * 1000 / counts['hit'], 1) if counts['hit'] else 0.0,
+        }
+
+
+class Speculation:
+    """스트리밍 세션 하나의 추측 상태 - offer()는 인식 스레드에서, commit()은 최종 결과를 받은 쪽에서 호출"""
+
+    def __init__(self, analyzer, context=None):
+        self.analyzer = analyzer
+        self.context = context
+        self.attempts = {}          # 정규화 키 -> _Attempt
+        self.last_transcript = ''
+        self.llm_attempts = 0
+        self._current = None
+        self._lock = threading.Lock()
+
+    def offer(self, transcript, stability=0.0):
+        """interim 문장으로 분석 시작 - 시작했으면 True"""
+        analyzer = self.analyzer
+        self.last_transcript = transcript
+        if not analyzer.enabled or not transcript:
+            return False
+        command = analyzer.prepare(transcript)
+        key = analyzer.key(command)
+        if len(key) < analyzer.min_chars:
+            return False
+
+        with self._lock:
+            # Gemini 추측은 세션당 max_llm_attempts번까지 (넘으면 규칙/캐시 경로만)
+            allow_llm = stability >= analyzer.llm_stability and self.llm_attempts < analyzer.max_llm_attempts
+            previous = self.attempts.get(key)
+            # 같은 문장은 다시 분석하지 않음 (규칙 경로만 돌렸던 문장이 안정되면 Gemini 허용으로 한 번 더)
+            if previous is not None and (previous.allow_llm or not allow_llm):
+                return False
+            if allow_llm:
+                self.llm_attempts += 1
+            if self._current is not None and self._current.future.cancel():
+                analyzer._count('superseded')
+            attempt = _Attempt(command, allow_llm)
+            attempt.future = analyzer._executor.submit(analyzer._run, attempt, self.context)
+            self.attempts[key] = attempt
+            self._current = attempt
+        analyzer._count('started')
+        return True
+
+    def end_of_speech(self):
+        """발화 끝 - 마지막 interim은 최종 결과와 거의 같으므로 Gemini까지 허용해서 추측"""
+        return self.offer(self.last_transcript, stability=1.0)
+
+    def commit(self, command):
+        """최종 문장의 분석 결과와 추측 정보 {'speculative', 'saved_ms'} - 추측이 맞으면 그 결과를 씀"""
+        analyzer = self.analyzer
+        final_at = time.perf_counter()
+        with self._lock:
+            attempt = self.attempts.get(analyzer.key(command))
+            tried = bool(self.attempts)
+
+        result = None
+        # 아직 큐에서 기다리는 추측(다른 세션의 분석 뒤)은 취소하고 바로 분석 - 기다리면 추측하지 않은 것보다 느려짐
+        if attempt is not None and not attempt.future.cancel():
+            try:
+                result = attempt.future.result()
+            except (CancelledError, Exception):
+                result = None
+        if result is not None:
+            # 추측이 없었다면 분석은 final_at에 시작해 (finished - started)만큼 걸렸을 것
+            saved = max(0.0, min(attempt.finished - attempt.started, final_at - attempt.started))
+            analyzer._record('hit', saved)
+            self.close()
+            return result, {'speculative': True, 'saved_ms': round(saved * 1000, 1)}
+
+        analyzer._record('miss' if tried else 'none')
+        self.close()
+        return analyzer.analyze(command, True, self.context), {'speculative': False, 'saved_ms': 0.0}
+
+    def close(self):
+        """아직 시작하지 않은 추측 취소 (진행 중인 분석은 끝까지 돌고 결과는 캐시에 남음)"""
+        with self._lock:
+            attempts, self.attempts, self._current = list(self.attempts.values()), {}, None
+        for attempt in attempts:
+            attempt.future.cancel()
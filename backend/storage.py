@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+"""
+캐시 / 공유 설정 저장소
+명령 분석 결과, TTS 음성 같은 캐시와 호출어 목록 같은 설정을 키-값 저장소에 보관합니다.
+- memory://                 프로세스 안 LRU (+ TTL, 항목 수 / 바이트 한도)
+- redis://host:port/db      여러 워커 프로세스 / 노드가 공유하는 Redis (RESP 프로토콜 직접 구현, 추가 패키지 없음)
+테스트와 부하 테스트에서는 backend/kv_stub_server.py가 Redis 대신 쓰입니다.
+
+값은 bytes이며, 공유 저장소 장애는 요청 실패가 아니라 캐시 미스로 처리합니다.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class StoreError(Exception):
+    """저장소 연결/명령 실패"""
+
+
+class MemoryStore:
+    """프로세스 안 LRU + TTL 저장소 (스레드 안전)"""
+
+    local = True
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 키 -> (값, 만료 시각 또는 None)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and time.time() > entry[1]:
+                self._remove(key)
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self._bytes += len(value)
+            while len(self._entries) > 1 and (
+                    (self.max_entries and len(self._entries) > self.max_entries)
+                    or (self.max_bytes and self._bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def items(self):
+        """만료되지 않은 (키, 값, 만료 시각) 목록 - 오래된 것부터 (파일 저장용)"""
+        now = time.time()
+        with self._lock:
+            return [(key, value, expires_at) for key, (value, expires_at) in self._entries.items()
+                    if expires_at is None or expires_at >= now]
+
+    def ping(self):
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self.evictions,
+            }
+
+
+class _ReplyError:
+    """Redis 오류 응답 (-ERR ...) - 연결은 정상이므로 풀에 돌려준 뒤 예외로 바꿈"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def encode_command(args):
+    """RESP 배열로 명령 인코딩"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, int):
+            arg = str(arg).encode('ascii')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(reader):
+    """RESP 응답 하나 읽기 (bytes / int / str / list / None / _ReplyError)"""
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('저장소 연결이 끊어졌습니다.')
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode('utf-8')
+    if kind == b'-':
+        return _ReplyError(payload.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError('저장소 연결이 끊어졌습니다.')
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f'알 수 없는 RESP 응답: {line[:20]!r}')
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def call(self, *args):
+        self.sock.sendall(encode_command(args))
+        return read_reply(self.reader)
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisStore:
+    """Redis 저장소 - 연결 풀 재사용, 연결 실패 시 retry_interval 동안은 바로 미스 처리"""
+
+    local = False
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, prefix='',
+                 timeout=0.5, pool_size=8, retry_interval=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retry_interval = retry_interval
+
+        self._pool = []
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self.errors = 0
+        # fork된 워커는 부모의 소켓을 쓰면 안 되므로 풀을 비움
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    @classmethod
+    def from_url(cls, url, prefix='', **options):
+        parsed = urlparse(url)
+        db = parsed.path.lstrip('/')
+        return cls(
+            host=parsed.hostname or '127.0.0.1',
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+            prefix=prefix,
+            **options,
+        )
+
+    def _reset_after_fork(self):
+        self._pool = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = _Connection(sock)
+        for args in ([('AUTH', self.password)] if self.password else []) + ([('SELECT', self.db)] if self.db else []):
+            reply = connection.call(*args)
+            if isinstance(reply, _ReplyError):
+                connection.close()
+                raise StoreError(reply.message)
+        return connection
+
+    def execute(self, *args):
+        """명령 실행 - 연결 오류는 StoreError (retry_interval 동안 연결 시도 중단)"""
+        if time.monotonic() < self._down_until:
+            raise StoreError(f'저장소 연결 재시도 대기 중 ({self.host}:{self.port})')
+        with self._lock:
+            connection = self._pool.pop() if self._pool else None
+        try:
+            if connection is None:
+                connection = self._connect()
+            reply = connection.call(*args)
+        except (OSError, ValueError) as e:
+            if connection is not None:
+                connection.close()
+            self.errors += 1
+            self._down_until = time.monotonic() + self.retry_interval
+            raise StoreError(f'저장소 연결 실패 ({self.host}:{self.port}): {e}') from e
+
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(connection)
+                connection = None
+        if connection is not None:
+            connection.close()
+        if isinstance(reply, _ReplyError):
+            self.errors += 1
+            raise StoreError(reply.message)
+        return reply
+
+    def get(self, key):
+        try:
+            return self.execute('GET', self.prefix + key)
+        except StoreError:
+            return None
+
+    def set(self, key, value, ttl=None):
+        args = ['SET', self.prefix + key, value]
+        if ttl:
+            args += ['PX', max(1, int(ttl * 1000))]
+        try:
+            self.execute(*args)
+            return True
+        except StoreError:
+            return False
+
+    def delete(self, key):
+        try:
+            self.execute('DEL', self.prefix + key)
+        except StoreError:
+            pass
+
+    def ping(self):
+        """준비 상태 점검용 - 실패하면 사유 문자열"""
+        try:
+            return self.execute('PING') == 'PONG' or 'PING 응답 오류'
+        except StoreError as e:
+            return str(e)
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'address': f'{self.host}:{self.port}/{self.db}',
+            'errors': self.errors,
+            'pooled_connections': len(self._pool),
+        }
+
+
+def open_store(url, namespace, max_entries=None, max_bytes=None):
+    """URL에 맞는 저장소 - memory://는 캐시마다 별도 한도, redis://는 'namespace:' 접두사로 키 공간을 나눔
+
+    한도(max_entries/max_bytes)는 메모리 저장소에만 적용되며, Redis는 maxmemory 정책으로 관리합니다.
+    """
+    scheme = urlparse(url or 'memory://').scheme
+    if scheme in ('', 'memory'):
+        return MemoryStore(max_entries=max_entries, max_bytes=max_bytes)
+    if scheme == 'redis':
+        prefix = os.getenv('CACHE_STORE_PREFIX', 'voice_assistant:')
+        return RedisStore.from_url(url, prefix=f'{prefix}{namespace}:',
+                                   timeout=float(os.getenv('CACHE_STORE_TIMEOUT', '0.5')))
+    raise ValueError(f'지원하지 않는 저장소 URL: {url}')
+
+
+class SharedValue:
+    """저장소에 JSON으로 보관하는 설정 값 - refresh_interval마다 다시 읽어 모든 워커가 같은 값을 씀
+
+    저장소에 값이 없으면 default를 사용합니다.
+    """
+
+    def __init__(self, store, key, default, refresh_interval=5.0):
+        self.store = store
+        self.key = key
+        self.default = default
+        self.refresh_interval = refresh_interval
+        self._value = default
+        self._loaded_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.refresh_interval:
+            self._loaded_at = now
+            raw = self.store.get(self.key)
+            if raw is None:
+                self._value = self.default
+            else:
+                try:
+                    self._value = json.loads(raw)
+                except ValueError:
+                    logger.warning("⚠️ 공유 설정 '%s' 값이 올바른 JSON이 아닙니다 - 이전 값 유지", self.key)
+        return self._value
+
+    def set(self, value):
+        self.store.set(self.key, json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        self._value = value
+        self._loaded_at = time.monotonic()
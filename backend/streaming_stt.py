@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+"""
+스트리밍 음성 인식
+녹음 중인 오디오 청크를 스트리밍 인식기로 바로 전달하고, 중간 인식 결과(interim)를 즉시 돌려주며,
+발화 끝이 감지되면 곧바로 최종 결과를 냅니다.
+인식기는 StreamingRecognizer 인터페이스 뒤에 있으므로 로컬 가짜 인식기로 오프라인 테스트가 가능합니다.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class StreamingResult:
+    """스트리밍 인식 결과 한 건"""
+
+    def __init__(self, transcript, is_final=False, confidence=0.0, end_of_speech=False):
+        self.transcript = transcript
+        self.is_final = is_final
+        self.confidence = confidence
+        self.end_of_speech = end_of_speech
+
+
+class StreamingRecognizer:
+    """스트리밍 인식기 인터페이스 - 오디오 청크 iterator를 받아 StreamingResult를 생성"""
+
+    def stream(self, audio_chunks):
+        raise NotImplementedError
+
+
+class GoogleStreamingRecognizer(StreamingRecognizer):
+    """Google Cloud Speech streaming_recognize 기반 인식기"""
+
+    def __init__(self, speech_client, recognition_config, single_utterance=False):
+        self.speech_client = speech_client
+        self.recognition_config = recognition_config
+        self.single_utterance = single_utterance
+
+    def stream(self, audio_chunks):
+        from google.cloud import speech
+
+        if self.speech_client is None:
+            raise RuntimeError('Google STT 클라이언트가 초기화되지 않았습니다.')
+
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=self.recognition_config,
+            interim_results=True,
+            single_utterance=self.single_utterance,
+        )
+        requests = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in audio_chunks)
+        end_event = speech.StreamingRecognizeResponse.SpeechEventType.END_OF_SINGLE_UTTERANCE
+
+        for response in self.speech_client.streaming_recognize(streaming_config, requests):
+            if response.speech_event_type == end_event:
+                yield StreamingResult('', end_of_speech=True)
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                alternative = result.alternatives[0]
+                yield StreamingResult(
+                    alternative.transcript.strip(),
+                    is_final=result.is_final,
+                    confidence=alternative.confidence if result.is_final else result.stability,
+                )
+
+
+class FakeStreamingRecognizer(StreamingRecognizer):
+    """오프라인 테스트용 가짜 인식기 - 정해진 문장을 청크 수에 따라 조금씩 드러냄"""
+
+    def __init__(self, transcript='많이 내려줘', chunks_per_word=2, confidence=0.9, delay=0.0):
+        self.transcript = transcript
+        self.chunks_per_word = max(1, chunks_per_word)
+        self.confidence = confidence
+        self.delay = delay
+
+    def stream(self, audio_chunks):
+        words = self.transcript.split()
+        shown = 0
+        for index, _ in enumerate(audio_chunks, start=1):
+            if self.delay:
+                time.sleep(self.delay)
+            visible = min(len(words), index // self.chunks_per_word)
+            if visible > shown:
+                shown = visible
+                yield StreamingResult(' '.join(words[:shown]), confidence=0.5)
+        yield StreamingResult(self.transcript, is_final=True, confidence=self.confidence)
+
+
+class Endpointer:
+    """PCM 청크 에너지로 발화 끝(말한 뒤 일정 시간 무음)을 감지"""
+
+    def __init__(self, sample_rate=16000, threshold_db=-40.0, trailing_silence_ms=700):
+        self.sample_rate = sample_rate
+        self.threshold_db = threshold_db
+        self.trailing_silence_ms = trailing_silence_ms
+        self.speech_started = False
+        self._silence_ms = 0.0
+        self._remainder = b''
+
+    def update(self, chunk):
+        """청크를 반영하고 발화 끝이면 True"""
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % 2
+        self._remainder = data[usable:]
+        if usable == 0:
+            return False
+
+        samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+        energy_db = 10.0 * np.log10(np.mean(samples * samples) + 1e-12)
+        duration_ms = len(samples) * 1000.0 / self.sample_rate
+
+        if energy_db > self.threshold_db:
+            self.speech_started = True
+            self._silence_ms = 0.0
+        elif self.speech_started:
+            self._silence_ms += duration_ms
+        return self.speech_started and self._silence_ms >= self.trailing_silence_ms
+
+
+class StreamingSession:
+    """클라이언트 청크 입력 ↔ 인식기 결과 이벤트를 연결하는 세션
+
+    인식기는 별도 스레드에서 돌고, 결과는 이벤트 딕셔너리로 events 큐에 쌓입니다.
+    on_interim(transcript, stability)는 interim 결과마다 인식 스레드에서 호출됩니다.
+    """
+
+    def __init__(self, recognizer, endpointer=None, post_process=None, on_interim=None,
+                 max_duration=60.0):
+        self.recognizer = recognizer
+        self.endpointer = endpointer
+        self.post_process = post_process or (lambda text: text)
+        self.on_interim = on_interim
+        self.max_duration = max_duration
+
+        self.events = queue.Queue()
+        self.done = threading.Event()
+        self.final_transcript = None
+        self._chunks = queue.Queue()
+        self._finished = False
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='stt-stream', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _audio_chunks(self):
+        while True:
+            remaining = self.max_duration - (time.monotonic() - self._started)
+            try:
+                chunk = self._chunks.get(timeout=max(remaining, 0.01))
+            except queue.Empty:
+                return
+            if chunk is _END:
+                return
+            yield chunk
+
+    def feed(self, chunk):
+        """오디오 청크 추가 - 발화 끝이 감지되면 입력을 닫음"""
+        if self._finished:
+            return
+        self._chunks.put(chunk)
+        if self.endpointer is not None and self.endpointer.update(chunk):
+            self.events.put({'event': 'end_of_speech'})
+            self.finish()
+
+    def finish(self):
+        """더 이상 오디오가 없음을 인식기에 알림"""
+        if not self._finished:
+            self._finished = True
+            self._chunks.put(_END)
+
+    def _run(self):
+        final_parts = []
+        confidence = 0.0
+        try:
+            for result in self.recognizer.stream(self._audio_chunks()):
+                if result.end_of_speech:
+                    self.events.put({'event': 'end_of_speech'})
+                    self.finish()
+                    continue
+                if result.is_final:
+                    final_parts.append(result.transcript)
+                    confidence = max(confidence, result.confidence or 0.0)
+                    continue
+                transcript = ' '.join(final_parts + [result.transcript]).strip()
+                self.events.put({'event': 'interim', 'transcript': transcript,
+                                 'stability': round(result.confidence or 0.0, 3)})
+                if self.on_interim is not None:
+                    self.on_interim(transcript, result.confidence or 0.0)
+
+            raw_transcript = ' '.join(final_parts).strip()
+            self.final_transcript = self.post_process(raw_transcript) if raw_transcript else ''
+            self.events.put({
+                'event': 'final',
+                'transcript': self.final_transcript,
+                'raw_transcript': raw_transcript,
+                'confidence': confidence,
+                'elapsed_ms': round((time.monotonic() - self._started) * 1000, 2),
+            })
+        except Exception as e:
+            logger.error("❌ 스트리밍 인식 오류: %s", e)
+            self.events.put({'event': 'error', 'error': f'스트리밍 인식 중 오류가 발생했습니다: {str(e)}'})
+        finally:
+            self.finish()
+            self.done.set()
+
+    def drain(self):
+        """쌓인 이벤트를 모두 꺼냄"""
+        drained = []
+        while True:
+            try:
+                drained.append(self.events.get_nowait())
+            except queue.Empty:
+                return drained
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+
+"""
+STT 백엔드 추상화
+Google Cloud / 로컬 CPU 모델(Vosk) / HTTP 인식 서버 / 스텁 구현을 같은 인터페이스로 제공하고,
+요청별 라우팅(짧은 호출어 클립은 로컬, 긴 명령은 클라우드)과 자동 장애 조치를 담당합니다.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+import wave
+
+logger = logging.getLogger(__name__)
+
+
+class STTError(Exception):
+    """음성 인식 실패"""
+
+
+class STTUnavailable(STTError):
+    """사용 가능한 STT 백엔드 없음"""
+
+
+class STTResult:
+    """인식 결과 (단어별 신뢰도 포함)"""
+
+    def __init__(self, transcript, confidence=0.0, words=None, backend=None, alternatives=None):
+        self.transcript = transcript
+        self.confidence = confidence
+        self.words = words or []             # [(단어, 신뢰도), ...]
+        self.backend = backend
+        self.alternatives = alternatives or []  # [(텍스트, 신뢰도), ...] 최상위 제외
+
+
+def wav_duration(wav_content):
+    """WAV 길이 (초)"""
+    try:
+        with wave.open(io.BytesIO(wav_content), 'rb') as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except (wave.Error, EOFError):
+        return 0.0
+
+
+class STTBackend:
+    """STT 백엔드 인터페이스 - recognize()는 결과가 없으면 None 반환"""
+
+    name = 'base'
+
+    def is_available(self):
+        return True
+
+    def is_configured(self):
+        """설정상 사용할 수 있는지 - is_available()과 달리 클라이언트/모델을 만들지 않음 (상태 조회용)"""
+        return True
+
+    def recognize(self, wav_content):
+        raise NotImplementedError
+
+    async def recognize_async(self, wav_content):
+        """asyncio 서버 모드용 - 기본 구현은 스레드로 넘김"""
+        return await asyncio.to_thread(self.recognize, wav_content)
+
+
+class GoogleCloudSTTBackend(STTBackend):
+    """Google Cloud Speech-to-Text recognize 백엔드"""
+
+    name = 'google'
+
+    def __init__(self, speech_client=None, phrases=None, language_code='ko-KR', model='latest_long',
+                 boost=25, timeout=15.0, async_client=None, client_factory=None, async_client_factory=None):
+        self.speech_client = speech_client
+        self.client_factory = client_factory  # 클라이언트를 처음 사용할 때 생성 (실패하면 예외)
+        self.async_client = async_client  # speech.SpeechAsyncClient (asyncio 서버 모드)
+        self.async_client_factory = async_client_factory  # 이벤트 루프 안에서 처음 사용할 때 생성
+        self.phrases = phrases or []
+        self.language_code = language_code
+        self.model = model
+        self.boost = boost
+        self.timeout = timeout
+
+    def client(self):
+        """동기 클라이언트 (client_factory가 있으면 처음 사용할 때 생성, 실패하면 None)"""
+        if self.speech_client is None and self.client_factory is not None:
+            try:
+                self.speech_client = self.client_factory()
+            except Exception:
+                return None
+        return self.speech_client
+
+    def is_available(self):
+        return self.client() is not None
+
+    def is_configured(self):
+        return self.speech_client is not None or self.client_factory is not None
+
+    def recognition_config(self, encoding=None, sample_rate_hertz=None):
+        """인식 설정 (WAV는 sample_rate_hertz 자동 감지)"""
+        from google.cloud import speech
+
+        extra = {'sample_rate_hertz': sample_rate_hertz} if sample_rate_hertz else {}
+        return speech.RecognitionConfig(
+            encoding=encoding or speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            **extra,
+            language_code=self.language_code,
+            use_enhanced=True,
+            model=self.model,  # 더 긴 명령어에 최적화
+            enable_automatic_punctuation=True,
+            enable_word_time_offsets=True,
+            enable_word_confidence=True,  # 단어별 신뢰도 추가
+            speech_contexts=[{'phrases': self.phrases, 'boost': self.boost}],
+        )
+
+    def recognize(self, wav_content):
+        from google.cloud import speech
+
+        client = self.client()
+        if client is None:
+            raise STTUnavailable('Google STT 클라이언트가 초기화되지 않았습니다.')
+        response = client.recognize(
+            config=self.recognition_config(),
+            audio=speech.RecognitionAudio(content=wav_content),
+            timeout=self.timeout,
+        )
+        return self._to_result(response)
+
+    async def recognize_async(self, wav_content):
+        from google.cloud import speech
+
+        if self.async_client is None and self.async_client_factory is not None:
+            try:
+                self.async_client = self.async_client_factory()
+            except Exception:
+                pass  # 동기 클라이언트 + 스레드로 대체
+        if self.async_client is None:
+            return await super().recognize_async(wav_content)
+        response = await self.async_client.recognize(
+            config=self.recognition_config(),
+            audio=speech.RecognitionAudio(content=wav_content),
+            timeout=self.timeout,
+        )
+        return self._to_result(response)
+
+    def _to_result(self, response):
+        if not response.results:
+            return None
+
+        alternatives = response.results[0].alternatives
+        best = alternatives[0]
+        return STTResult(
+            best.transcript.strip(),
+            confidence=best.confidence,
+            words=[(word.word, word.confidence) for word in best.words],
+            backend=self.name,
+            alternatives=[(alt.transcript.strip(), alt.confidence) for alt in alternatives[1:]],
+        )
+
+
+class VoskSTTBackend(STTBackend):
+    """Vosk(Kaldi) 로컬 CPU 인식 백엔드 - 예: vosk-model-small-ko-0.22"""
+
+    name = 'vosk'
+
+    def __init__(self, model_path, sample_rate=16000):
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self._model = None
+        self._load_error = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None and self._load_error is None:
+                try:
+                    from vosk import Model, SetLogLevel
+                    SetLogLevel(-1)
+                    self._model = Model(self.model_path)
+                except Exception as e:
+                    self._load_error = e
+                    logger.error("❌ Vosk 모델 로드 실패: %s", e)
+            return self._model
+
+    def is_available(self):
+        if not self.model_path:
+            return False
+        return self._get_model() is not None
+
+    def is_configured(self):
+        # 로드에 실패한 적이 있으면 False (아직 로드하지 않은 모델은 여기서 로드하지 않음)
+        return bool(self.model_path) and self._load_error is None
+
+    def recognize(self, wav_content):
+        from vosk import KaldiRecognizer
+
+        model = self._get_model()
+        if model is None:
+            raise STTUnavailable(f'Vosk 모델을 사용할 수 없습니다: {self._load_error}')
+
+        with wave.open(io.BytesIO(wav_content), 'rb') as wav_file:
+            frames = wav_file.readframes(wav_file.getnframes())
+            sample_rate = wav_file.getframerate()
+
+        # KaldiRecognizer는 스레드 간 공유 불가 - 요청마다 생성 (모델은 공유)
+        recognizer = KaldiRecognizer(model, sample_rate)
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(frames)
+        result = json.loads(recognizer.FinalResult())
+
+        transcript = result.get('text', '').strip()
+        if not transcript:
+            return None
+        words = [(item['word'], item.get('conf', 0.0)) for item in result.get('result', [])]
+        confidence = sum(conf for _, conf in words) / len(words) if words else 0.0
+        return STTResult(transcript, confidence=confidence, words=words, backend=self.name)
+
+
+class HTTPSTTBackend(STTBackend):
+    """HTTP로 WAV를 보내 JSON 결과를 받는 백엔드 (자체 호스팅 인식 서버, 부하 테스트용 backend/stt_stub_server.py)
+
+    요청: POST <url>, Content-Type: audio/wav, 본문 = WAV 바이트
+    응답: {"transcript": "...", "confidence": 0.9, "words": [["단어", 0.9], ...], "alternatives": [["...", 0.5], ...]}
+    """
+
+    name = 'http'
+
+    def __init__(self, url, timeout=15.0, connect_timeout=3.0, pool_size=16):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._requests = requests
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def is_available(self):
+        return bool(self.url)
+
+    def is_configured(self):
+        return bool(self.url)
+
+    def recognize(self, wav_content):
+        try:
+            response = self._session.post(
+                self.url, data=wav_content, headers={'Content-Type': 'audio/wav'},
+                timeout=(self.connect_timeout, self.timeout),
+            )
+        except self._requests.RequestException as e:
+            raise STTError(f'HTTP STT 연결 오류: {e}')
+        if response.status_code != 200:
+            raise STTError(f'HTTP STT 응답 오류 {response.status_code}: {response.text[:200]}')
+
+        data = response.json()
+        transcript = (data.get('transcript') or '').strip()
+        if not transcript:
+            return None
+        return STTResult(
+            transcript,
+            confidence=data.get('confidence', 0.0),
+            words=[tuple(word) for word in data.get('words', [])],
+            backend=self.name,
+            alternatives=[tuple(alt) for alt in data.get('alternatives', [])],
+        )
+
+
+class StubSTTBackend(STTBackend):
+    """자격 증명 없이 벤치마크/테스트할 때 쓰는 스텁 - 고정 문장을 지연 후 반환"""
+
+    name = 'stub'
+
+    def __init__(self, transcript='많이 내려줘', confidence=0.9, latency=0.0):
+        self.transcript = transcript
+        self.confidence = confidence
+        self.latency = latency
+
+    def _result(self):
+        words = [(word, self.confidence) for word in self.transcript.split()]
+        return STTResult(self.transcript, confidence=self.confidence, words=words, backend=self.name)
+
+    def recognize(self, wav_content):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result()
+
+    async def recognize_async(self, wav_content):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result()
+
+
+class STTRouter:
+    """요청 목적/길이에 따라 백엔드 순서를 정하고 실패 시 다음 백엔드로 넘기는 라우터"""
+
+    def __init__(self, backends, cloud='google', local=None, short_clip_seconds=2.5,
+                 failover=True, cooldown=30.0):
+        self.backends = {backend.name: backend for backend in backends}
+        self.cloud = cloud
+        self.local = local
+        self.short_clip_seconds = short_clip_seconds
+        self.failover = failover
+        self.cooldown = cooldown
+        self._unhealthy_until = {}
+        self._lock = threading.Lock()
+        self.served = {name: 0 for name in self.backends}
+        self.failures = {name: 0 for name in self.backends}
+
+    def route(self, wav_content, purpose='command', preferred=None):
+        """시도할 백엔드 이름 순서"""
+        if preferred in self.backends:
+            order = [preferred]
+        elif self.local and (purpose == 'wakeword' or wav_duration(wav_content) <= self.short_clip_seconds):
+            # 짧은 호출어 클립은 네트워크 왕복 없이 로컬 모델 우선
+            order = [self.local, self.cloud]
+        else:
+            order = [self.cloud, self.local]
+
+        if self.failover:
+            order += [name for name in self.backends if name not in order]
+        return [name for name in order if name in self.backends]
+
+    def _is_healthy(self, name):
+        with self._lock:
+            return time.monotonic() >= self._unhealthy_until.get(name, 0.0)
+
+    def _mark_failure(self, name):
+        with self._lock:
+            self.failures[name] += 1
+            self._unhealthy_until[name] = time.monotonic() + self.cooldown
+
+    def _candidates(self, wav_content, purpose, preferred, errors):
+        """시도할 (이름, 백엔드) 순서 - 장애 대기 중인 백엔드는 마지막 후보일 때만 시도"""
+        order = self.route(wav_content, purpose, preferred)
+        for index, name in enumerate(order):
+            backend = self.backends[name]
+            if not self._is_healthy(name) and index < len(order) - 1:
+                continue
+            if not backend.is_available():
+                errors.append(f'{name}: 사용 불가')
+                continue
+            yield name, backend
+
+    def _record_success(self, name):
+        with self._lock:
+            self.served[name] += 1
+
+    def _record_failure(self, name, errors, error):
+        logger.warning("⚠️ STT 백엔드 '%s' 실패, 다음 백엔드로 전환: %s", name, error)
+        self._mark_failure(name)
+        errors.append(f'{name}: {error}')
+
+    @staticmethod
+    def _unavailable(errors):
+        return STTUnavailable('사용 가능한 STT 백엔드가 없습니다 (' + '; '.join(errors) + ')')
+
+    def recognize(self, wav_content, purpose='command', preferred=None):
+        """라우팅 순서대로 인식 시도 - 결과 없음은 None, 모두 실패하면 STTUnavailable"""
+        errors = []
+        for name, backend in self._candidates(wav_content, purpose, preferred, errors):
+            try:
+                result = backend.recognize(wav_content)
+            except Exception as e:
+                self._record_failure(name, errors, e)
+                if not self.failover:
+                    break
+                continue
+            self._record_success(name)
+            return result
+        raise self._unavailable(errors)
+
+    async def recognize_async(self, wav_content, purpose='command', preferred=None):
+        """recognize()의 asyncio 버전"""
+        errors = []
+        for name, backend in self._candidates(wav_content, purpose, preferred, errors):
+            try:
+                result = await backend.recognize_async(wav_content)
+            except Exception as e:
+                self._record_failure(name, errors, e)
+                if not self.failover:
+                    break
+                continue
+            self._record_success(name)
+            return result
+        raise self._unavailable(errors)
+
+    def stats(self):
+        # 백엔드 설정 확인은 잠금 밖에서 (요청 경로의 _is_healthy를 막지 않도록), 클라이언트/모델은 만들지 않음
+        configured = {name: backend.is_configured() for name, backend in self.backends.items()}
+        with self._lock:
+            now = time.monotonic()
+            return {
+                name: {
+                    'configured': configured[name],
+                    'healthy': now >= self._unhealthy_until.get(name, 0.0),
+                    'served': self.served[name],
+                    'failures': self.failures[name],
+                }
+                for name in self.backends
+            }
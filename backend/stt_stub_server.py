@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+STT 로컬 스텁 서버 (부하 테스트용, HTTPSTTBackend 프로토콜)
+짧은 클립은 호출어, 긴 클립은 명령 문장을 돌려주며 지연/오류를 주입할 수 있습니다.
+
+사용법:
+    python -m backend.stt_stub_server --port 8082 --latency 0.4 --error-rate 0.05
+    STT_HTTP_URL=http://127.0.0.1:8082/recognize STT_CLOUD_BACKEND=http python test_server.py
+"""
+
+import argparse
+import itertools
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.stt_backends import wav_duration
+
+WAKEWORD_TRANSCRIPT = '하이 프로'
+COMMAND_TRANSCRIPTS = [
+    '아래로 스크롤해줘',
+    '네이버 열어줘',
+    '검색 버튼 눌러줘',
+    '위로 올려줘',
+    '로그인 버튼 클릭해줘',
+    '유튜브 실행해줘',
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    hang_rate = 0.0          # 응답하지 않고 hang_seconds 동안 붙잡는 비율 (타임아웃 주입)
+    hang_seconds = 30.0
+    short_clip_seconds = 2.5
+    confidence = 0.92
+    _commands = itertools.cycle(COMMAND_TRANSCRIPTS)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def transcript_for(self, wav_content):
+        """클립 길이로 호출어 / 명령 문장 선택"""
+        if wav_duration(wav_content) <= self.short_clip_seconds:
+            return WAKEWORD_TRANSCRIPT
+        return next(self._commands)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        wav_content = self.rfile.read(length)
+
+        if not self.path.startswith('/recognize'):
+            self._send(404, {'error': 'not found'})
+            return
+
+        roll = random.random()
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if roll >= 1.0 - self.error_rate:
+            self._send(503, {'error': 'stub injected error'}, {'Retry-After': '0'})
+            return
+
+        transcript = self.transcript_for(wav_content)
+        self._send(200, {
+            'transcript': transcript,
+            'confidence': self.confidence,
+            'words': [[word, self.confidence] for word in transcript.split()],
+            'alternatives': [],
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='STT 스텁 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--latency', type=float, default=0.0, help='응답 지연 (초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='지연 편차 (초)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 오류 주입 비율 (0~1)')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='응답 지연(타임아웃) 주입 비율 (0~1)')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.jitter = args.jitter
+    StubHandler.error_rate = args.error_rate
+    StubHandler.hang_rate = args.hang_rate
+    StubHandler.hang_seconds = args.hang_seconds
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"🧪 STT 스텁 서버: http://{args.host}:{args.port}/recognize")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""요청 단계별 소요 시간 측정"""
+
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """단계별 소요 시간(ms)을 기록하는 타이머"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings[f'{name}_ms'] = round(self.timings.get(f'{name}_ms', 0.0) + elapsed, 2)
+
+    def summary(self):
+        """단계별 시간 + 전체 시간"""
+        result = dict(self.timings)
+        result['total_ms'] = round((time.perf_counter() - self._started) * 1000, 2)
+        return result
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+압축 TTS 스트리밍
+긴 답변을 문장 단위로 나눠 TTS 워커에 한꺼번에 넣고, 합성이 끝나는 순서대로 ffmpeg 인코더(Ogg/Opus, MP3) 하나에
+PCM을 이어 붙여 압축된 바이트를 청크 응답으로 바로 보냅니다.
+- 첫 문장만 합성되면 재생을 시작할 수 있고 (나머지는 재생 중에 합성)
+- 음성 대역 비트레이트(Opus 24kbps 등)라 WAV + base64 JSON보다 전송량이 훨씬 작습니다.
+문장별 WAV는 TTS 워커 캐시에 그대로 저장되므로 자주 쓰는 문장은 다시 합성하지 않습니다.
+"""
+
+import re
+import subprocess
+import threading
+import time
+
+from backend.audio_convert import read_wav_pcm
+
+# 형식: (Content-Type, 기본 비트레이트, ffmpeg 출력 옵션)
+STREAM_FORMATS = {
+    # Ogg 페이지 길이(page_duration, µs)는 오디오 기준 0.5초 - 인코딩은 실시간보다 빠르므로 첫 청크를 늦추지 않음
+    'opus': ('audio/ogg', '24k', ['-c:a', 'libopus', '-application', 'voip', '-frame_duration', '20',
+                                  '-page_duration', '500000', '-f', 'ogg']),
+    'mp3': ('audio/mpeg', '32k', ['-c:a', 'libmp3lame', '-f', 'mp3']),
+}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?。？！…])\s+|\n+')
+_SOFT_BREAK = re.compile(r'(?<=[,，;:])\s+|\s+')
+
+
+class TTSStreamError(Exception):
+    """압축 스트림 인코딩 실패"""
+
+
+def split_sentences(text, max_chars=120, min_chars=12):
+    """문장 경계(. ! ? 줄바꿈)로 나눔 - 첫 문장은 따로 두고, 짧은 문장은 다음 문장과 합치며,
+    max_chars보다 긴 문장은 쉼표/공백에서 다시 나눔"""
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            breaks = [m.start() for m in _SOFT_BREAK.finditer(sentence, 0, max_chars + 1) if m.start() > 0]
+            cut = breaks[-1] if breaks else max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    merged = []
+    for piece in pieces:
+        # 첫 문장은 빨리 재생을 시작하도록 합치지 않음
+        if len(merged) > 1 and len(merged[-1]) < min_chars and len(merged[-1]) + len(piece) < max_chars:
+            merged[-1] = f'{merged[-1]} {piece}'
+        else:
+            merged.append(piece)
+    if len(merged) > 1 and len(merged[-1]) < min_chars and len(merged[-2]) + len(merged[-1]) < max_chars:
+        merged[-2:] = [f'{merged[-2]} {merged[-1]}']
+    return merged
+
+
+def _encoder_command(audio_format, sample_rate, channels, bitrate, ffmpeg_bin):
+    _, default_bitrate, output_args = STREAM_FORMATS[audio_format]
+    return [
+        ffmpeg_bin, '-hide_banner', '-loglevel', 'error',
+        # 입력 분석(기본 5초 분량)을 생략해야 stdin이 열려 있는 동안에도 바로 인코딩해서 내보냄
+        '-probesize', '32', '-analyzeduration', '0',
+        '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels), '-i', 'pipe:0',
+        '-ac', '1', '-b:a', bitrate or default_bitrate, '-flush_packets', '1',
+        *output_args, 'pipe:1',
+    ]
+
+
+def encode_audio(wav_content, audio_format='opus', bitrate=None, ffmpeg_bin='ffmpeg', timeout=10.0):
+    """WAV 바이트 전체를 압축 형식으로 인코딩 (스트리밍하지 않는 응답용)"""
+    decoded = read_wav_pcm(wav_content)
+    if decoded is None:
+        raise TTSStreamError('16bit PCM WAV가 아닙니다.')
+    pcm_bytes, sample_rate, channels = decoded
+    try:
+        completed = subprocess.run(
+            _encoder_command(audio_format, sample_rate, channels, bitrate, ffmpeg_bin),
+            input=pcm_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise TTSStreamError(f'인코딩 실패: {e}')
+    if completed.returncode != 0 or not completed.stdout:
+        message = completed.stderr.decode('utf-8', errors='replace').strip()[-300:]
+        raise TTSStreamError(f'인코딩 실패 (code={completed.returncode}): {message}')
+    return completed.stdout
+
+
+class CompressedTTSStream:
+    """문장별 합성 Future 목록 → 압축 오디오 청크 (iter)
+
+    start()는 첫 문장 합성을 기다린 뒤 인코더를 띄우므로, 합성 오류는 응답을 보내기 전에 예외로 드러납니다.
+    그 뒤 문장의 오류는 스트림을 거기서 끝내고 error에 남깁니다.
+    """
+
+    def __init__(self, futures, audio_format='opus', bitrate=None, ffmpeg_bin='ffmpeg', timeout=30.0,
+                 chunk_size=4096, on_finish=None):
+        if audio_format not in STREAM_FORMATS:
+            raise ValueError(f'지원하지 않는 TTS 스트림 형식: {audio_format}')
+        self.futures = futures
+        self.audio_format = audio_format
+        self.mimetype = STREAM_FORMATS[audio_format][0]
+        self.bitrate = bitrate
+        self.ffmpeg_bin = ffmpeg_bin
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.on_finish = on_finish  # on_finish(stream) - 스트림이 끝나면 호출 (메트릭 기록용)
+
+        self.started_at = time.perf_counter()
+        self.first_chunk_seconds = None
+        self.bytes_sent = 0
+        self.pcm_bytes = 0
+        self.error = None
+        self._finished = False
+        self._proc = None
+        self._feeder = None
+
+    def start(self):
+        first = read_wav_pcm(self.futures[0].result(timeout=self.timeout))
+        if first is None:
+            raise TTSStreamError('TTS 결과가 16bit PCM WAV가 아닙니다.')
+        _, sample_rate, channels = first
+        try:
+            self._proc = subprocess.Popen(
+                _encoder_command(self.audio_format, sample_rate, channels, self.bitrate, self.ffmpeg_bin),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise TTSStreamError(f'ffmpeg 실행 실패: {e}')
+        self._feeder = threading.Thread(target=self._feed, args=(self._proc, first),
+                                        name='tts-stream-feeder', daemon=True)
+        self._feeder.start()
+        return self
+
+    def _feed(self, proc, first):
+        """합성된 순서대로 PCM을 인코더에 씀 (형식이 바뀌면 중단)"""
+        decoded = first
+        try:
+            for index, future in enumerate(self.futures):
+                if index:
+                    decoded = read_wav_pcm(future.result(timeout=self.timeout))
+                    if decoded is None or decoded[1:] != first[1:]:
+                        raise TTSStreamError(f'{index + 1}번째 문장의 오디오 형식이 다릅니다.')
+                proc.stdin.write(decoded[0])
+                proc.stdin.flush()
+                self.pcm_bytes += len(decoded[0])
+        except Exception as e:
+            self.error = e
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    def __iter__(self):
+        stdout = self._proc.stdout
+        try:
+            while True:
+                chunk = stdout.read1(self.chunk_size)
+                if not chunk:
+                    self._finished = True
+                    break
+                if self.first_chunk_seconds is None:
+                    self.first_chunk_seconds = time.perf_counter() - self.started_at
+                self.bytes_sent += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        """인코더 정리 (클라이언트가 중간에 끊어도 호출됨)"""
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        # 남은 문장 합성은 취소하지 않음 (같은 문장을 기다리는 다른 요청과 Future를 공유하고, 결과는 캐시에 남음)
+        if not self._finished:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+        if self.on_finish is not None:
+            self.on_finish(self)
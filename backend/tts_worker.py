@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+TTS 전용 워커 스레드 + 합성 음성 캐시
+pyttsx3 엔진은 여러 스레드에서 동시에 쓸 수 없으므로 엔진을 만든 워커 스레드 하나가 큐로 받은 작업을 순서대로 처리합니다.
+합성 결과는 (음성 설정 + 텍스트) 해시를 키로 저장소(기본: 메모리 LRU, 선택: Redis 공유)에 보관하고,
+고정 문구는 시작 시 미리 합성합니다.
+"""
+
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import Future
+
+from backend.singleflight import SingleFlight
+from backend.storage import MemoryStore
+
+
+def normalize_tts_text(text):
+    """캐시 키 / 합성용 텍스트 - 공백 차이로 같은 문장을 다시 합성하지 않도록 정리"""
+    return ' '.join(text.split())
+
+
+class TTSUnavailable(Exception):
+    """TTS 엔진 사용 불가"""
+
+
+class StubTTSEngine:
+    """pyttsx3 없이 벤치마크/테스트할 때 쓰는 스텁 엔진 (pyttsx3의 save_to_file / runAndWait 흉내)
+
+    글자 수에 비례하는 시간(seconds_per_char) 동안 기다린 뒤, 글자당 audio_per_char초 길이의
+    22.05kHz 16bit 모노 WAV(배음 + 음절 단위 진폭 변조)를 씁니다.
+    """
+
+    sample_rate = 22050
+
+    def __init__(self, seconds_per_char=0.01, audio_per_char=0.12):
+        self.seconds_per_char = seconds_per_char
+        self.audio_per_char = audio_per_char
+        self._queued = []
+
+    def setProperty(self, name, value):
+        pass
+
+    def save_to_file(self, text, path):
+        self._queued.append((text, path))
+
+    def runAndWait(self):
+        import time
+        import wave
+
+        import numpy as np
+
+        queued, self._queued = self._queued, []
+        for text, path in queued:
+            time.sleep(self.seconds_per_char * len(text))
+            t = np.arange(int(self.audio_per_char * max(len(text), 1) * self.sample_rate)) / self.sample_rate
+            phase = 2 * np.pi * np.cumsum(140.0 + 30.0 * np.sin(2 * np.pi * 0.7 * t)) / self.sample_rate
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+            envelope = np.clip(np.sin(2 * np.pi * 4.5 * t), 0.0, None) ** 0.5
+            samples = (0.25 * voiced * envelope * 32767).astype('<i2')
+            with wave.open(path, 'wb') as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(self.sample_rate)
+                wav_file.writeframes(samples.tobytes())
+
+
+class TTSWorker:
+    """pyttsx3 엔진 접근을 직렬화하는 워커 + 내용 주소 기반 음성 캐시"""
+
+    def __init__(self, rate=150, volume=0.8, voice=None, cache_max_bytes=32 * 1024 * 1024,
+                 engine_factory=None, store=None, flight=None):
+        self.rate = rate
+        self.volume = volume
+        self.voice = voice
+        self.cache_max_bytes = cache_max_bytes
+        self._engine_factory = engine_factory
+
+        self._jobs = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = None
+        self._engine_error = None
+        self.is_available = False
+
+        self.store = store if store is not None else MemoryStore(max_bytes=cache_max_bytes)  # 키 -> WAV 바이트
+        self._cache_lock = threading.Lock()
+        self.flight = flight if flight is not None else SingleFlight('tts')  # 같은 문구 동시 합성 방지
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, wait=5.0):
+        """워커 스레드를 시작하고 엔진 초기화 완료까지 대기"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='tts-worker', daemon=True)
+            self._thread.start()
+        self._ready.wait(wait)
+        return self.is_available
+
+    def _create_engine(self):
+        if self._engine_factory is not None:
+            return self._engine_factory()
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)
+        engine.setProperty('volume', self.volume)
+        if self.voice:
+            engine.setProperty('voice', self.voice)
+        return engine
+
+    def _run(self):
+        # 엔진은 이 스레드에서만 생성/사용
+        try:
+            engine = self._create_engine()
+            self.is_available = True
+        except Exception as e:
+            print(f"❌ TTS 엔진 초기화 실패: {e}")
+            self._engine_error = e
+            engine = None
+        finally:
+            self._ready.set()
+
+        while True:
+            key, text, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                self.flight.finish(key, future)
+                continue
+            try:
+                if engine is None:
+                    raise TTSUnavailable(f'TTS 엔진이 초기화되지 않았습니다: {self._engine_error}')
+                audio = self._synthesize_with(engine, text)
+                self.store.set(key, audio)
+            except Exception as e:
+                self.flight.finish(key, future, error=e)
+            else:
+                self.flight.finish(key, future, audio)
+
+    @staticmethod
+    def _synthesize_with(engine, text):
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+            temp_file_path = temp_file.name
+        try:
+            engine.save_to_file(text, temp_file_path)
+            engine.runAndWait()
+            with open(temp_file_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(temp_file_path)
+
+    def cache_key(self, text):
+        """음성 설정 + 텍스트(앞뒤/연속 공백 정리)의 SHA-256"""
+        material = f'{self.rate}|{self.volume}|{self.voice}|{normalize_tts_text(text)}'
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def submit(self, text):
+        """합성 작업 제출 - 캐시 적중 시 완료된 Future 반환"""
+        key = self.cache_key(text)
+        audio = self.store.get(key)
+        with self._cache_lock:
+            if audio is not None:
+                self.hits += 1
+                future = Future()
+                future.set_result(audio)
+                return future
+            self.misses += 1
+        future, leader = self.flight.begin(key)
+        if leader:
+            self._jobs.put((key, normalize_tts_text(text), future))
+        return future
+
+    def synthesize(self, text, timeout=30.0):
+        """텍스트를 WAV 바이트로 합성 (캐시 우선)"""
+        if self._ready.is_set() and not self.is_available:
+            raise TTSUnavailable('TTS 엔진이 초기화되지 않았습니다.')
+        return self.submit(text).result(timeout=timeout)
+
+    def precompute(self, phrases):
+        """고정 문구를 백그라운드에서 미리 합성"""
+        return [self.submit(phrase) for phrase in phrases]
+
+    @property
+    def is_running(self):
+        """엔진 초기화에 성공했고 워커 스레드가 살아 있는지"""
+        return self.is_available and self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        store_stats = self.store.stats()
+        with self._cache_lock:
+            return {
+                'store': store_stats['backend'],
+                'entries': store_stats.get('entries'),
+                'bytes': store_stats.get('bytes'),
+                'hits': self.hits,
+                'misses': self.misses,
+                'merged': self.flight.merged,
+                'queued': self._jobs.qsize(),
+            }
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+에너지 기반 음성 구간 검출(VAD) 및 무음 제거
+STT 호출 전에 앞뒤 무음을 잘라내고, 음성이 없는 클립은 STT 없이 빈 결과로 처리합니다.
+"""
+
+import io
+import wave
+
+import numpy as np
+
+
+class VadResult:
+    """VAD 결과 (음성 여부, 음성 구간, 잘라낸 WAV)"""
+
+    def __init__(self, has_speech, start=0.0, end=0.0, duration=0.0, wav_content=None):
+        self.has_speech = has_speech
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.wav_content = wav_content
+
+    def span(self):
+        """응답용 음성 구간 (초 단위)"""
+        if not self.has_speech:
+            return None
+        return {'start': round(self.start, 3), 'end': round(self.end, 3)}
+
+
+class EnergyVad:
+    """프레임 에너지(dB)와 적응형 잡음 기준으로 음성 구간을 찾는 VAD"""
+
+    def __init__(self, frame_ms=30, hop_ms=10, margin_db=10.0, min_energy_db=-50.0,
+                 speech_energy_db=-30.0, min_speech_ms=120, hangover_ms=150, padding_ms=200):
+        self.frame_ms = frame_ms
+        self.hop_ms = hop_ms
+        self.margin_db = margin_db
+        self.min_energy_db = min_energy_db
+        self.speech_energy_db = speech_energy_db
+        self.min_speech_ms = min_speech_ms
+        self.hangover_ms = hangover_ms
+        self.padding_ms = padding_ms
+
+    def _frame_energy_db(self, samples, sample_rate):
+        frame_length = int(sample_rate * self.frame_ms / 1000)
+        hop_length = int(sample_rate * self.hop_ms / 1000)
+        if len(samples) < frame_length:
+            return np.empty(0, dtype=np.float32), hop_length, frame_length
+        frames = np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+        energy = np.mean(frames * frames, axis=1)
+        return 10.0 * np.log10(energy + 1e-12), hop_length, frame_length
+
+    def voiced_frames(self, samples, sample_rate):
+        """프레임별 음성 여부 마스크와 (hop, frame) 길이 반환"""
+        energy_db, hop_length, frame_length = self._frame_energy_db(samples, sample_rate)
+        if energy_db.size == 0:
+            return np.zeros(0, dtype=bool), hop_length, frame_length
+
+        # 하위 10% 프레임을 잡음 바닥으로 보고 그보다 margin_db 이상 큰 프레임을 음성으로 판단
+        # (클립 전체가 음성이어도 speech_energy_db 이상인 프레임은 항상 음성으로 인정)
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = min(max(noise_floor + self.margin_db, self.min_energy_db), self.speech_energy_db)
+        voiced = energy_db > threshold
+
+        # 짧은 잡음 버스트 제거
+        min_frames = max(1, self.min_speech_ms // self.hop_ms)
+        edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        long_enough = (ends - starts) >= min_frames
+        keep = np.zeros_like(voiced)
+        for start, end in zip(starts[long_enough], ends[long_enough]):
+            keep[start:end] = True
+
+        # 음절 사이 짧은 무음은 음성 구간으로 이어 붙임 (hangover)
+        hangover = self.hangover_ms // self.hop_ms
+        if hangover > 0 and keep.any():
+            keep = np.convolve(keep, np.ones(2 * hangover + 1), mode='same') > 0
+        return keep, hop_length, frame_length
+
+    def process(self, wav_content):
+        """WAV 바이트에서 음성 구간을 찾아 앞뒤 무음을 잘라낸 결과 반환"""
+        with wave.open(io.BytesIO(wav_content), 'rb') as wav_file:
+            sample_rate = wav_file.getframerate()
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            frames = wav_file.readframes(wav_file.getnframes())
+
+        if sample_width != 2 or channels != 1:
+            # 지원하지 않는 형식은 자르지 않고 그대로 통과
+            return VadResult(True, wav_content=wav_content)
+
+        pcm = np.frombuffer(frames, dtype='<i2')
+        duration = len(pcm) / sample_rate
+        samples = pcm.astype(np.float32) / 32768.0
+
+        voiced, hop_length, frame_length = self.voiced_frames(samples, sample_rate)
+        indices = np.flatnonzero(voiced)
+        if indices.size == 0:
+            return VadResult(False, duration=duration)
+
+        padding = int(sample_rate * self.padding_ms / 1000)
+        start = int(max(0, indices[0] * hop_length - padding))
+        end = int(min(len(pcm), indices[-1] * hop_length + frame_length + padding))
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(sample_rate)
+            out.writeframes(pcm[start:end].tobytes())
+
+        return VadResult(
+            True,
+            start=start / sample_rate,
+            end=end / sample_rate,
+            duration=duration,
+            wav_content=buffer.getvalue(),
+        )
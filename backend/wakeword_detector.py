@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+CPU 전용 경량 호출어 감지기
+NumPy MFCC + 템플릿 매칭(부분 구간 DTW)으로 클라우드 STT 호출 없이 수 ms 안에 판정합니다.
+템플릿 디렉토리가 바뀌면(다른 워커가 등록) check_interval 안에 다시 읽어 모든 워커가 같은 템플릿을 씁니다.
+"""
+
+import glob
+import io
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400   # 25ms
+HOP_LENGTH = 160     # 10ms
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+
+def wav_to_samples(wav_content):
+    """16bit 모노 WAV 바이트를 float32 샘플 배열로 변환"""
+    with wave.open(io.BytesIO(wav_content), 'rb') as wav_file:
+        frames = wav_file.readframes(wav_file.getnframes())
+        sample_rate = wav_file.getframerate()
+    samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    return samples, sample_rate
+
+
+def _mel_filterbank(sample_rate=SAMPLE_RATE, n_fft=N_FFT, n_mels=N_MELS):
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2.0), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filterbank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filterbank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filterbank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filterbank
+
+
+def _dct_matrix(n_mfcc=N_MFCC, n_mels=N_MELS):
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    matrix = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+# 필터뱅크/DCT/윈도우는 한 번만 계산
+_MEL_FILTERBANK = _mel_filterbank()
+_DCT_MATRIX = _dct_matrix()
+_WINDOW = np.hamming(FRAME_LENGTH).astype(np.float32)
+
+
+def frame_signal(samples, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """신호를 (프레임 수, frame_length) 형태의 뷰로 분할"""
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    n_frames = 1 + (len(samples) - frame_length) // hop_length
+    return np.lib.stride_tricks.as_strided(
+        samples,
+        shape=(n_frames, frame_length),
+        strides=(samples.strides[0] * hop_length, samples.strides[0]),
+        writeable=False,
+    )
+
+
+def compute_mfcc(samples):
+    """MFCC 특징 (프레임 수, N_MFCC) 계산 - 켑스트럼 평균 정규화 적용"""
+    emphasized = np.append(samples[:1], samples[1:] - 0.97 * samples[:-1]).astype(np.float32)
+    frames = frame_signal(emphasized) * _WINDOW
+    power = (np.abs(np.fft.rfft(frames, n=N_FFT)) ** 2) / N_FFT
+    mel_energy = np.log(power @ _MEL_FILTERBANK.T + 1e-10)
+    mfcc = mel_energy @ _DCT_MATRIX.T
+    return mfcc - mfcc.mean(axis=0, keepdims=True)
+
+
+def _normalize_rows(features):
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, 1e-8)
+
+
+def subsequence_dtw_distance(template, query):
+    """템플릿이 질의 신호의 어느 구간과 가장 잘 맞는지 정규화된 DTW 거리로 반환
+
+    각 단계에서 템플릿 인덱스가 1씩 증가하는 (1,0)/(1,1)/(1,2) 스텝만 허용하므로
+    행 단위로 벡터화되어 템플릿 길이만큼의 NumPy 연산으로 끝납니다.
+    """
+    # 코사인 거리 행렬 (템플릿 프레임 × 질의 프레임), c0(에너지) 제외
+    cost = 1.0 - _normalize_rows(template[:, 1:]) @ _normalize_rows(query[:, 1:]).T
+
+    accumulated = cost[0].copy()
+    for i in range(1, cost.shape[0]):
+        prev = accumulated
+        best = prev.copy()
+        best[1:] = np.minimum(best[1:], prev[:-1])
+        best[2:] = np.minimum(best[2:], prev[:-2])
+        accumulated = cost[i] + best
+    return float(accumulated.min() / cost.shape[0])
+
+
+class WakewordDetector:
+    """등록된 호출어 템플릿과의 MFCC-DTW 거리로 호출어 여부 판정"""
+
+    def __init__(self, template_dir=None, threshold=0.35, energy_threshold=0.01, check_interval=5.0):
+        self.template_dir = template_dir
+        self.threshold = threshold
+        self.energy_threshold = energy_threshold
+        self.check_interval = check_interval
+        self._templates = []
+        self._lock = threading.Lock()
+        self._dir_mtime = None      # 마지막으로 읽은 템플릿 디렉토리 mtime
+        self._checked_at = 0.0      # 마지막 mtime 확인 시각
+
+    @property
+    def is_ready(self):
+        return bool(self._templates)
+
+    def load_templates(self):
+        """템플릿 디렉토리의 WAV 파일에서 특징 추출"""
+        if not self.template_dir or not os.path.isdir(self.template_dir):
+            return 0
+        # 읽는 도중 추가된 파일은 다음 확인 때 다시 읽히도록 mtime을 먼저 기록
+        dir_mtime = os.path.getmtime(self.template_dir)
+        templates = []
+        for path in sorted(glob.glob(os.path.join(self.template_dir, '*.wav'))):
+            try:
+                with open(path, 'rb') as f:
+                    samples, sample_rate = wav_to_samples(f.read())
+            except (OSError, wave.Error, EOFError) as e:
+                print(f"⚠️ 호출어 템플릿 로드 실패: {path} ({e})")
+                continue
+            if sample_rate != SAMPLE_RATE:
+                print(f"⚠️ 호출어 템플릿 샘플링 레이트 불일치: {path} ({sample_rate}Hz)")
+                continue
+            trimmed = self._trim(samples)
+            if trimmed is not None:
+                templates.append(compute_mfcc(trimmed))
+        with self._lock:
+            self._templates = templates
+            self._dir_mtime = dir_mtime
+        return len(templates)
+
+    def refresh(self):
+        """check_interval마다 템플릿 디렉토리 mtime을 확인해 바뀌었으면 다시 로드 (다른 워커의 등록 반영)"""
+        now = time.monotonic()
+        if not self.template_dir or now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            dir_mtime = os.path.getmtime(self.template_dir)
+        except OSError:
+            return False
+        if dir_mtime == self._dir_mtime:
+            return False
+        self.load_templates()
+        return True
+
+    def enroll(self, wav_content):
+        """새 호출어 템플릿 등록 (디렉토리가 설정되어 있으면 파일로도 저장)"""
+        samples, sample_rate = wav_to_samples(wav_content)
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f'16kHz WAV만 등록할 수 있습니다 ({sample_rate}Hz)')
+        trimmed = self._trim(samples)
+        if trimmed is None:
+            raise ValueError('음성 구간이 감지되지 않았습니다.')
+
+        features = compute_mfcc(trimmed)
+        with self._lock:
+            if self.template_dir:
+                os.makedirs(self.template_dir, exist_ok=True)
+                up_to_date = os.path.getmtime(self.template_dir) == self._dir_mtime
+                path = os.path.join(self.template_dir, f'template_{int(time.time() * 1000)}_{os.getpid()}.wav')
+                with open(path, 'wb') as f:
+                    f.write(wav_content)
+                # 이 워커는 바로 추가하므로 다시 읽지 않음 (다른 워커는 refresh()에서 디렉토리 변경을 보고 다시 읽음)
+                if up_to_date:
+                    self._dir_mtime = os.path.getmtime(self.template_dir)
+            self._templates = self._templates + [features]
+            return len(self._templates)
+
+    def _trim(self, samples):
+        # 프레임 RMS가 기준 이상인 구간만 남김
+        frames = frame_signal(samples)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        voiced = np.flatnonzero(rms >= self.energy_threshold)
+        if voiced.size == 0:
+            return None
+        start = voiced[0] * HOP_LENGTH
+        end = voiced[-1] * HOP_LENGTH + FRAME_LENGTH
+        return samples[start:end]
+
+    def detect(self, samples):
+        """호출어 감지 결과 딕셔너리 반환"""
+        started = time.perf_counter()
+        self.refresh()
+        templates = self._templates
+
+        result = {
+            'is_wakeword': False,
+            'score': None,
+            'has_speech': False,
+            'elapsed_ms': 0.0,
+        }
+
+        trimmed = self._trim(samples)
+        if trimmed is not None and templates:
+            result['has_speech'] = True
+            query = compute_mfcc(trimmed)
+            distance = min(subsequence_dtw_distance(t, query) for t in templates)
+            result['score'] = round(distance, 4)
+            result['is_wakeword'] = distance <= self.threshold
+        elif trimmed is not None:
+            result['has_speech'] = True
+
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return result
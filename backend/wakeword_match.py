@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""
+STT 결과 텍스트 기반 호출어 매칭
+호출어 변형을 정규화/중복 제거해 자모 단위로 미리 분해해 두고,
+인식 결과의 각 단어 시작 위치에서 창을 밀어가며 상한이 있는 편집 거리로 비교합니다.
+편집 거리 계산 전에 창 안의 자모 bigram 수로 가망 없는 창을 걸러내 긴 문장에서도 비용이 거의 늘지 않습니다.
+최종 점수는 텍스트 유사도에 해당 구간 단어들의 STT 신뢰도를 반영해 계산합니다.
+"""
+
+import math
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_JUNGSEONG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+_JONGSEONG = ('', 'ㄱ', 'ㄲ', 'ㄳ', 'ㄴ', 'ㄵ', 'ㄶ', 'ㄷ', 'ㄹ', 'ㄺ', 'ㄻ', 'ㄼ', 'ㄽ', 'ㄾ', 'ㄿ', 'ㅀ',
+              'ㅁ', 'ㅂ', 'ㅄ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ')
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+DEFAULT_MAX_ERROR_RATIO = 0.2  # 변형 자모 길이 대비 허용 편집 거리
+DEFAULT_STT_WEIGHT = 0.5       # 점수에 STT 신뢰도를 반영하는 비율
+
+
+def decompose_jamo(text):
+    """한글 음절을 초성/중성/종성 자모로 분해 (그 외 문자는 그대로)"""
+    jamo = []
+    for char in text:
+        code = ord(char)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            index = code - _HANGUL_BASE
+            jamo.append(_CHOSEONG[index // 588])
+            jamo.append(_JUNGSEONG[(index % 588) // 28])
+            if index % 28:
+                jamo.append(_JONGSEONG[index % 28])
+        else:
+            jamo.append(char)
+    return ''.join(jamo)
+
+
+@lru_cache(maxsize=4096)
+def _syllable_jamo(char):
+    """음절 하나의 자모 (자주 나오는 음절은 캐시)"""
+    return decompose_jamo(char)
+
+
+def normalize_wakeword_text(text):
+    """소문자 + 문장부호 제거 + 공백 정리"""
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def bounded_window_distance(pattern, text, start, max_distance, end_costs=None):
+    """text[start:]로 시작하는 창들 중 pattern과의 최소 편집 거리 (상한 초과 시 None)
+
+    Ukkonen 대역(|i - j| <= max_distance)만 계산하고 대역 안 최솟값이 상한을 넘으면 바로 중단합니다.
+    end_costs[위치]가 주어지면 창 끝 위치별 추가 비용을 더하고, None인 위치에서는 창을 끝내지 않습니다.
+    반환값: (거리, 창 끝 위치)
+    """
+    m = len(pattern)
+    k = max_distance
+    inf = k + 1
+    previous = [i if i <= k else inf for i in range(m + 1)]
+    best, best_end = inf, start
+    end_limit = min(len(text), start + m + k)
+
+    for row, position in enumerate(range(start, end_limit), start=1):
+        char = text[position]
+        current = [inf] * (m + 1)
+        low = max(1, row - k)
+        high = min(m, row + k)
+        if row <= k:
+            current[0] = row
+        row_min = current[0]
+        for i in range(low, high + 1):
+            value = previous[i - 1] + (pattern[i - 1] != char)
+            if previous[i] + 1 < value:
+                value = previous[i] + 1
+            if current[i - 1] + 1 < value:
+                value = current[i - 1] + 1
+            current[i] = value
+            if value < row_min:
+                row_min = value
+
+        if current[m] < inf:
+            extra = 0 if end_costs is None else end_costs[position + 1]
+            if extra is not None and current[m] + extra < best:
+                best, best_end = current[m] + extra, position + 1
+        if row_min > k:
+            break
+        previous = current
+
+    if best > k:
+        return None
+    return best, best_end
+
+
+class WakewordMatch:
+    """매칭 결과"""
+
+    def __init__(self, is_wakeword=False, score=0.0, similarity=0.0, stt_confidence=None,
+                 variant=None, distance=None, matched_text=''):
+        self.is_wakeword = is_wakeword
+        self.score = score
+        self.similarity = similarity
+        self.stt_confidence = stt_confidence
+        self.variant = variant
+        self.distance = distance
+        self.matched_text = matched_text
+
+    def to_dict(self):
+        return {
+            'is_wakeword': self.is_wakeword,
+            'score': round(self.score, 3),
+            'similarity': round(self.similarity, 3),
+            'stt_confidence': self.stt_confidence,
+            'variant': self.variant,
+            'distance': self.distance,
+            'matched_text': self.matched_text,
+        }
+
+
+class WakewordMatcher:
+    """중복 제거된 호출어 변형 인덱스 + 단어 시작 기준 슬라이딩 창 퍼지 매칭"""
+
+    def __init__(self, wake_words, max_error_ratio=DEFAULT_MAX_ERROR_RATIO, stt_weight=DEFAULT_STT_WEIGHT):
+        self.wake_words = list(wake_words)
+        self.max_error_ratio = max_error_ratio
+        self.stt_weight = stt_weight
+
+        # 공백 차이만 있는 변형('하이 프로' / '하이프로')은 하나로 합침
+        variants = {}
+        for word in wake_words:
+            compact = normalize_wakeword_text(word).replace(' ', '')
+            if compact and compact not in variants:
+                variants[compact] = decompose_jamo(compact)
+        # 긴 변형부터 검사해 '하이프로야'가 '프로야'보다 먼저 잡히도록 함
+        self.variants = sorted(variants.items(), key=lambda item: len(item[1]), reverse=True)
+        self._max_distances = {
+            compact: int(len(jamo) * max_error_ratio) for compact, jamo in self.variants
+        }
+        # q-gram 필터: 편집 k번 이내로 맞으려면 변형의 자모 bigram 중 (m - 1) - 2k개 이상이 텍스트에 있어야 함
+        self._bigram_sets = {}
+        self._bigram_index = {}  # bigram → [(변형, 변형 안 등장 횟수)]
+        for compact, jamo in self.variants:
+            bigrams = [jamo[i:i + 2] for i in range(len(jamo) - 1)]
+            self._bigram_sets[compact] = set(bigrams)
+            for bigram in self._bigram_sets[compact]:
+                self._bigram_index.setdefault(bigram, []).append((compact, bigrams.count(bigram)))
+
+    def _prepare(self, transcript):
+        """공백을 뺀 자모 문자열, 자모 위치 → 단어 번호, 단어 시작 자모 위치, 창 끝 위치별 추가 비용
+
+        창은 음절 경계에서만 끝날 수 있고, 단어 중간에서 끝나면 남은 자모 수만큼 비용을 더합니다.
+        ("프로야구"의 "프로야", "비서실"의 "비서ㅅㅣ" 같은 오탐 방지)
+        """
+        words = normalize_wakeword_text(transcript).split()
+        jamo_parts, owners, word_starts = [], [], []
+        end_costs = [None]
+        for word_index, word in enumerate(words):
+            word_starts.append(len(owners))
+            syllables = [_syllable_jamo(char) for char in word]
+            word_length = sum(len(jamo) for jamo in syllables)
+            consumed = 0
+            for jamo in syllables:
+                end_costs.extend([None] * (len(jamo) - 1))
+                consumed += len(jamo)
+                end_costs.append(word_length - consumed)
+                jamo_parts.append(jamo)
+            owners.extend([word_index] * word_length)
+        return words, ''.join(jamo_parts), owners, word_starts, end_costs
+
+    def _stt_confidence(self, words, matched_words, stt_confidence, word_confidences):
+        """매칭 구간 단어들의 STT 신뢰도 (단어 신뢰도가 없으면 문장 신뢰도, 둘 다 없으면 None)"""
+        if word_confidences:
+            normalized = [(normalize_wakeword_text(word), conf) for word, conf in word_confidences]
+            if len(normalized) == len(words):
+                values = [normalized[i][1] for i in matched_words]
+            else:
+                lookup = dict(normalized)
+                values = [lookup[words[i]] for i in matched_words if words[i] in lookup]
+            values = [value for value in values if value and value > 0]
+            if values:
+                return sum(values) / len(values)
+        if stt_confidence and stt_confidence > 0:
+            return stt_confidence
+        return None
+
+    def _exact_match(self, text, word_starts, end_costs):
+        """단어 경계에서 그대로 일치하는 가장 긴 변형 (편집 거리 계산 없음)"""
+        for compact, jamo in self.variants:
+            position = text.find(jamo)
+            while position >= 0:
+                end = position + len(jamo)
+                if end_costs[end] == 0 and position in word_starts:
+                    return 1.0, compact, 0, position, end
+                position = text.find(jamo, position + 1)
+        return None
+
+    def _fuzzy_match(self, text, word_starts, end_costs):
+        """편집 거리가 가장 작은 (유사도가 가장 높은) 변형과 창 - 지금까지의 최고 유사도를 넘을 수 없는 거리는 계산하지 않음"""
+        # 자모 bigram → 텍스트 위치, 변형별로 텍스트에 있는 bigram 수
+        text_bigrams = {}
+        for i in range(len(text) - 1):
+            text_bigrams.setdefault(text[i:i + 2], []).append(i)
+        shared = {}
+        for bigram in text_bigrams:
+            for compact, count in self._bigram_index.get(bigram, ()):
+                shared[compact] = shared.get(compact, 0) + count
+
+        best = None
+        for compact, jamo in self.variants:
+            max_distance = self._max_distances[compact]
+            if best is not None:
+                max_distance = min(max_distance, math.ceil((1.0 - best[0]) * len(jamo)) - 1)
+            needed = len(jamo) - 1 - 2 * max_distance
+            if max_distance < 0 or shared.get(compact, 0) < needed:
+                continue
+            # 창 [start, start + m + k) 안에 변형의 bigram이 needed개 미만이면 편집 거리 계산 생략
+            hits = sorted(i for bigram in self._bigram_sets[compact] for i in text_bigrams.get(bigram, ()))
+            span = len(jamo) + max_distance - 1
+            for start in word_starts:
+                if len(text) - start < len(jamo) - max_distance:
+                    break
+                if needed > 0 and bisect_left(hits, start + span) - bisect_left(hits, start) < needed:
+                    continue
+                found = bounded_window_distance(jamo, text, start, max_distance, end_costs)
+                if found is None:
+                    continue
+                distance, end = found
+                similarity = 1.0 - distance / len(jamo)
+                if best is None or similarity > best[0]:
+                    best = (similarity, compact, distance, start, end)
+                    # 같은 변형의 뒤쪽 창은 더 가까울 때만 의미 있음
+                    max_distance = distance - 1
+                    needed = len(jamo) - 1 - 2 * max_distance
+                    if max_distance < 0:
+                        break
+        return best
+
+    def match(self, transcript, stt_confidence=None, word_confidences=None, confidence_threshold=0.7):
+        """호출어 매칭 - 점수가 confidence_threshold 이상이면 is_wakeword"""
+        words, text, owners, word_starts, end_costs = self._prepare(transcript)
+        if not text:
+            return WakewordMatch()
+
+        best = self._exact_match(text, word_starts, end_costs)  # (유사도, 변형, 거리, 시작, 끝)
+        if best is None:
+            best = self._fuzzy_match(text, word_starts, end_costs)
+        if best is None:
+            return WakewordMatch()
+
+        similarity, variant, distance, start, end = best
+        matched_words = sorted(set(owners[start:end]))
+        confidence = self._stt_confidence(words, matched_words, stt_confidence, word_confidences)
+        score = similarity
+        if confidence is not None:
+            score *= 1.0 - self.stt_weight * (1.0 - confidence)
+        return WakewordMatch(
+            is_wakeword=score >= confidence_threshold,
+            score=score,
+            similarity=similarity,
+            stt_confidence=confidence,
+            variant=variant,
+            distance=distance,
+            matched_text=' '.join(words[i] for i in matched_words),
+        )
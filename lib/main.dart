@@ -1317,17 +1317,14 @@ class VoiceAssistantProvider extends ChangeNotifier {
       }
 
       final audioBytes = await file.readAsBytes();
-      final base64Audio = base64Encode(audioBytes);
 
       final response = await http
           .post(
-            Uri.parse('http://192.168.0.171:8003/speech-to-text'),
-            headers: {'Content-Type': 'application/json'},
-            body: jsonEncode({
-              'audio_data': base64Audio,
-              'audio_format': 'm4a',
-              'check_wakeword': true,
-            }),
+            // 로컬 호출어 감지기 - 통과한 클립만 서버에서 STT로 재확인
+            // base64 없이 바이너리로 바로 전송
+            Uri.parse('http://192.168.0.171:8000/wakeword?format=m4a'),
+            headers: {'Content-Type': 'application/octet-stream'},
+            body: audioBytes,
           )
           .timeout(const Duration(seconds: 10));
 
@@ -1715,14 +1712,12 @@ class VoiceAssistantProvider extends ChangeNotifier {
       // 오디오 파일 읽기
       final file = File(filePath);
       final bytes = await file.readAsBytes();
-      final base64Audio = base64Encode(bytes);
 
       // 디버깅: 파일 정보 출력
       print('🔍 [DEBUG] 오디오 파일 정보:');
       print('   📁 파일 경로: $filePath');
       print('   📏 파일 크기: ${bytes.length} bytes');
       print('   📄 파일 확장자: ${filePath.split('.').last.toLowerCase()}');
-      print('   🔢 Base64 길이: ${base64Audio.length}');
 
       // 파일 확장자로 실제 형식 판단
       final fileExtension = filePath.split('.').last.toLowerCase();
@@ -1732,16 +1727,14 @@ class VoiceAssistantProvider extends ChangeNotifier {
       print('   🌐 서버 URL: http://192.168.0.171:8000/speech-to-text');
       print('   📊 오디오 형식: $audioFormat');
 
-      // 1단계: 음성 인식 (Speech-to-Text)
+      // 1단계: 음성 인식 (Speech-to-Text) - base64 없이 바이너리로 전송
       final sttResponse = await http
           .post(
-            Uri.parse('http://192.168.0.171:8000/speech-to-text'),
-            headers: {'Content-Type': 'application/json'},
-            body: jsonEncode({
-              'audio_data': base64Audio,
-              'audio_format': audioFormat,
-              'check_wakeword': false, // 명시적으로 추가
-            }),
+            Uri.parse(
+              'http://192.168.0.171:8000/speech-to-text?format=$audioFormat&check_wakeword=false',
+            ),
+            headers: {'Content-Type': 'application/octet-stream'},
+            body: bytes,
           )
           .timeout(const Duration(seconds: 30));
 
@@ -1762,12 +1755,16 @@ class VoiceAssistantProvider extends ChangeNotifier {
           print('🤖 [DEBUG] AI 명령 분석 시작...');
           print('   📝 분석할 명령: "$transcript"');
 
-          // 2단계: Gemini AI 명령 분석
+          // 2단계: Gemini AI 명령 분석 (현재 화면 스냅샷을 같이 보내 터치 대상을 실제 좌표로 찾음)
+          final screen = await _getScreenSnapshot();
           final aiResponse = await http
               .post(
                 Uri.parse('http://192.168.0.171:8000/analyze-command'),
                 headers: {'Content-Type': 'application/json'},
-                body: jsonEncode({'command': transcript}),
+                body: jsonEncode({
+                  'command': transcript,
+                  if (screen != null) 'screen': screen,
+                }),
               )
               .timeout(const Duration(seconds: 30));
 
@@ -1884,6 +1881,17 @@ class VoiceAssistantProvider extends ChangeNotifier {
     // 실제 구현에서는 네이티브 코드와 통신
   }
 
+  // 현재 화면의 접근성 트리 스냅샷 (접근성 서비스가 꺼져 있으면 null)
+  Future<Map<String, dynamic>?> _getScreenSnapshot() async {
+    try {
+      final String? snapshot = await platform.invokeMethod('getScreenSnapshot');
+      return snapshot == null ? null : jsonDecode(snapshot);
+    } catch (e) {
+      print('⚠️ 화면 스냅샷 수집 실패: $e');
+      return null;
+    }
+  }
+
   // 접근성 서비스 상태 확인
   Future<bool> checkAccessibilityServiceStatus() async {
     try {
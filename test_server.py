@@ -7,19 +7,40 @@ Google Cloud Speech-to-Text와 OpenAI GPT를 활용한 음성 인식 및 명령
 """
 
 import os
+import copy
+import hashlib
+import hmac
 import json
 import base64
-import tempfile
-import subprocess
-from flask import Flask, request, jsonify
+import logging
+import time
+
+STARTUP_STARTED = time.perf_counter()  # 시작 시간 측정 기준
+
+from flask import Flask, Response, g, has_request_context, request, jsonify
 from flask_cors import CORS
-import google.generativeai as genai
-from google.cloud import speech
-from google.oauth2 import service_account
-import pyttsx3
-import io
-import wave
-import numpy as np
+
+from backend.audio_convert import DEFAULT_FILTER_CHAIN, AudioConverter, ConversionBusy, ConversionError
+from backend.command_cache import CommandCache, normalize_command_key
+from backend.corrections import DEFAULT_RULES_DIR, CorrectionEngine, KeywordMatcher
+from backend.intent_rules import SCROLL_DOWN_KEYWORDS, SCROLL_KEYWORDS, SCROLL_UP_KEYWORDS, classify_command
+from backend.llm_client import GeminiClient, LLMError
+from backend.metrics import MetricsRegistry
+from backend.prompting import (
+    GENERATION_CONFIG, PROMPT_VERSION, SYSTEM_INSTRUCTION, build_command_prompt, extract_command_json
+)
+from backend.screen_index import ScreenContextRegistry, ScreenSnapshotError
+from backend.services import ServiceContainer, ServiceUnavailable
+from backend.singleflight import SingleFlight
+from backend.speculation import SpeculativeAnalyzer
+from backend.storage import SharedValue, open_store
+from backend.stt_backends import (
+    GoogleCloudSTTBackend, HTTPSTTBackend, STTRouter, STTUnavailable, StubSTTBackend, VoskSTTBackend
+)
+from backend.timing import StageTimer
+from backend.tts_stream import STREAM_FORMATS, CompressedTTSStream, encode_audio, split_sentences
+from backend.tts_worker import StubTTSEngine, TTSWorker
+from backend.wakeword_match import WakewordMatcher
 
 # .env 파일 로드 (보안상 권장)
 try:
@@ -31,9 +52,25 @@ except ImportError:
 except Exception as e:
     print(f"⚠️ .env 파일 로드 실패: {e}")
 
+# 로그 레벨 (요청 처리 경로의 상세 로그는 DEBUG)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('voice_assistant')
+
+# 단계별 지연 시간 / 엔드포인트별 요청·오류 집계 (/metrics)
+metrics = MetricsRegistry()
+
 app = Flask(__name__)
 CORS(app)
 
+# WebSocket 지원 (flask-sock 선택 설치)
+try:
+    from flask_sock import Sock
+    sock = Sock(app)
+except ImportError:
+    print("⚠️ flask-sock이 설치되지 않아 스트리밍 음성 인식(/stream/speech-to-text)을 사용할 수 없습니다.")
+    sock = None
+
 # 환경 변수 설정
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
 GOOGLE_CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH', 'backend/teak-mix-466716-h0-3fc9e37b08ce.json')
@@ -47,43 +84,218 @@ if GEMINI_API_KEY == 'your-gemini-api-key':
 else:
     pass  # Gemini API Key 설정됨
 
-# Gemini 클라이언트 설정
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    pass  # Gemini 클라이언트 초기화 성공
-except Exception as e:
-    print(f"❌ Gemini 클라이언트 초기화 실패: {e}")
+# 서비스 컨테이너 - Google STT 클라이언트, TTS 엔진, ffmpeg 워커, 호출어 템플릿 등 무거운 초기화는
+# import 시점이 아니라 처음 사용할 때 하거나, 서버가 뜬 뒤 백그라운드에서 미리 해 둠 (SERVICE_WARMUP)
+SERVICE_WARMUP = os.getenv('SERVICE_WARMUP', 'background')  # background | lazy
+READINESS_REMOTE_CHECKS = os.getenv('READINESS_REMOTE_CHECKS', 'false').lower() == 'true'
+services = ServiceContainer(
+    started_at=STARTUP_STARTED,
+    lazy=SERVICE_WARMUP == 'lazy',
+    retry_interval=float(os.getenv('SERVICE_RETRY_INTERVAL', '30')),
+    check_interval=float(os.getenv('READINESS_CHECK_INTERVAL', '10')),
+)
 
-# Google Cloud Speech-to-Text 클라이언트 설정
-try:
-    # 환경 변수 직접 설정
-    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = GOOGLE_CREDENTIALS_PATH
-    pass  # Google Cloud 인증 파일 경로 확인
-    
-    credentials = service_account.Credentials.from_service_account_file(
-        GOOGLE_CREDENTIALS_PATH
+# 캐시 / 공유 설정 저장소 - memory://(프로세스별) 또는 redis://host:port/db (워커/노드 간 공유)
+CACHE_STORE_URL = os.getenv('CACHE_STORE_URL', 'memory://')
+# prefork 워커 수 (1이면 단일 프로세스) - run_server 참고
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '1'))
+
+# Gemini 클라이언트 (keep-alive 연결 풀, 객체 생성은 가벼움)
+gemini_client = GeminiClient(
+    api_key=GEMINI_API_KEY,
+    model=os.getenv('GEMINI_MODEL', 'gemini-1.5-pro'),
+    base_url=os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com'),
+    timeout=float(os.getenv('GEMINI_TIMEOUT', '15')),
+    max_concurrent=int(os.getenv('GEMINI_MAX_CONCURRENT', '8')),
+    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '2')),
+)
+
+# 동시 요청 합치기 - 같은 입력(정규화된 명령 / 같은 오디오 / 같은 문장)의 Gemini·STT·TTS 작업이 진행 중이면
+# 새로 호출하지 않고 그 결과를 함께 받음 (프로세스 단위, 합쳐진 수는 /metrics의 coalesced_calls_total)
+REQUEST_COALESCING = os.getenv('REQUEST_COALESCING', 'true').lower() == 'true'
+llm_flight = SingleFlight('llm', metrics, REQUEST_COALESCING, share=copy.deepcopy)
+stt_flight = SingleFlight('stt', metrics, REQUEST_COALESCING)
+tts_flight = SingleFlight('tts', metrics, REQUEST_COALESCING)
+
+def is_gemini_configured():
+    return bool(GEMINI_API_KEY) and GEMINI_API_KEY not in ('your-gemini-api-key', 'dummy-key-for-testing')
+
+def prepare_gemini():
+    """API Key 확인 (+ READINESS_REMOTE_CHECKS면 모델 조회로 키/연결 확인 겸 연결 풀 예열)"""
+    if not is_gemini_configured():
+        raise RuntimeError('Gemini API Key가 설정되지 않았습니다.')
+    if READINESS_REMOTE_CHECKS:
+        gemini_client.ping()
+    return gemini_client
+
+def check_gemini(client):
+    return client.ping() if READINESS_REMOTE_CHECKS else True
+
+# Google Cloud Speech-to-Text (google-cloud-speech import + 인증 파일 로드는 처음 사용할 때)
+os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = GOOGLE_CREDENTIALS_PATH
+
+def load_google_credentials():
+    """서비스 계정 인증 정보"""
+    from google.oauth2 import service_account
+    if not os.path.exists(GOOGLE_CREDENTIALS_PATH):
+        raise FileNotFoundError(f'인증 파일 없음: {GOOGLE_CREDENTIALS_PATH}')
+    return service_account.Credentials.from_service_account_file(GOOGLE_CREDENTIALS_PATH)
+
+def create_speech_client():
+    from google.cloud import speech
+    return speech.SpeechClient(credentials=services.google_credentials)
+
+def check_google_credentials(credentials):
+    """READINESS_REMOTE_CHECKS면 토큰 발급으로 인증 정보 확인"""
+    if READINESS_REMOTE_CHECKS:
+        from google.auth.transport.requests import Request
+        credentials.refresh(Request())
+    return True
+
+# TTS 워커 (엔진 접근 직렬화 + 합성 음성 캐시) - 엔진 초기화는 워밍업 / 첫 사용 때
+# TTS_ENGINE=stub 이면 pyttsx3 없이 글자 수에 비례해 지연/길이가 정해지는 합성음 (벤치마크용)
+WAKEWORD_FEEDBACK_TEXT = "호출어 인식되었습니다. 명령어를 말해주세요."
+tts_worker = TTSWorker(
+    rate=150,
+    volume=0.8,
+    cache_max_bytes=int(os.getenv('TTS_CACHE_MAX_MB', '32')) * 1024 * 1024,
+    engine_factory=(lambda: StubTTSEngine(float(os.getenv('TTS_STUB_SECONDS_PER_CHAR', '0.01'))))
+    if os.getenv('TTS_ENGINE', 'pyttsx3') == 'stub' else None,
+    store=open_store(CACHE_STORE_URL, 'tts', max_bytes=int(os.getenv('TTS_CACHE_MAX_MB', '32')) * 1024 * 1024),
+    flight=tts_flight,
+)
+
+# 압축 TTS 스트림 (format=opus|mp3) - 문장 단위 합성 + ffmpeg 인코딩 청크 전송
+TTS_STREAM_BITRATE = os.getenv('TTS_STREAM_BITRATE') or None  # 비우면 형식별 기본값 (opus 24k, mp3 32k)
+TTS_SENTENCE_MAX_CHARS = int(os.getenv('TTS_SENTENCE_MAX_CHARS', '120'))
+
+def start_tts_worker():
+    if not tts_worker.start():
+        raise RuntimeError('TTS 엔진 초기화 실패')
+    # 고정 문구는 시작 시 미리 합성
+    tts_worker.precompute([WAKEWORD_FEEDBACK_TEXT])
+    return tts_worker
+
+# 오디오 전처리 - numpy: ffmpeg는 디코딩만, 대역 통과/AGC/compand는 프로세스 안에서 (클라이언트별 프로필)
+#                ffmpeg: 기존 ffmpeg 필터 체인
+AUDIO_PREPROCESS = os.getenv('AUDIO_PREPROCESS', 'numpy')
+
+# 오디오 변환기 (ffmpeg 워커 풀)
+audio_converter = AudioConverter(
+    pool_size=int(os.getenv('FFMPEG_POOL_SIZE', '2')),
+    max_concurrent=int(os.getenv('FFMPEG_MAX_CONCURRENT', '4')),
+    timeout=float(os.getenv('FFMPEG_TIMEOUT', '10')),
+    filter_chain='' if AUDIO_PREPROCESS == 'numpy' else DEFAULT_FILTER_CHAIN,
+)
+
+def start_audio_converter():
+    audio_converter.start()
+    audio_converter.self_test()
+    return audio_converter
+
+def create_audio_preprocessor():
+    """전처리기 + 프로필 (AUDIO_PROFILES_PATH JSON으로 추가/수정, NumPy는 여기서 처음 import)"""
+    from backend.audio_preprocess import AudioPreprocessor, load_profiles
+    return AudioPreprocessor(
+        profiles=load_profiles(os.getenv('AUDIO_PROFILES_PATH') or None),
+        default_profile=os.getenv('AUDIO_PROFILE', 'default'),
     )
-    speech_client = speech.SpeechClient(credentials=credentials)
-    pass  # Google Cloud Speech-to-Text 클라이언트 초기화 성공
-except Exception as e:
-    print(f"❌ Google Cloud Speech-to-Text 클라이언트 초기화 실패: {e}")
-    print(f"🔍 인증 파일 존재 여부 확인 중...")
-    import pathlib
-    if pathlib.Path(GOOGLE_CREDENTIALS_PATH).exists():
-        print(f"✅ 인증 파일 존재: {GOOGLE_CREDENTIALS_PATH}")
-    else:
-        print(f"❌ 인증 파일 없음: {GOOGLE_CREDENTIALS_PATH}")
-    speech_client = None
 
-# TTS 엔진 초기화
-try:
-    tts_engine = pyttsx3.init()
-    tts_engine.setProperty('rate', 150)
-    tts_engine.setProperty('volume', 0.8)
-    pass  # TTS 엔진 초기화 성공
-except Exception as e:
-    print(f"❌ TTS 엔진 초기화 실패: {e}")
-    tts_engine = None
+# 명령 분석 결과 캐시 (LRU + TTL, 선택적 파일 저장)
+command_cache = CommandCache(
+    max_size=int(os.getenv('COMMAND_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('COMMAND_CACHE_TTL', '3600')),
+    path=os.getenv('COMMAND_CACHE_PATH') or None,
+    version=PROMPT_VERSION,
+    store=open_store(CACHE_STORE_URL, 'command', max_entries=int(os.getenv('COMMAND_CACHE_SIZE', '512'))),
+)
+
+# 화면 문맥 (접근성 트리 스냅샷 색인) - 기기별 최신 스냅샷은 저장소에 SCREEN_CONTEXT_TTL초 보관
+SCREEN_CONTEXT_TTL = float(os.getenv('SCREEN_CONTEXT_TTL', '30'))
+SCREEN_PROMPT_CANDIDATES = int(os.getenv('SCREEN_PROMPT_CANDIDATES', '8'))
+screen_contexts = ScreenContextRegistry(
+    store=open_store(CACHE_STORE_URL, 'screen', max_entries=1024),
+    ttl=SCREEN_CONTEXT_TTL,
+)
+
+# interim 기반 추측 명령 분석 (스트리밍 인식 analyze=true) - 최종 문장이 같으면 미리 분석한 결과를 바로 사용
+# Gemini 호출은 interim 안정도가 SPECULATION_LLM_STABILITY 이상이거나 발화 끝이 감지된 뒤에만 (세션당 최대 횟수 제한)
+speculative_analyzer = SpeculativeAnalyzer(
+    analyze=lambda command, allow_llm, screen: analyze_streamed_command(command, allow_llm, screen),
+    key=normalize_command_key,
+    prepare=lambda transcript: post_process_transcript(transcript),
+    metrics=metrics,
+    workers=int(os.getenv('SPECULATION_WORKERS', '2')),
+    llm_stability=float(os.getenv('SPECULATION_LLM_STABILITY', '0.8')),
+    max_llm_attempts=int(os.getenv('SPECULATION_MAX_LLM_ATTEMPTS', '2')),
+    enabled=os.getenv('SPECULATIVE_ANALYSIS', 'true').lower() == 'true',
+)
+
+def restore_command_cache():
+    if command_cache.load():
+        print(f"💾 명령 캐시 {command_cache.stats()['size']}개 복원")
+    command_cache.enable_persistence()
+    return command_cache
+
+def create_vad():
+    """음성 구간 검출기 (STT 전 무음 제거, NumPy는 여기서 처음 import)"""
+    from backend.vad import EnergyVad
+    return EnergyVad(
+        margin_db=float(os.getenv('VAD_MARGIN_DB', '10')),
+        padding_ms=int(os.getenv('VAD_PADDING_MS', '200')),
+    )
+
+WAKEWORD_VERIFY_WITH_STT = os.getenv('WAKEWORD_VERIFY_WITH_STT', 'true').lower() == 'true'
+# 호출어 템플릿 등록 토큰 - 비어 있으면 /wakeword/enroll 비활성화 (등록은 X-Enroll-Token 헤더 필요)
+WAKEWORD_ENROLL_TOKEN = os.getenv('WAKEWORD_ENROLL_TOKEN', '')
+
+def create_wakeword_detector():
+    """로컬 호출어 감지기 (MFCC 템플릿 매칭) - 템플릿이 없어도 STT 확인으로 동작"""
+    from backend.wakeword_detector import WakewordDetector
+    detector = WakewordDetector(
+        template_dir=os.getenv('WAKEWORD_TEMPLATE_DIR', 'backend/wakeword_templates'),
+        threshold=float(os.getenv('WAKEWORD_THRESHOLD', '0.35')),
+        check_interval=float(os.getenv('WAKEWORD_TEMPLATE_REFRESH', '5')),
+    )
+    try:
+        print(f"🔔 호출어 템플릿 {detector.load_templates()}개 로드")
+    except Exception as e:
+        print(f"❌ 호출어 템플릿 로드 실패: {e}")
+    return detector
+
+# 지문 기반 인식 결과 캐시 - 재전송/반복 클립은 STT 호출 없이 저장된 결과 반환
+TRANSCRIPT_CACHE_ENABLED = os.getenv('TRANSCRIPT_CACHE', 'true').lower() == 'true'
+
+def create_transcript_cache():
+    """정확 해시 + 스펙트럼 지문 캐시 (NumPy는 여기서 처음 import)"""
+    from backend.fingerprint import TranscriptCache
+    max_entries = int(os.getenv('TRANSCRIPT_CACHE_SIZE', '256'))
+    return TranscriptCache(
+        store=open_store(CACHE_STORE_URL, 'stt', max_entries=max_entries),
+        max_entries=max_entries,
+        ttl=float(os.getenv('TRANSCRIPT_CACHE_TTL', '600')),
+        max_bit_error=float(os.getenv('TRANSCRIPT_CACHE_MAX_BER', '0.2')),
+    )
+
+# 워밍업 순서 = 등록 순서 (요청 경로에 먼저 필요한 것부터)
+services.register('audio_converter', start_audio_converter,
+                  check=lambda converter: converter.self_test())
+if AUDIO_PREPROCESS == 'numpy':
+    services.register('audio_preprocessor', create_audio_preprocessor, fork_safe=True)
+services.register('cache_store', lambda: command_cache.store, check=lambda store: store.ping(), required=False)
+services.register('vad', create_vad, fork_safe=True)
+services.register('google_credentials', load_google_credentials, check=check_google_credentials,
+                  required=os.getenv('STT_CLOUD_BACKEND', 'google') == 'google')
+services.register('speech_client', create_speech_client,
+                  required=os.getenv('STT_CLOUD_BACKEND', 'google') == 'google')
+# API Key가 없으면 규칙 경로 + 기본 응답으로 동작하므로 준비 상태를 막지 않음
+services.register('gemini', prepare_gemini, check=check_gemini, required=is_gemini_configured())
+services.register('command_cache', restore_command_cache, required=False)
+services.register('wakeword_detector', create_wakeword_detector, required=False, fork_safe=True)
+if TRANSCRIPT_CACHE_ENABLED:
+    services.register('transcript_cache', create_transcript_cache, required=False, fork_safe=True)
+services.register('tts', start_tts_worker, check=lambda worker: worker.is_running or '워커 중지됨',
+                  required=False)
 
 # 호출어 설정 - 다양한 변형 추가
 WAKE_WORDS = [
@@ -95,102 +307,100 @@ WAKE_WORDS = [
     '어시스턴트', '어시스턴트야', '어시스턴트씨'
 ]
 
-# 호출어 인식 함수 추가
-def is_wakeword_detected(transcript, confidence_threshold=0.7):
-    """호출어 인식 확인"""
-    # 호출어 인식 함수 시작
-    
-    if not transcript:
-        return False
-    
-    transcript_lower = transcript.lower().strip()
-    # 소문자 변환
-    
-    # 정확한 매칭 확인
-    for i, wake_word in enumerate(WAKE_WORDS):
-        wake_word_lower = wake_word.lower()
-        is_match = wake_word_lower in transcript_lower
-        if is_match:
-            return True
-    
-    # 부분 매칭 확인 (유사도 기반)
-    for i, wake_word in enumerate(WAKE_WORDS):
-        wake_word_lower = wake_word.lower()
-        similarity = _calculate_similarity(transcript_lower, wake_word_lower)
-        is_similar = similarity > 0.8
-        
-        if is_similar:
-            return True
-    
-    return False
+# STT 백엔드 (클라우드 / 로컬 CPU 모델 / 스텁) + 요청별 라우팅과 장애 조치
+google_stt = GoogleCloudSTTBackend(
+    client_factory=lambda: services.speech_client,
+    phrases=WAKE_WORDS + [
+        '네이버', '유튜브', '구글', '페이스북', '로그인', '검색',
+        '클릭', '버튼', '열어줘', '실행해줘', '보여줘', '네이버', '네이버',
+        '로그인', '로그인', '검색', '검색', '스크롤', '스크롤'
+    ],
+    boost=25,  # 더 높은 가중치
+    timeout=float(os.getenv('STT_TIMEOUT', '15')),
+)
+stt_backends = [google_stt]
+if os.getenv('STT_VOSK_MODEL_PATH'):
+    stt_backends.append(VoskSTTBackend(os.getenv('STT_VOSK_MODEL_PATH')))
+if os.getenv('STT_HTTP_URL'):
+    stt_backends.append(HTTPSTTBackend(os.getenv('STT_HTTP_URL'), timeout=float(os.getenv('STT_TIMEOUT', '15'))))
+if os.getenv('STT_STUB_TRANSCRIPT'):
+    stt_backends.append(StubSTTBackend(
+        os.getenv('STT_STUB_TRANSCRIPT'),
+        latency=float(os.getenv('STT_STUB_LATENCY', '0')),
+    ))
+stt_router = STTRouter(
+    stt_backends,
+    cloud=os.getenv('STT_CLOUD_BACKEND', 'google'),
+    local=os.getenv('STT_LOCAL_BACKEND') or None,
+    short_clip_seconds=float(os.getenv('STT_SHORT_CLIP_SECONDS', '2.5')),
+    failover=os.getenv('STT_FAILOVER', 'true').lower() == 'true',
+)
 
-def _calculate_similarity(text1, text2):
-    """텍스트 유사도 계산 (간단한 구현)"""
-    if not text1 or not text2:
-        return 0.0
-    
-    # 공통 문자 수 계산
-    common_chars = sum(1 for c in text1 if c in text2)
-    total_chars = max(len(text1), len(text2))
-    
-    similarity = common_chars / total_chars if total_chars > 0 else 0.0
-    return similarity
+# 호출어 목록 - 저장소의 'wake_words' 값(JSON 목록)이 있으면 그것을 사용 (모든 워커/노드 공통)
+wake_words_config = SharedValue(
+    open_store(CACHE_STORE_URL, 'config'),
+    'wake_words',
+    WAKE_WORDS,
+    refresh_interval=float(os.getenv('SHARED_CONFIG_REFRESH', '5')),
+)
 
-import re
+# 호출어 텍스트 매처 (중복 제거된 변형 인덱스 + 자모 단위 편집 거리) - 호출어 목록이 바뀌면 다시 만듦
+WAKEWORD_MAX_ERROR_RATIO = float(os.getenv('WAKEWORD_MAX_ERROR_RATIO', '0.2'))
+wakeword_matcher = WakewordMatcher(WAKE_WORDS, max_error_ratio=WAKEWORD_MAX_ERROR_RATIO)
+WAKEWORD_CONFIDENCE_THRESHOLD = float(os.getenv('WAKEWORD_CONFIDENCE_THRESHOLD', '0.7'))
 
-def post_process_transcript(transcript):
-    """음성 인식 결과 텍스트 후처리"""
-    if not transcript:
-        return transcript
-
-    # 오류 보정 딕셔너리 (단어 기준)
-    corrections = {
-        r'\b스크\.?\b': '스크롤',     # '스크.', '스크' → 스크롤
-        r'\b스크롤\.?\b': '스크롤',
-        r'\b내\.?\b': '내려',        # '내.', '내' → 내려
-        r'\b올\.?\b': '올려',        # '올.', '올' → 올려
-        r'\b내려\.?\b': '내려',
-        r'\b올려\.?\b': '올려',
-        r'\b열어줘\b': '열어줘',
-        r'\b실행해줘\b': '실행해줘',
-        r'\b보여줘\b': '보여줘',
-        r'\b클릭\b': '클릭',
-        r'\b버튼\b': '버튼',
-        r'\b검색\b': '검색',
-        r'\b로그인\b': '로그인',
-        r'\b네이버\b': '네이버',
-    }
+def current_wakeword_matcher():
+    global wakeword_matcher
+    wake_words = wake_words_config.get()
+    if wake_words != wakeword_matcher.wake_words:
+        wakeword_matcher = WakewordMatcher(wake_words, max_error_ratio=WAKEWORD_MAX_ERROR_RATIO)
+    return wakeword_matcher
 
-    corrected = transcript
+def match_wakeword(transcript, stt_confidence=None, word_confidences=None,
+                   confidence_threshold=WAKEWORD_CONFIDENCE_THRESHOLD):
+    """호출어 매칭 결과 (점수 = 텍스트 유사도 × STT 신뢰도 반영)"""
+    return current_wakeword_matcher().match(transcript, stt_confidence, word_confidences, confidence_threshold)
 
-    for wrong_pattern, correct in corrections.items():
-        if re.search(wrong_pattern, corrected):
-            corrected = re.sub(wrong_pattern, correct, corrected)
+def is_wakeword_detected(transcript, stt_confidence=None, word_confidences=None,
+                         confidence_threshold=WAKEWORD_CONFIDENCE_THRESHOLD):
+    """호출어 인식 확인"""
+    return match_wakeword(transcript, stt_confidence, word_confidences, confidence_threshold).is_wakeword
 
-    # 불필요한 마침표 제거 (전체 문장 끝에 있는 경우)
-    corrected = re.sub(r'\.$', '', corrected)
+import re
+
+# 음성 인식 결과 보정 엔진 (backend/rules/corrections_<언어>.json, 변경 시 자동 재로드)
+correction_engine = CorrectionEngine(
+    rules_dir=os.getenv('CORRECTION_RULES_DIR', DEFAULT_RULES_DIR),
+)
+scroll_keyword_matcher = KeywordMatcher({
+    'scroll': SCROLL_KEYWORDS,
+    'up': SCROLL_UP_KEYWORDS,
+    'down': SCROLL_DOWN_KEYWORDS,
+})
 
-    return corrected
+def post_process_transcript(transcript, language='ko'):
+    """음성 인식 결과 텍스트 후처리 (규칙 파일 기반 단일 패스 보정)"""
+    with metrics.timed('post_process'):
+        return correction_engine.apply(transcript, language)
 
 def postprocess_ai_response(response_json, original_command):
     """AI 응답 검증 및 보정"""
-    scroll_keywords = ['내려', '올려', '스크롤', '내려줘', '올려줘', '아래', '위', '위로', '아래로', '화면 내려', '화면 올려']
-    
     action = response_json.get('action', '')
     target = response_json.get('target', '')
     
     # AI 응답 검증
-    print(f"🔍 AI 응답 검증: action='{action}', target='{target}', command='{original_command}'")
+    logger.debug("🔍 AI 응답 검증: action='%s', target='%s', command='%s'", action, target, original_command)
     
     # 스크롤 키워드가 있는데 touch 액션인 경우 강제 변환
-    if action == 'touch' and any(word in original_command for word in scroll_keywords):
-        print(f"⚠️ 스크롤 명령이 touch로 분석됨! 강제 변환 시작...")
+    keywords = scroll_keyword_matcher.find(original_command) if action == 'touch' else set()
+    if 'scroll' in keywords:
+        logger.debug("⚠️ 스크롤 명령이 touch로 분석됨! 강제 변환 시작...")
         
         # 방향 결정
         direction = 'down'
-        if any(word in original_command for word in ['올려', '올려줘', '위', '위로']):
+        if 'up' in keywords:
             direction = 'up'
-        elif any(word in original_command for word in ['내려', '내려줘', '아래', '아래로']):
+        elif 'down' in keywords:
             direction = 'down'
         
         # 강제 scroll 변환
@@ -198,195 +408,756 @@ def postprocess_ai_response(response_json, original_command):
         response_json['direction'] = direction
         response_json['target'] = original_command
         
-        print(f"✅ 강제 변환 완료: touch → scroll ({direction})")
+        logger.debug("✅ 강제 변환 완료: touch → scroll (%s)", direction)
     
     return response_json
 
-def convert_audio_to_wav(audio_data, input_format='m4a'):
-    """오디오를 WAV 형식으로 변환"""
+def audio_preprocess_hook(profile=None):
+    """변환기에 넘길 전처리 함수 (AUDIO_PREPROCESS=ffmpeg면 None - 필터 체인 사용)"""
+    if AUDIO_PREPROCESS != 'numpy':
+        return None
+    
+    def preprocess(pcm_bytes, sample_rate, channels):
+        preprocessor = services.audio_preprocessor
+        with metrics.timed('preprocess'):
+            return preprocessor.process(pcm_bytes, sample_rate, channels, profile)
+    return preprocess
+
+def request_audio_profile(options):
+    """요청의 전처리 프로필 이름 (audio_profile 옵션 → X-Audio-Profile 헤더, 없으면 None = 기본 프로필)"""
+    return options.get('audio_profile') or request.headers.get('X-Audio-Profile')
+
+def convert_audio_to_wav(audio_data, input_format='m4a', profile=None):
+    """오디오를 WAV 형식으로 변환 (ffmpeg 파이프 + 워커 풀, 프로세스 안 전처리)
+    변환 실패는 None, 동시 변환 슬롯이 모두 사용 중이면 ConversionBusy를 그대로 올림 (503 응답용)"""
     try:
-        # 오디오 변환 시작
-        
-        # 임시 입력 파일 생성
-        with tempfile.NamedTemporaryFile(suffix=f'.{input_format}', delete=False) as temp_input:
-            temp_input.write(audio_data)
-            temp_input_path = temp_input.name
-        
-        # 임시 출력 파일 경로
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_output:
-            temp_output_path = temp_output.name
-        
-        # ffmpeg 명령 실행 (노이즈 제거 및 볼륨 증폭 강화)
-        cmd = [
-            'ffmpeg', '-i', temp_input_path,
-            '-af', 'highpass=f=200,lowpass=f=3000,volume=3.0,compand=0.3|0.3:1|1:-90/-60/-40/-30/-20/-10/0:6:0:-90:0.2',  # 강한 볼륨 증폭 + 다이나믹 레인지 압축
-            '-ar', '16000',  # 샘플링 레이트 16kHz
-            '-ac', '1',      # 모노 채널
-            '-acodec', 'pcm_s16le',  # LINEAR16 인코딩
-            '-y', temp_output_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            return None
-        
-        # 변환된 WAV 파일 읽기
-        with open(temp_output_path, 'rb') as wav_file:
-            wav_content = wav_file.read()
-        
-        # 임시 파일들 삭제
-        try:
-            os.unlink(temp_input_path)
-            os.unlink(temp_output_path)
-        except Exception as e:
-            pass
-        
-        return wav_content
-        
+        with metrics.timed('convert'):
+            return audio_converter.convert(audio_data, input_format, preprocess=audio_preprocess_hook(profile))
+    except (ServiceUnavailable, ConversionBusy):
+        raise
+    except ConversionError as e:
+        logger.error("❌ 오디오 변환 실패: %s", e)
+        return None
     except Exception as e:
+        logger.error("❌ 오디오 변환 중 오류: %s", e)
         return None
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """서버 상태 확인"""
-    return jsonify({
-        'status': 'healthy',
+def conversion_retry_after():
+    """변환 혼잡 시 Retry-After 초 (변환 슬롯 대기 시간 기준)"""
+    return max(1, round(audio_converter.queue_timeout))
+
+def conversion_busy_response(e):
+    """동시 변환 한도 초과 → 503 + Retry-After (변환 실패 500과 구분)"""
+    logger.warning("🚦 오디오 변환 혼잡: %s", e)
+    metrics.record_error(current_endpoint(), 'convert_busy')
+    response = jsonify({'error': '오디오 변환 요청이 많습니다. 잠시 후 다시 시도하세요.', 'stage': 'convert'})
+    response.headers['Retry-After'] = str(conversion_retry_after())
+    return response, 503
+
+def build_recognition_config(encoding=None, sample_rate_hertz=None):
+    """Google Cloud Speech-to-Text 인식 설정 (WAV는 sample_rate_hertz 자동 감지)"""
+    return google_stt.recognition_config(encoding, sample_rate_hertz)
+
+def lookup_transcript(wav_content, purpose='command', preferred=None):
+    """(지문, 캐시된 결과 또는 None) - 캐시를 쓰지 않으면 (None, None)"""
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None, None
+    try:
+        cache = services.transcript_cache
+    except ServiceUnavailable:
+        return None, None
+    with metrics.timed('fingerprint'):
+        fingerprint = cache.fingerprint(wav_content)
+        cached = cache.lookup(fingerprint, f'{purpose}:{preferred or ""}')
+    if cached is not None:
+        logger.debug("♻️ 인식 결과 캐시 적중 (%s): '%s'", cached['match'], cached['transcript'])
+    return fingerprint, cached
+
+def store_transcript(fingerprint, purpose, preferred, transcript, confidence, words):
+    """STT 결과를 지문 캐시에 저장 (결과 없음도 저장해 같은 잡음 클립 재전송을 막음)"""
+    if fingerprint is not None:
+        services.transcript_cache.put(fingerprint, f'{purpose}:{preferred or ""}', transcript, confidence, words)
+
+def stt_flight_key(wav_content, purpose, preferred):
+    """같은 오디오 + 같은 인식 목적/백엔드 요청을 묶는 키"""
+    return f'{purpose}:{preferred or ""}:{hashlib.blake2b(wav_content, digest_size=16).hexdigest()}'
+
+def recognize_speech(wav_content, purpose='command', preferred=None):
+    """WAV 오디오를 STT 라우터로 인식하여 (원본 텍스트, 신뢰도, 단어별 신뢰도) 반환, 결과 없으면 (None, 0.0, [])
+    같은 오디오 인식이 진행 중이면 그 결과를 기다림"""
+    return stt_flight.do(stt_flight_key(wav_content, purpose, preferred),
+                         _recognize_speech, wav_content, purpose, preferred)
+
+def _recognize_speech(wav_content, purpose, preferred):
+    fingerprint, cached = lookup_transcript(wav_content, purpose, preferred)
+    if cached is not None:
+        return cached['transcript'], cached['confidence'], cached['words']
+    
+    with metrics.timed('stt'):
+        result = stt_router.recognize(wav_content, purpose, preferred)
+    
+    if result is None:
+        logger.debug("❌ 음성 인식 결과 없음 (목적: %s)", purpose)
+        store_transcript(fingerprint, purpose, preferred, None, 0.0, [])
+        return None, 0.0, []
+    
+    logger.debug("🎯 음성 인식 결과 (%s): '%s' 신뢰도 %.3f, 대안 %s",
+                 result.backend, result.transcript, result.confidence, result.alternatives[:2])
+    
+    store_transcript(fingerprint, purpose, preferred, result.transcript, result.confidence, result.words)
+    return result.transcript, result.confidence, result.words
+
+def tts_available():
+    """TTS 엔진 사용 가능 여부 (아직 초기화 전이면 여기서 초기화)"""
+    try:
+        return services.tts.is_available
+    except ServiceUnavailable:
+        return False
+
+def _service_ready(name):
+    return services.state(name) == 'ready'
+
+def health_status():
+    """서버/서비스 상태 딕셔너리 (Flask·ASGI 서버 공용) - 아직 생성되지 않은 서비스는 만들지 않음"""
+    ready, service_states = services.readiness()
+    return {
+        'status': 'healthy' if ready else 'starting',
         'message': 'LLM 음성 비서 서버가 정상적으로 작동 중입니다.',
+        'live': True,
+        'ready': ready,
         'services': {
-            'google_stt': speech_client is not None,
-            'gemini': bool(GEMINI_API_KEY and GEMINI_API_KEY != 'your-gemini-api-key'),
-            'tts_engine': tts_engine is not None
-        }
-    })
+            'google_stt': _service_ready('speech_client'),
+            'stt_backends': stt_router.stats(),
+            'gemini': is_gemini_configured(),
+            'tts_engine': _service_ready('tts') and tts_worker.is_available,
+            'wakeword_detector': _service_ready('wakeword_detector') and services.wakeword_detector.is_ready,
+        },
+        'service_states': service_states,
+        'startup': services.startup(),
+        'command_cache': command_cache.stats(),
+        'transcript_cache': (services.transcript_cache.stats()
+                             if TRANSCRIPT_CACHE_ENABLED and _service_ready('transcript_cache') else None),
+        'audio_preprocess': (services.audio_preprocessor.stats()
+                             if AUDIO_PREPROCESS == 'numpy' and _service_ready('audio_preprocessor')
+                             else AUDIO_PREPROCESS),
+        'tts_cache': tts_worker.stats(),
+        'screen_context': screen_contexts.stats(),
+        'coalescing': {flight.name: flight.stats() for flight in (llm_flight, stt_flight, tts_flight)},
+        'speculation': speculative_analyzer.stats(),
+    }
+
+def readiness_status():
+    """(준비 여부, 응답 본문) - 필수 서비스가 실제 점검을 통과해야 준비 완료"""
+    ready, service_states = services.readiness()
+    return ready, {'ready': ready, 'services': service_states, 'startup': services.startup()}
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """서버 상태 확인 (상세)"""
+    return jsonify(health_status())
+
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
+    """프로세스가 요청을 처리할 수 있는지 (외부 서비스 상태와 무관)"""
+    return jsonify({'live': True, 'startup': services.startup()})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """트래픽을 받아도 되는지 - 준비 전이면 503"""
+    ready, body = readiness_status()
+    return jsonify(body), (200 if ready else 503)
+
+@app.errorhandler(ServiceUnavailable)
+def handle_service_unavailable(e):
+    """서비스 생성 실패 / 재시도 대기 → 503 + Retry-After"""
+    response = jsonify({'error': str(e), 'service': e.name})
+    response.headers['Retry-After'] = str(max(1, int(e.retry_after or 1)))
+    return response, 503
+
+def current_endpoint():
+    """메트릭 라벨용 현재 엔드포인트 이름"""
+    if has_request_context() and request.endpoint:
+        return request.endpoint
+    return 'internal'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """엔드포인트별 요청 수 / 상태 코드 / 처리 시간 집계 (스트리밍 응답은 첫 응답까지)"""
+    started = g.get('request_started')
+    elapsed = time.perf_counter() - started if started is not None else None
+    metrics.record_request(request.endpoint or 'not_found', response.status_code, elapsed)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 형식 메트릭 (?format=json 이면 p50/p95/p99 요약 JSON)"""
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# 업로드 Content-Type → 오디오 형식
+AUDIO_MIMETYPE_FORMATS = {
+    'audio/mp4': 'm4a',
+    'audio/m4a': 'm4a',
+    'audio/x-m4a': 'm4a',
+    'audio/3gpp': '3gp',
+    'audio/aac': 'aac',
+    'audio/mpeg': 'mp3',
+    'audio/ogg': 'ogg',
+    'audio/opus': 'ogg',
+    'audio/webm': 'webm',
+    'audio/wav': 'wav',
+    'audio/x-wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/l16': 'pcm',
+}
+MIN_AUDIO_BYTES = 50  # 최소 크기를 50 bytes로 낮춤
+
+def _is_true(value):
+    """JSON bool 또는 쿼리/폼 문자열 플래그 해석"""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def audio_payload_error(audio_bytes, audio_format):
+    """업로드 오디오 검증 - 문제가 있으면 오류 메시지"""
+    if not re.fullmatch(r'[a-z0-9_]{1,10}', audio_format):
+        return f'지원하지 않는 오디오 형식입니다: {audio_format}'
+    if not audio_bytes:
+        return '오디오 데이터가 없습니다.'
+    if len(audio_bytes) < MIN_AUDIO_BYTES:
+        return '오디오 데이터가 너무 작습니다.'
+    return None
+
+def read_audio_request():
+    """요청에서 오디오 추출 - JSON(base64) / raw 바이너리 / multipart 업로드 지원
+    
+    반환: (오디오 바이트, 오디오 형식, 옵션, 오류 응답)
+    """
+    mimetype = request.mimetype
+    header_format = request.args.get('format') or request.headers.get('X-Audio-Format')
+    
+    if mimetype == 'application/json':
+        # 기존 클라이언트 호환: base64 문자열은 한 번만 디코딩
+        options = request.get_json(silent=True)
+        if not options:
+            return None, None, None, (jsonify({'error': '요청 데이터가 없습니다.'}), 400)
+        audio_data = options.get('audio_data', '')
+        if not audio_data:
+            return None, None, None, (jsonify({'error': '오디오 데이터가 없습니다.'}), 400)
+        try:
+            with metrics.timed('base64_decode'):
+                audio_bytes = base64.b64decode(audio_data)
+        except Exception as e:
+            return None, None, None, (jsonify({'error': f'잘못된 Base64 데이터입니다: {str(e)}'}), 400)
+        audio_format = options.get('audio_format') or header_format or 'm4a'
+    
+    elif mimetype == 'multipart/form-data':
+        upload = request.files.get('audio')
+        if upload is None:
+            return None, None, None, (jsonify({'error': '오디오 데이터가 없습니다.'}), 400)
+        audio_bytes = upload.read()
+        extension = upload.filename.rsplit('.', 1)[-1].lower() if upload.filename and '.' in upload.filename else None
+        audio_format = (request.form.get('audio_format') or header_format
+                        or AUDIO_MIMETYPE_FORMATS.get(upload.mimetype) or extension or 'm4a')
+        options = {**request.args.to_dict(), **request.form.to_dict()}
+    
+    else:
+        # application/octet-stream, audio/* - 본문 바이트를 그대로 변환 단계로 전달
+        audio_bytes = request.get_data(cache=False)
+        audio_format = header_format or AUDIO_MIMETYPE_FORMATS.get(mimetype) or 'm4a'
+        options = request.args.to_dict()
+        if 'X-Check-Wakeword' in request.headers:
+            options.setdefault('check_wakeword', request.headers['X-Check-Wakeword'])
+    
+    audio_format = str(audio_format).lower()
+    error = audio_payload_error(audio_bytes, audio_format)
+    if error:
+        return None, None, None, (jsonify({'error': error}), 400)
+    
+    return audio_bytes, audio_format, options, None
 
 @app.route('/speech-to-text', methods=['POST'])
 def speech_to_text():
     """음성을 텍스트로 변환"""
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': '요청 데이터가 없습니다.'}), 400
-            
-        audio_data = data.get('audio_data', '')
-        check_wakeword = data.get('check_wakeword', False)
+        audio_bytes, audio_format, options, error_response = read_audio_request()
+        if error_response:
+            return error_response
+        check_wakeword = _is_true(options.get('check_wakeword', False))
         
-        if not audio_data:
-            return jsonify({'error': '오디오 데이터가 없습니다.'}), 400
+        logger.debug("🎤 받은 오디오: %d bytes (%s, 형식: %s, 호출어 확인: %s)",
+                     len(audio_bytes), request.mimetype, audio_format, check_wakeword)
         
-        # Base64 데이터 검증
         try:
-            # Base64 디코딩 테스트
-            test_decode = base64.b64decode(audio_data)
-            if len(test_decode) < 50:  # 최소 크기를 50 bytes로 낮춤
-                return jsonify({'error': '오디오 데이터가 너무 작습니다.'}), 400
-        except Exception as e:
-            return jsonify({'error': f'잘못된 Base64 데이터입니다: {str(e)}'}), 400
-        
-        print(f"🎤 받은 오디오 데이터 길이: {len(audio_data)}")
-        print(f"🔍 호출어 확인 모드: {check_wakeword}")
-        print(f"🔍 audio_data 첫 100자: {audio_data[:100] if audio_data else 'None'}")
-        print(f"🔍 audio_data 마지막 100자: {audio_data[-100:] if audio_data and len(audio_data) > 100 else 'None'}")
-        
-        print("🔍 [DEBUG] 요청 헤더 정보:")
-        print(f"   📊 Content-Type: {request.headers.get('Content-Type', 'N/A')}")
-        print(f"   📏 Content-Length: {request.headers.get('Content-Length', 'N/A')}")
-        print(f"   🌐 User-Agent: {request.headers.get('User-Agent', 'N/A')}")
-        
-        try:
-            # Base64 디코딩
-            audio_bytes = base64.b64decode(audio_data)
-            print(f"🎤 디코딩된 오디오 크기: {len(audio_bytes)} bytes")
-            
-            # 오디오 형식 확인 (Flutter에서 전송한 형식)
-            audio_format = data.get('audio_format', 'm4a')
-            print(f"📁 받은 오디오 형식: {audio_format}")
-            
             # M4A를 WAV로 변환
-            wav_content = convert_audio_to_wav(audio_bytes, audio_format)
+            try:
+                wav_content = convert_audio_to_wav(audio_bytes, audio_format, request_audio_profile(options))
+            except ConversionBusy as e:
+                return conversion_busy_response(e)
             if wav_content is None:
                 return jsonify({'error': '오디오 변환 실패'}), 500
             
-            print(f"✅ 오디오 변환 완료: {len(wav_content)} bytes")
+            # 음성 구간 검출 - 무음 클립은 STT 호출 없이 빈 결과 반환
+            with metrics.timed('vad'):
+                vad_result = services.vad.process(wav_content)
+            if not vad_result.has_speech:
+                logger.debug("🔇 음성 구간 없음 - STT 생략")
+                return jsonify({
+                    'transcript': '',
+                    'confidence': 0.0,
+                    'is_wakeword': False,
+                    'speech_span': None
+                })
+            wav_content = vad_result.wav_content
+            logger.debug("✂️ 무음 제거: %.2fs ~ %.2fs / %.2fs", vad_result.start, vad_result.end, vad_result.duration)
             
-            # Google Cloud Speech-to-Text 설정
-            audio = speech.RecognitionAudio(content=wav_content)
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                # sample_rate_hertz는 자동 감지되도록 제거
-                language_code='ko-KR',
-                use_enhanced=True,
-                model='latest_long',  # 더 긴 명령어에 최적화
-                enable_automatic_punctuation=True,
-                enable_word_time_offsets=True,
-                enable_word_confidence=True,  # 단어별 신뢰도 추가
-                speech_contexts=[{
-                    'phrases': WAKE_WORDS + [
-                        '네이버', '유튜브', '구글', '페이스북', '로그인', '검색',
-                        '클릭', '버튼', '열어줘', '실행해줘', '보여줘', '네이버', '네이버',
-                        '로그인', '로그인', '검색', '검색', '스크롤', '스크롤'
-                    ],
-                    'boost': 25  # 더 높은 가중치
-                }]
+            # 음성 인식 실행 (호출어 확인용 짧은 클립은 로컬 백엔드 우선)
+            transcript, confidence, word_confidences = recognize_speech(
+                wav_content,
+                purpose='wakeword' if check_wakeword else 'command',
+                preferred=options.get('stt_backend'),
             )
-            
-            # 음성 인식 실행
-            print("🎤 [DEBUG] Google Cloud Speech-to-Text API 호출 중...")
-            response = speech_client.recognize(config=config, audio=audio)
-            
-            print(f"📡 [DEBUG] Google STT 응답:")
-            print(f"   📊 결과 개수: {len(response.results)}")
-            
-            if not response.results:
-                print("❌ [DEBUG] 음성 인식 결과 없음")
+            if transcript is None:
                 return jsonify({
                     'transcript': '',
                     'confidence': 0.0,
-                    'is_wakeword': False
+                    'is_wakeword': False,
+                    'speech_span': vad_result.span()
                 })
             
-            # 결과 처리
-            result = response.results[0]
-            transcript = result.alternatives[0].transcript.strip()
-            confidence = result.alternatives[0].confidence
-            
-            print(f"🎯 [DEBUG] 음성 인식 결과:")
-            print(f"   🎤 원본 텍스트: '{transcript}'")
-            print(f"   📈 신뢰도: {confidence:.3f} ({confidence*100:.1f}%)")
-            print(f"   📊 대안 개수: {len(result.alternatives)}")
-            
-            if len(result.alternatives) > 1:
-                for i, alt in enumerate(result.alternatives[1:3]):  # 상위 3개만 출력
-                    print(f"   🔄 대안 {i+1}: '{alt.transcript.strip()}' (신뢰도: {alt.confidence:.3f})")
-            
             # 텍스트 후처리 (철자 교정 및 문맥 보정)
             original_transcript = transcript
             transcript = post_process_transcript(transcript)
-            
-            print(f"🔧 [DEBUG] 텍스트 후처리:")
-            print(f"   📝 원본: '{original_transcript}'")
-            print(f"   ✨ 후처리: '{transcript}'")
+            logger.debug("🔧 텍스트 후처리: '%s' → '%s'", original_transcript, transcript)
             
             # 호출어 확인
             is_wakeword = False
             if check_wakeword:
-                is_wakeword = is_wakeword_detected(transcript, confidence)
-                print(f"🔍 [DEBUG] 호출어 확인: {is_wakeword}")
+                is_wakeword = is_wakeword_detected(transcript, confidence, word_confidences)
+                logger.debug("🔍 호출어 확인: %s", is_wakeword)
             
             return jsonify({
                 'transcript': transcript,
                 'confidence': confidence,
-                'is_wakeword': is_wakeword
+                'is_wakeword': is_wakeword,
+                'speech_span': vad_result.span()
             })
             
+        except STTUnavailable as e:
+            logger.error("❌ %s", e)
+            return jsonify({'error': str(e)}), 503
         except Exception as e:
-            print(f"❌ 음성 인식 처리 중 오류: {e}")
+            logger.exception("❌ 음성 인식 처리 중 오류: %s", e)
             return jsonify({'error': f'음성 인식 처리 중 오류가 발생했습니다: {str(e)}'}), 500
             
     except Exception as e:
-        print(f"❌ 음성 인식 오류: {e}")
+        logger.exception("❌ 음성 인식 오류: %s", e)
         return jsonify({'error': f'음성 인식 중 오류가 발생했습니다: {str(e)}'}), 500
 
+# 스트리밍 인식 입력 인코딩 (pcm: 16bit LINEAR16, opus: Ogg/Opus) → RecognitionConfig.AudioEncoding 이름
+STREAMING_ENCODINGS = {
+    'pcm': 'LINEAR16',
+    'ogg_opus': 'OGG_OPUS',
+    'webm_opus': 'WEBM_OPUS',
+}
+# Opus는 정해진 샘플레이트만, PCM은 Google STT 허용 범위(8~48kHz)
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+def streaming_sample_rate(encoding, value):
+    """쿼리의 sample_rate 검증 - 지원하지 않으면 ValueError"""
+    try:
+        rate = int(value)
+    except (TypeError, ValueError):
+        rate = None
+    if rate in OPUS_SAMPLE_RATES or (encoding == 'pcm' and rate is not None and 8000 <= rate <= 48000):
+        return rate
+    raise ValueError(f'지원하지 않는 샘플레이트입니다: {value}')
+
+def create_streaming_recognizer(encoding='pcm', sample_rate=16000):
+    """환경 설정에 따른 스트리밍 인식기 (STT_STREAMING_BACKEND=fake 이면 오프라인 가짜 인식기)"""
+    from backend.streaming_stt import FakeStreamingRecognizer, GoogleStreamingRecognizer
+    
+    if os.getenv('STT_STREAMING_BACKEND', 'google') == 'fake':
+        return FakeStreamingRecognizer(os.getenv('STT_FAKE_TRANSCRIPT', '많이 내려줘'))
+    from google.cloud import speech
+    audio_encoding = getattr(speech.RecognitionConfig.AudioEncoding, STREAMING_ENCODINGS[encoding])
+    config = build_recognition_config(audio_encoding, sample_rate)
+    return GoogleStreamingRecognizer(services.speech_client, config)
+
+def analyze_streamed_command(command, allow_llm, screen=None):
+    """스트리밍 인식 문장의 명령 분석 - allow_llm=False(불안정한 interim)면 규칙/캐시 경로만 (LLM이 필요하면 None)"""
+    if allow_llm:
+        return analyze_command_text(command, screen)
+    result, _ = analyze_command_fast_path(command, record_stats=False)
+    if result is None or screen is None:
+        return result
+    # 화면 대상이 애매해서 Gemini에 후보를 물어야 하면 추측하지 않음 (안정된 interim / 최종 문장에서 다시)
+    element, source, pending = locate_screen_target(result, command, screen)
+    if pending:
+        return None
+    return attach_screen_target(result, screen, element, source)
+
+def run_streaming_session(ws, encoding, sample_rate, speculation=None):
+    """WebSocket 메시지 루프 - 바이너리 프레임은 오디오, 텍스트 {"event": "end"}는 입력 종료
+    speculation이 있으면 interim 결과로 명령 분석을 미리 시작하고, final 뒤에 command 이벤트를 보냄"""
+    from backend.streaming_stt import Endpointer, StreamingSession
+    
+    session = StreamingSession(
+        create_streaming_recognizer(encoding, sample_rate),
+        # 발화 끝 감지는 raw PCM 입력에서만 가능
+        endpointer=Endpointer(sample_rate=sample_rate) if encoding == 'pcm' else None,
+        post_process=post_process_transcript,
+        on_interim=speculation.offer if speculation is not None else None,
+    ).start()
+    
+    try:
+        _stream_session_events(ws, session, speculation)
+    finally:
+        # 클라이언트가 끊겨도 인식기 입력을 닫아 스트리밍 호출이 max_duration까지 남지 않도록
+        session.finish()
+        if speculation is not None:
+            speculation.close()
+    return session
+
+def _stream_session_events(ws, session, speculation):
+    while True:
+        message = ws.receive(timeout=0.05)
+        if isinstance(message, (bytes, bytearray)):
+            session.feed(bytes(message))
+        elif message:
+            try:
+                control = json.loads(message)
+            except ValueError:
+                control = {}
+            if control.get('event') == 'end':
+                session.finish()
+        
+        for event in session.drain():
+            ws.send(json.dumps(event, ensure_ascii=False))
+            if speculation is None:
+                continue
+            if event['event'] == 'end_of_speech':
+                speculation.end_of_speech()
+            elif event['event'] == 'final' and event['transcript']:
+                with metrics.timed('speculation_commit'):
+                    command, info = speculation.commit(event['transcript'])
+                ws.send(json.dumps({'event': 'command', 'command': command, **info}, ensure_ascii=False))
+        if session.done.is_set() and session.events.empty():
+            break
+
+if sock is not None:
+    @sock.route('/stream/speech-to-text')
+    def stream_speech_to_text(ws):
+        """WebSocket 스트리밍 음성 인식 - interim/final/end_of_speech 이벤트를 JSON으로 전송"""
+        encoding = request.args.get('encoding', 'pcm')
+        if encoding not in STREAMING_ENCODINGS:
+            ws.send(json.dumps({'event': 'error', 'error': f'지원하지 않는 인코딩입니다: {encoding}'}, ensure_ascii=False))
+            return
+        try:
+            sample_rate = streaming_sample_rate(encoding, request.args.get('sample_rate', '16000'))
+        except ValueError as e:
+            ws.send(json.dumps({'event': 'error', 'error': str(e)}, ensure_ascii=False))
+            return
+        speculation = None
+        if _is_true(request.args.get('analyze', False)):
+            # 먼저 등록한 같은 기기의 화면 문맥이 있으면 touch 대상을 그 화면에서 찾음
+            screen = load_screen_context(request_device_id(request.args, request.headers))
+            speculation = speculative_analyzer.session(screen)
+        try:
+            run_streaming_session(ws, encoding, sample_rate, speculation)
+        except ServiceUnavailable as e:
+            logger.error("❌ %s", e)
+            _send_stream_error(ws, {'error': str(e), 'retry_after': round(e.retry_after, 1) if e.retry_after else None})
+        except Exception as e:
+            logger.exception("❌ 스트리밍 세션 오류: %s", e)
+            _send_stream_error(ws, {'error': f'스트리밍 인식 중 오류가 발생했습니다: {str(e)}'})
+
+def _send_stream_error(ws, payload):
+    """스트리밍 세션 오류 이벤트 전송 (이미 끊긴 연결이면 무시)"""
+    try:
+        ws.send(json.dumps({'event': 'error', **payload}, ensure_ascii=False))
+    except Exception:
+        pass
+
+def _decode_wakeword_request():
+    """호출어 요청의 오디오를 WAV로 변환, 실패 시 (None, 오류 응답)"""
+    audio_bytes, audio_format, options, error_response = read_audio_request()
+    if error_response:
+        return None, error_response
+    
+    try:
+        wav_content = convert_audio_to_wav(audio_bytes, audio_format, request_audio_profile(options))
+    except ConversionBusy as e:
+        return None, conversion_busy_response(e)
+    if wav_content is None:
+        return None, (jsonify({'error': '오디오 변환 실패'}), 500)
+    return wav_content, None
+
+@app.route('/wakeword', methods=['POST'])
+def wakeword():
+    """로컬 감지기로 호출어 확인 - 통과한 클립만 STT로 재확인"""
+    try:
+        wav_content, error_response = _decode_wakeword_request()
+        if error_response:
+            return error_response
+        
+        from backend.wakeword_detector import wav_to_samples
+        
+        detector = services.wakeword_detector
+        samples, _ = wav_to_samples(wav_content)
+        result = detector.detect(samples)
+        result['detector'] = 'local' if detector.is_ready else 'stt'
+        result['verified_by_stt'] = False
+        
+        # 음성이 없거나 템플릿과 거리가 먼 클립은 STT 없이 바로 거절
+        if not result['has_speech'] or (detector.is_ready and not result['is_wakeword']):
+            return jsonify(result)
+        
+        # 템플릿이 없으면 기존 STT 기반 판정으로 대체
+        if not detector.is_ready or WAKEWORD_VERIFY_WITH_STT:
+            transcript, confidence, word_confidences = recognize_speech(wav_content, purpose='wakeword')
+            transcript = post_process_transcript(transcript or '')
+            text_match = match_wakeword(transcript, confidence, word_confidences)
+            result['is_wakeword'] = text_match.is_wakeword
+            result['text_match'] = text_match.to_dict()
+            result['transcript'] = transcript
+            result['verified_by_stt'] = True
+        
+        return jsonify(result)
+    
+    except STTUnavailable as e:
+        logger.error("❌ %s", e)
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.exception("❌ 호출어 감지 오류: %s", e)
+        return jsonify({'error': f'호출어 감지 중 오류가 발생했습니다: {str(e)}'}), 500
+
+def check_enroll_token(headers):
+    """호출어 등록 권한 확인 - 허용이면 None, 아니면 (오류 응답)"""
+    if not WAKEWORD_ENROLL_TOKEN:
+        return jsonify({'error': '호출어 템플릿 등록이 비활성화되어 있습니다. (WAKEWORD_ENROLL_TOKEN 미설정)'}), 403
+    token = headers.get('X-Enroll-Token') or ''
+    if not hmac.compare_digest(token.encode('utf-8'), WAKEWORD_ENROLL_TOKEN.encode('utf-8')):
+        return jsonify({'error': '호출어 템플릿 등록 토큰이 올바르지 않습니다.'}), 401
+    return None
+
+@app.route('/wakeword/enroll', methods=['POST'])
+def wakeword_enroll():
+    """호출어 템플릿 등록 (X-Enroll-Token 필요) - 다른 워커는 템플릿 디렉토리 변경을 보고 다시 로드"""
+    denied = check_enroll_token(request.headers)
+    if denied:
+        return denied
+    try:
+        wav_content, error_response = _decode_wakeword_request()
+        if error_response:
+            return error_response
+        
+        count = services.wakeword_detector.enroll(wav_content)
+        return jsonify({'success': True, 'template_count': count})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("❌ 호출어 템플릿 등록 오류: %s", e)
+        return jsonify({'error': f'호출어 템플릿 등록 중 오류가 발생했습니다: {str(e)}'}), 500
+
+def command_fallback_response(command, reason=None):
+    """AI 분석을 못 했을 때의 기본 touch 응답"""
+    suffix = f' ({reason})' if reason else ''
+    return {
+        'action': 'touch',
+        'target': command,
+        'coordinates': {'x': 200, 'y': 300},
+        'response': f"'{command}' 명령을 실행하겠습니다.{suffix}",
+        'confidence': 0.5
+    }
+
+def analyze_command_fast_path(command, record_stats=True):
+    """LLM 호출 없이 끝나는 경로 (규칙 → 캐시 → API Key 미설정) - (결과 또는 None, 캐시 키) 반환
+    record_stats=False면 명령 캐시 적중/미스 통계에 넣지 않음 (interim 추측 분석용)"""
+    # 명령 분석 시작
+    logger.debug("🤖 명령 분석 시작: '%s'", command)
+    
+    # 규칙 기반 빠른 경로 - 확실한 스크롤/터치/이동 명령은 Gemini 호출 생략
+    rule_result = classify_command(command)
+    if rule_result is not None:
+        logger.debug("⚡ 규칙 기반 분석 완료: %s", rule_result)
+        return rule_result, None
+    
+    # 같은 명령이 반복되면 캐시된 분석 결과 사용
+    cache_key = post_process_transcript(command)
+    cached_result = command_cache.get(cache_key, record=record_stats)
+    if cached_result is not None:
+        logger.debug("💾 명령 캐시 적중: %s", cached_result)
+        return cached_result, cache_key
+    
+    # Gemini API Key 검증
+    if not is_gemini_configured():
+        logger.warning("❌ Gemini API Key가 설정되지 않아 AI 분석을 건너뜁니다.")
+        return command_fallback_response(command, 'API Key 미설정으로 기본 처리'), cache_key
+    
+    return None, cache_key
+
+def finish_command_analysis(command, cache_key, gemini_response):
+    """Gemini 응답 파싱 → 검증/보정 → 캐시 저장"""
+    # JSON 응답 추출 (코드 블록/설명문이 섞여 있어도 처리)
+    with metrics.timed('json_parse'):
+        parsed_response = extract_command_json(gemini_response)
+    parsed_ok = parsed_response is not None
+    if not parsed_ok:
+        logger.warning("⚠️ Gemini 응답 JSON 파싱 실패: %s", gemini_response[:200])
+        metrics.record_error(current_endpoint(), 'json_parse')
+        parsed_response = {
+            "action": "touch",
+            "target": command,
+            "coordinates": {"x": 200, "y": 300},
+            "response": f"'{command}' 명령을 실행하겠습니다."
+        }
+    
+    # AI 결과 검증 및 보정
+    corrected_response = postprocess_ai_response(parsed_response, command)
+    
+    # 정상적으로 파싱된 결과만 캐시 (기본 응답은 캐시하지 않음, 화면 요소 번호는 그 화면에서만 의미가 있으므로 제외)
+    if parsed_ok and cache_key:
+        command_cache.put(cache_key, {k: v for k, v in corrected_response.items() if k != 'element'})
+    
+    logger.debug("🤖 명령 분석 완료: %s", corrected_response)
+    
+    return corrected_response
+
+def analyze_command_text(command, screen=None):
+    """음성 명령을 분석하여 액션 딕셔너리 반환 - 같은 명령(정규화 기준)의 Gemini 호출이 진행 중이면 그 결과 공유
+    screen(ScreenIndex)이 있으면 touch 대상을 화면 요소 좌표로 바꿈 (애매할 때만 추린 후보로 Gemini 호출)"""
+    result, cache_key = analyze_command_fast_path(command)
+    elements = []
+    if result is None:
+        elements = screen_prompt_elements(screen, command)
+        result = llm_flight.do(llm_flight_key(cache_key, screen, elements), analyze_command_with_gemini,
+                               command, cache_key, screen, elements)
+    if screen is None:
+        return result
+    
+    element, source, pending = locate_screen_target(result, command, screen, allow_llm=not elements)
+    if pending:
+        choice = llm_flight.do(llm_flight_key(command, screen, pending), analyze_command_with_gemini,
+                               command, None, screen, pending)
+        chosen = screen_element_choice(screen, choice)
+        if chosen is not None:
+            element, source = chosen, 'llm'
+    return attach_screen_target(result, screen, element, source)
+
+def analyze_command_with_gemini(command, cache_key, screen=None, elements=()):
+    # 짧은 시스템 지시문 + 관련 예시만 포함한 프롬프트(+ 추린 화면 요소), JSON 스키마 강제 출력
+    prompt = build_command_prompt(command, screen.describe(elements) if elements else None)
+    
+    # Gemini를 사용한 명령 분석
+    try:
+        with metrics.timed('llm'):
+            gemini_response = gemini_client.generate(
+                prompt,
+                generation_config=GENERATION_CONFIG,
+                system_instruction=SYSTEM_INSTRUCTION,
+            ).strip()
+    except LLMError as e:
+        logger.error("❌ Gemini 호출 실패: %s", e)
+        metrics.record_error(current_endpoint(), 'llm')
+        return command_fallback_response(command, 'AI 분석 실패로 기본 처리')
+    
+    return finish_command_analysis(command, cache_key, gemini_response)
+
+def request_device_id(data, headers):
+    """화면 문맥을 구분할 기기 ID - 본문 device_id 또는 X-Device-Id 헤더 (없으면 'default')"""
+    device_id = (data or {}).get('device_id') or headers.get('X-Device-Id')
+    return str(device_id or 'default')[:128]
+
+def load_screen_context(device_id, snapshot=None):
+    """스냅샷이 있으면 등록해서, 없으면 기기의 최근 스냅샷으로 ScreenIndex (없으면 None, 형식 오류는 ScreenSnapshotError)"""
+    if isinstance(snapshot, str):
+        # multipart / 쿼리 옵션으로 온 스냅샷은 JSON 문자열
+        try:
+            snapshot = json.loads(snapshot)
+        except ValueError as e:
+            raise ScreenSnapshotError(f'JSON 파싱 실패: {e}')
+    with metrics.timed('screen_index'):
+        if snapshot is not None:
+            return screen_contexts.put(device_id, snapshot)
+        return screen_contexts.get(device_id)
+
+def screen_prompt_elements(screen, command):
+    """Gemini 프롬프트에 넣을 관련 화면 요소 (화면이 없거나 관련 요소가 없으면 빈 목록)"""
+    if screen is None:
+        return []
+    return [element.target for _, element in screen.candidates(command, SCREEN_PROMPT_CANDIDATES)]
+
+def llm_flight_key(command, screen=None, elements=()):
+    """명령 분석 요청 합치기 키 - 화면 후보를 넣은 호출은 화면/후보별로 구분"""
+    key = normalize_command_key(command)
+    if elements:
+        key += f"@{screen.screen_id}:{','.join(str(element.index) for element in elements)}"
+    return key
+
+def locate_screen_target(result, command, screen, allow_llm=True):
+    """touch 결과의 대상 요소 찾기 - (요소 또는 None, 찾은 방법, Gemini에 물어볼 후보 목록)"""
+    if result.get('action') != 'touch':
+        result.pop('element', None)
+        return None, None, []
+    index = result.pop('element', None)
+    if isinstance(index, int) and 0 <= index < len(screen.elements):
+        return screen.elements[index].target, 'llm', []
+    
+    with metrics.timed('screen_resolve'):
+        target = result.get('target') or command
+        match = screen.resolve(target, SCREEN_PROMPT_CANDIDATES)
+        if not match.candidates and target != command:
+            # 추출한 대상 이름이 화면에 없으면 (조사 제거 등으로 잘린 경우) 명령 전체로 다시 찾음
+            match = screen.resolve(command, SCREEN_PROMPT_CANDIDATES)
+    if match.resolved:
+        return match.element, 'index', []
+    pending = match.candidates if allow_llm and match.candidates and is_gemini_configured() else []
+    if match.element is not None:
+        return match.element, 'index_guess', pending
+    
+    # 색인에서 못 찾으면 LLM이 준 좌표를 가까운 누를 수 있는 요소로 보정 (규칙 경로의 기본 좌표는 제외)
+    coordinates = result.get('coordinates') or {}
+    if result.get('source') != 'rule' and isinstance(coordinates.get('x'), (int, float)) \
+            and isinstance(coordinates.get('y'), (int, float)):
+        snapped = screen.snap(coordinates['x'], coordinates['y'])
+        if snapped is not None:
+            return snapped, 'snap', pending
+    return None, None, pending
+
+def screen_element_choice(screen, choice):
+    """후보를 넣은 Gemini 응답에서 고른 요소 (없거나 번호가 틀리면 None)"""
+    index = choice.get('element') if isinstance(choice, dict) else None
+    if isinstance(index, int) and 0 <= index < len(screen.elements):
+        return screen.elements[index].target
+    return None
+
+def attach_screen_target(result, screen, element, source):
+    """찾은 요소의 중심 좌표를 coordinates로 (못 찾으면 기존 좌표 유지, element는 None)"""
+    result['screen_id'] = screen.screen_id
+    if element is None:
+        result['element'] = None
+        return result
+    x, y = element.center
+    result['coordinates'] = {'x': x, 'y': y}
+    result['element'] = element.to_dict()
+    result['target_source'] = source
+    logger.debug("📍 화면 요소로 대상 확정 (%s): %s", source, result['element'])
+    return result
+
+def command_error_response(e):
+    """명령 분석 실패 시 기본 응답"""
+    return {
+        'action': 'touch',
+        'target': 'unknown',
+        'coordinates': {'x': 200, 'y': 300},
+        'response': f'명령 분석 중 오류가 발생했습니다: {str(e)}'
+    }
+
 @app.route('/analyze-command', methods=['POST'])
 def analyze_command():
     """음성 명령을 분석하고 적절한 액션 결정"""
@@ -404,130 +1175,91 @@ def analyze_command():
         if len(command.strip()) < 2:
             return jsonify({'error': '명령어가 너무 짧습니다.'}), 400
         
-        # 명령 분석 시작
-        print(f"🤖 명령 분석 시작: '{command}'")
-        
-        # Gemini API Key 검증
-        if GEMINI_API_KEY == 'your-gemini-api-key' or GEMINI_API_KEY == 'dummy-key-for-testing':
-            print("❌ Gemini API Key가 설정되지 않아 AI 분석을 건너뜁니다.")
-            return jsonify({
-                'action': 'touch',
-                'target': command,
-                'coordinates': {'x': 200, 'y': 300},
-                'response': f"'{command}' 명령을 실행하겠습니다. (API Key 미설정으로 기본 처리)",
-                'confidence': 0.5
-            })
-        
-        # Gemini를 사용한 명령 분석
+        # 화면 문맥 - 본문 screen(스냅샷) 또는 /screen-context로 먼저 보낸 기기의 스냅샷
         try:
-            model = genai.GenerativeModel('gemini-1.5-pro')
-        except Exception as e:
-            print(f"❌ Gemini 모델 초기화 실패: {e}")
-            return jsonify({
-                'action': 'touch',
-                'target': command,
-                'coordinates': {'x': 200, 'y': 300},
-                'response': f"'{command}' 명령을 실행하겠습니다. (AI 분석 실패로 기본 처리)",
-                'confidence': 0.5
-            })
-        
-        prompt = f"""
-당신은 사용자의 음성 명령을 분석하여 아래 4가지 액션 중 하나로 분류해야 합니다:
-
-- touch: 사용자가 화면의 특정 지점을 누르거나 클릭하려고 할 때
-- scroll: 화면을 위 또는 아래로 이동(스크롤)하려고 할 때
-- input: 텍스트나 문자를 입력하려고 할 때
-- navigate: 앱이나 페이지를 전환하거나 이동하려고 할 때
-
-🚨 [절대 규칙 - 반드시 지켜야 함]
-- "내려", "올려", "스크롤", "내려줘", "올려줘", "위로", "아래로", "화면 내려", "화면 올려" → 절대 touch 액션이 아님! 반드시 scroll 액션으로만 응답!
-- "내려"는 절대 touch 액션이 아니고 반드시 scroll 액션으로 응답하세요
-- "올려"는 절대 touch 액션이 아니고 반드시 scroll 액션으로 응답하세요
-- 스크롤 관련 명령어는 절대 touch가 될 수 없습니다!
-
-🔍 [부사형 단어 유연성 - 절대 규칙]
-- **부사형 단어는 스크롤 명령의 강도나 양을 나타내며, 스크롤 액션의 본질을 바꾸지 않습니다**
-- "많이", "조금", "적게", "살짝", "크게", "한번", "한 번", "쭉", "천천히", "빨리", "부드럽게", "가볍게", "강하게", "약하게", "무겁게", "조용히", "느리게" 등의 부사는 모두 scroll 액션입니다
-- 부사형 단어가 포함되어도 스크롤 명령의 핵심 동사("내려", "올려", "스크롤")가 있으면 반드시 scroll 액션입니다
-- **절대 규칙**: "많이 내려줘", "조금 올려줘", "살짝 스크롤", "한번 내려줘", "크게 올려줘", "천천히 내려줘", "부드럽게 올려줘" → 모두 scroll 액션 (절대 touch 아님!)
-- **부사형 단어가 포함된 명령은 절대 touch가 될 수 없습니다!**
-
-⚠️ [중요 기준 정리]
-- "스크롤", "스크롤 다운", "스크롤 업", "위로 올려줘", "아래로 내려줘", "쭉 내려봐", "쭉 올려줘", "내려줘", "올려줘" → 반드시 scroll 액션으로 분류 (절대 touch 아님)
-- "눌러줘", "클릭", "터치", "이 버튼 눌러" → touch 액션 (특정 위치나 버튼을 누르는 의도)
-- 스크롤 명령은 **단순한 방향 조작이며**, 화면의 위치를 움직이는 것이지, 특정 지점을 누르는 것이 아닙니다.
-
-🎯 반드시 JSON 형식으로만 응답하세요. 예시는 다음과 같습니다:
-- "스크롤 해줘" → {{ "action": "scroll", "direction": "down" }}
-- "위로 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "아래로 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "내려" → {{ "action": "scroll", "direction": "down" }}
-- "올려" → {{ "action": "scroll", "direction": "up" }}
-- "많이 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "조금 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "살짝 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "한번 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "크게 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "천천히 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "부드럽게 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "가볍게 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "강하게 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "약하게 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "무겁게 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "조용히 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "느리게 올려줘" → {{ "action": "scroll", "direction": "up" }}
-- "쭉 내려줘" → {{ "action": "scroll", "direction": "down" }}
-- "화면 눌러줘" → {{ "action": "touch", "position": {{ "x": 100, "y": 300 }} }}
-
-🧠 다음 명령을 분석해주세요:
-"{command}"
-
-정확히 JSON 형식으로만 출력해주세요.
-"""
+            screen = load_screen_context(request_device_id(data, request.headers), data.get('screen'))
+        except ScreenSnapshotError as e:
+            return jsonify({'error': f'화면 정보 형식 오류: {e}'}), 400
         
-        response = model.generate_content(prompt)
-        gemini_response = response.text.strip()
-        
-        try:
-            # JSON 응답 파싱 시도
-            if gemini_response.startswith('{') and gemini_response.endswith('}'):
-                parsed_response = json.loads(gemini_response)
-            else:
-                # JSON이 아닌 경우 기본 응답 생성
-                parsed_response = {
-                    "action": "touch",
-                    "target": command,
-                    "coordinates": {"x": 200, "y": 300},
-                    "response": f"'{command}' 명령을 실행하겠습니다."
-                }
-        except json.JSONDecodeError:
-            # JSON 파싱 실패 시 기본 응답
-            parsed_response = {
-                "action": "touch",
-                "target": command,
-                "coordinates": {"x": 200, "y": 300},
-                "response": f"'{command}' 명령을 실행하겠습니다."
-            }
-        
-        # AI 결과 검증 및 보정
-        corrected_response = postprocess_ai_response(parsed_response, command)
-        
-        print(f"🤖 명령 분석 완료: {corrected_response}")
-        
-        return jsonify(corrected_response)
+        return jsonify(analyze_command_text(command, screen))
         
     except Exception as e:
-        print(f"❌ 명령 분석 오류: {e}")
-        return jsonify({
-            'action': 'touch',
-            'target': 'unknown',
-            'coordinates': {'x': 200, 'y': 300},
-            'response': f'명령 분석 중 오류가 발생했습니다: {str(e)}'
-        })
+        logger.exception("❌ 명령 분석 오류: %s", e)
+        metrics.record_error('analyze_command', 'exception')
+        return jsonify(command_error_response(e))
+
+@app.route('/screen-context', methods=['POST'])
+def screen_context():
+    """접근성 트리 스냅샷 등록 - 이후 명령 분석(같은 기기)에서 touch 대상을 실제 좌표로 찾음"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': '요청 데이터가 없습니다.'}), 400
+    try:
+        screen = load_screen_context(request_device_id(data, request.headers), data.get('screen', data))
+    except ScreenSnapshotError as e:
+        return jsonify({'error': f'화면 정보 형식 오류: {e}'}), 400
+    return jsonify({**screen.stats(), 'expires_in': SCREEN_CONTEXT_TTL})
+
+def synthesize_speech(text):
+    """텍스트를 WAV 음성 바이트로 합성 (TTS 워커 + 캐시)"""
+    with metrics.timed('tts'):
+        return services.tts.synthesize(text)
+
+def tts_output_format(data=None):
+    """TTS 응답 형식 - wav(기존 base64 JSON) 또는 opus/mp3(압축 오디오 청크 스트림)"""
+    return str((data or {}).get('format') or request.args.get('format') or 'wav').lower()
+
+def record_tts_stream(stream):
+    """압축 TTS 스트림이 끝나면 첫 청크까지 걸린 시간 / 오류 기록"""
+    if stream.first_chunk_seconds is not None:
+        metrics.observe('tts_first_audio', stream.first_chunk_seconds)
+    if stream.error is not None:
+        logger.error("❌ TTS 스트림 중단: %s", stream.error)
+        metrics.record_error('tts', 'stream')
+    else:
+        logger.debug("🔊 TTS 스트림 %s: PCM %d bytes → %d bytes",
+                     stream.audio_format, stream.pcm_bytes, stream.bytes_sent)
+
+def open_tts_stream(text, audio_format):
+    """문장별 합성 작업을 한꺼번에 넣고 첫 문장이 합성되면 인코더 시작 - (스트림, 문장 수)"""
+    worker = services.tts
+    sentences = split_sentences(text, TTS_SENTENCE_MAX_CHARS)
+    stream = CompressedTTSStream([worker.submit(sentence) for sentence in sentences], audio_format,
+                                 bitrate=TTS_STREAM_BITRATE, on_finish=record_tts_stream)
+    return stream.start(), len(sentences)
+
+def tts_response(text, audio_format='wav'):
+    """wav면 기존 JSON(base64 WAV), 압축 형식이면 청크 스트림 응답"""
+    if audio_format != 'wav':
+        stream, sentence_count = open_tts_stream(text, audio_format)
+        return Response(iter(stream), mimetype=stream.mimetype,
+                        headers={'X-TTS-Sentences': str(sentence_count), 'Cache-Control': 'no-store'})
+    
+    audio_data = synthesize_speech(text)
+    
+    # Base64 인코딩
+    audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+    
+    return jsonify({
+        'audio_data': audio_base64,
+        'text': text
+    })
+
+def tts_payload(text, audio_data, tts_format='wav'):
+    """음성 명령 응답의 tts 항목 - tts_format이 압축 형식이면 인코딩 후 base64"""
+    if tts_format in STREAM_FORMATS:
+        audio_data = encode_audio(audio_data, tts_format, TTS_STREAM_BITRATE)
+        return {'audio_data': base64.b64encode(audio_data).decode('utf-8'), 'format': tts_format, 'text': text}
+    return {'audio_data': base64.b64encode(audio_data).decode('utf-8'), 'text': text}
+
+def unsupported_tts_format(audio_format):
+    if audio_format != 'wav' and audio_format not in STREAM_FORMATS:
+        return jsonify({'error': f'지원하지 않는 TTS 형식입니다: {audio_format}'}), 400
+    return None
 
 @app.route('/tts', methods=['POST'])
 def text_to_speech():
-    """텍스트를 음성으로 변환"""
+    """텍스트를 음성으로 변환 (format=opus|mp3면 문장 단위 압축 스트림)"""
     try:
         data = request.get_json()
         if not data:
@@ -542,82 +1274,189 @@ def text_to_speech():
         if len(text.strip()) < 1:
             return jsonify({'error': '텍스트가 너무 짧습니다.'}), 400
         
-        if tts_engine is None:
-            return jsonify({'error': 'TTS 엔진이 초기화되지 않았습니다.'}), 500
+        audio_format = tts_output_format(data)
+        error_response = unsupported_tts_format(audio_format)
+        if error_response:
+            return error_response
         
-        # 임시 파일에 음성 저장
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file_path = temp_file.name
+        if not tts_available():
+            return jsonify({'error': 'TTS 엔진이 초기화되지 않았습니다.'}), 500
         
-        try:
-            # TTS 실행
-            tts_engine.save_to_file(text, temp_file_path)
-            tts_engine.runAndWait()
-            
-            # 음성 파일 읽기
-            with open(temp_file_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Base64 인코딩
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            return jsonify({
-                'audio_data': audio_base64,
-                'text': text
-            })
-            
-        finally:
-            # 임시 파일 삭제
-            os.unlink(temp_file_path)
+        return tts_response(text, audio_format)
             
     except Exception as e:
-        print(f"❌ TTS 오류: {e}")
+        logger.exception("❌ TTS 오류: %s", e)
         return jsonify({'error': f'TTS 중 오류가 발생했습니다: {str(e)}'}), 500
 
 @app.route('/wakeword-feedback', methods=['POST'])
 def wakeword_feedback():
     """호출어 인식 피드백 TTS"""
     try:
-        feedback_text = "호출어 인식되었습니다. 명령어를 말해주세요."
+        feedback_text = WAKEWORD_FEEDBACK_TEXT
         
-        if tts_engine is None:
-            return jsonify({'error': 'TTS 엔진이 초기화되지 않았습니다.'}), 500
+        audio_format = tts_output_format(request.get_json(silent=True))
+        error_response = unsupported_tts_format(audio_format)
+        if error_response:
+            return error_response
         
-        # 임시 파일에 음성 저장
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file_path = temp_file.name
+        if not tts_available():
+            return jsonify({'error': 'TTS 엔진이 초기화되지 않았습니다.'}), 500
         
-        try:
-            # TTS 실행
-            tts_engine.save_to_file(feedback_text, temp_file_path)
-            tts_engine.runAndWait()
-            
-            # 음성 파일 읽기
-            with open(temp_file_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Base64 인코딩
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            return jsonify({
-                'audio_data': audio_base64,
-                'text': feedback_text
-            })
-            
-        finally:
-            # 임시 파일 삭제
-            os.unlink(temp_file_path)
+        return tts_response(feedback_text, audio_format)
             
     except Exception as e:
-        print(f"❌ 호출어 피드백 TTS 오류: {e}")
+        logger.exception("❌ 호출어 피드백 TTS 오류: %s", e)
         return jsonify({'error': f'호출어 피드백 TTS 중 오류가 발생했습니다: {str(e)}'}), 500
 
+def voice_command_events(audio_bytes, audio_format, with_tts, stt_backend=None, audio_profile=None,
+                         tts_format='wav', screen=None):
+    """음성 명령 파이프라인 (변환 → VAD → STT → 후처리 → 명령 분석 → TTS) 이벤트 생성"""
+    timer = StageTimer()
+    
+    try:
+        with timer.stage('convert'):
+            wav_content = convert_audio_to_wav(audio_bytes, audio_format, audio_profile)
+    except ConversionBusy as e:
+        logger.warning("🚦 오디오 변환 혼잡: %s", e)
+        metrics.record_error(current_endpoint(), 'convert_busy')
+        yield 'error', {'error': '오디오 변환 요청이 많습니다. 잠시 후 다시 시도하세요.', 'stage': 'convert',
+                        'status': 503, 'retry_after': conversion_retry_after(), 'timings': timer.summary()}
+        return
+    if wav_content is None:
+        yield 'error', {'error': '오디오 변환 실패', 'status': 500, 'timings': timer.summary()}
+        return
+    
+    with timer.stage('vad'), metrics.timed('vad'):
+        vad_result = services.vad.process(wav_content)
+    
+    transcript, raw_transcript, confidence = '', '', 0.0
+    if vad_result.has_speech:
+        try:
+            with timer.stage('stt'):
+                raw_transcript, confidence, _ = recognize_speech(vad_result.wav_content, preferred=stt_backend)
+        except STTUnavailable as e:
+            logger.error("❌ %s", e)
+            yield 'error', {'error': str(e), 'status': 503, 'timings': timer.summary()}
+            return
+        except Exception as e:
+            logger.exception("❌ 음성 인식 처리 중 오류: %s", e)
+            yield 'error', {'error': f'음성 인식 처리 중 오류가 발생했습니다: {str(e)}',
+                            'status': 500, 'timings': timer.summary()}
+            return
+        with timer.stage('post_process'):
+            transcript = post_process_transcript(raw_transcript or '')
+    
+    yield 'transcript', {
+        'transcript': transcript,
+        'raw_transcript': raw_transcript or '',
+        'confidence': confidence,
+        'speech_span': vad_result.span(),
+    }
+    
+    if len(transcript.strip()) < 2:
+        # 인식된 명령이 없으면 분석/TTS 생략
+        yield 'done', {'timings': timer.summary()}
+        return
+    
+    with timer.stage('analyze'):
+        try:
+            command = analyze_command_text(transcript, screen)
+        except Exception as e:
+            logger.exception("❌ 명령 분석 오류: %s", e)
+            metrics.record_error('voice_command', 'analyze')
+            command = command_error_response(e)
+    yield 'command', command
+    
+    if with_tts and tts_available():
+        tts_text = command.get('response') or f"'{transcript}' 명령을 실행하겠습니다."
+        try:
+            with timer.stage('tts'):
+                audio_data = synthesize_speech(tts_text)
+            yield 'tts', tts_payload(tts_text, audio_data, tts_format)
+        except Exception as e:
+            logger.exception("❌ TTS 오류: %s", e)
+            metrics.record_error('voice_command', 'tts')
+            yield 'tts', {'error': f'TTS 중 오류가 발생했습니다: {str(e)}', 'text': tts_text}
+    
+    yield 'done', {'timings': timer.summary()}
+
+@app.route('/voice-command', methods=['POST'])
+def voice_command():
+    """음성 → 텍스트 → 명령 분석 → (선택) TTS를 한 번의 요청으로 처리"""
+    try:
+        audio_bytes, audio_format, options, error_response = read_audio_request()
+        if error_response:
+            return error_response
+        with_tts = _is_true(options.get('tts', False))
+        try:
+            screen = load_screen_context(request_device_id(options, request.headers), options.get('screen'))
+        except ScreenSnapshotError as e:
+            return jsonify({'error': f'화면 정보 형식 오류: {e}'}), 400
+        events = voice_command_events(audio_bytes, audio_format, with_tts, options.get('stt_backend'),
+                                      request_audio_profile(options), str(options.get('tts_format', 'wav')).lower(),
+                                      screen)
+        
+        if _is_true(options.get('stream', False)):
+            # 단계별 결과를 준비되는 대로 NDJSON 한 줄씩 전송
+            def generate():
+                for event, payload in events:
+                    yield json.dumps({'event': event, **payload}, ensure_ascii=False) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        result = {'command': None, 'tts': None}
+        for event, payload in events:
+            if event == 'error':
+                status = payload.pop('status', 500)
+                response = jsonify(payload)
+                if payload.get('retry_after'):
+                    response.headers['Retry-After'] = str(payload['retry_after'])
+                return response, status
+            if event == 'transcript':
+                result.update(payload)
+            elif event == 'done':
+                result['timings'] = payload['timings']
+            else:
+                result[event] = payload
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.exception("❌ 음성 명령 처리 오류: %s", e)
+        return jsonify({'error': f'음성 명령 처리 중 오류가 발생했습니다: {str(e)}'}), 500
+
+# 모듈 로드 완료 - 무거운 서비스는 백그라운드에서 준비 (그 전에 온 요청은 해당 서비스 생성을 기다림)
+services.mark_loaded()
+if not services.lazy and SERVER_WORKERS <= 1:
+    services.warm_up()
+
+def start_worker():
+    """prefork 워커 시작 - 부모에서 만든 fork-safe 모델은 물려받고 클라이언트/스레드는 새로 생성"""
+    services.after_fork()
+    if not services.lazy:
+        services.warm_up()
+
+def run_server(host='0.0.0.0', port=8000, workers=SERVER_WORKERS):
+    """단일 프로세스(Flask 스레드 서버) 또는 모델 워밍업 후 prefork 워커 N개로 실행"""
+    if workers > 1 and hasattr(os, 'fork'):
+        from backend.prefork import PreforkServer
+        
+        services.warm_up(services.fork_safe_names(), background=False)
+        PreforkServer(app, host, port, workers, after_fork=start_worker).serve()
+        return
+    if workers > 1:
+        print("⚠️ 이 플랫폼은 fork를 지원하지 않아 단일 프로세스로 실행합니다.")
+    app.run(
+        host=host,
+        port=port,  # 포트 8000으로 통일
+        debug=False,  # 디버그 모드 끄기
+        threaded=True
+    )
+
 if __name__ == '__main__':
     print("🚀 LLM 음성 비서 백엔드 서버 시작...")
     print(f"📍 서버 URL: http://127.0.0.1:8000")
     
     # API Key 상태 확인
-    if GEMINI_API_KEY == 'your-gemini-api-key' or GEMINI_API_KEY == 'dummy-key-for-testing':
+    if not is_gemini_configured():
         print("🔧 Gemini API Key: 설정 필요")
         print("📝 API Key 설정 방법:")
         print("   1. 환경 변수 설정: set GEMINI_API_KEY=your-api-key")
@@ -627,17 +1466,13 @@ if __name__ == '__main__':
     else:
         print("🔧 Gemini API Key: 설정됨")
     
-    print(f"🎤 Google STT: {'사용 가능' if speech_client else '사용 불가'}")
-    print(f"🔊 TTS Engine: {'사용 가능' if tts_engine else '사용 불가'}")
+    print(f"🎤 STT 백엔드: {', '.join(stt_router.backends)} (로컬 우선: {stt_router.local or '없음'})")
+    print(f"🔥 서비스 초기화: {'첫 사용 시' if services.lazy else '백그라운드 워밍업'} (상태: /health/ready)")
+    print(f"🗄️ 캐시 저장소: {command_cache.store.stats()['backend']} / 워커: {SERVER_WORKERS}")
     
     # 라우트 등록 확인
     print("🔍 등록된 라우트 확인:")
     for rule in app.url_map.iter_rules():
         print(f"   {rule.rule} -> {rule.endpoint}")
     
-    app.run(
-        host='0.0.0.0',
-        port=8000,  # 포트 8000으로 통일
-        debug=False,  # 디버그 모드 끄기
-        threaded=True
-    ) 
\ No newline at end of file
+    run_server() 
\ No newline at end of file